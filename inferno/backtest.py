@@ -0,0 +1,36 @@
+import argparse
+import json
+import logging
+from pathlib import Path
+
+from src.backtest.data import load_candles
+from src.backtest.sweep import expand_grid, run_sweep
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Offline parameter sweep for the Donchian strategy.')
+    parser.add_argument('candles', nargs='+', help='Candle files (.json/.csv) or directories with them.')
+    parser.add_argument('--grid', required=True, help='JSON file with {parameter: [values]} to sweep.')
+    parser.add_argument('--workers', type=int, default=None, help='Process pool size (default: CPU count).')
+    parser.add_argument('--out', default='sweep.csv', help='Where to write the summary table.')
+    parser.add_argument('--equity', default=None, help='Optional .csv for equity curves of every parameter set.')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    candles = load_candles(args.candles)
+    with open(args.grid) as file:
+        grid = expand_grid(json.load(file))
+
+    result = run_sweep(candles, grid, workers=args.workers, keep_equity=args.equity is not None)
+
+    result.summary.to_csv(args.out, index=False)
+    if result.equity is not None:
+        result.equity.to_csv(Path(args.equity), index_label='timestamp')
+
+    print(result.summary.sort_values('sharpe', ascending=False).head(10).to_string(index=False))
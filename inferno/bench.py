@@ -0,0 +1,615 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from itertools import count
+from threading import Event, Thread
+from time import perf_counter, sleep
+from typing import Callable, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import pika
+from lightgbm import LGBMClassifier
+from sklearn.preprocessing import StandardScaler
+
+from src.config import settings
+from src.donchian.donchian import DonchianStrategy
+from src.donchian.kernels import donchian_channels
+from src.hyperliquid.buffer import CandleBuffer
+from src.hyperliquid.collection import HyperliquidCollector
+from src.hyperliquid.replay import ReplayConnection
+from src.hyperliquid.shared import SharedCandleBuffer, SharedCandles
+from src.ml.batching import InferenceBatcher
+from src.ml.features import plan_features
+from src.ml.inference import ModelInference
+from src.ml.loader import ModelLoader
+from src.ml.registry import ModelRegistry, resident_bytes
+from src.ml.shadow import ShadowScorer
+from src.ml.incremental import IncrementalFeatureStrategy
+from src.ml.preprocessor import PreProcessor
+
+
+def random_walk(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 2e-3, n)))
+
+
+def timeit(fn: Callable[[], object], repeat: int = 20) -> float:
+    """Best-of-`repeat` wall time of `fn` in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        best = min(best, perf_counter() - start)
+    return best * 1000
+
+
+def bench_channels(n: int = 500) -> None:
+    """Batched channel kernel vs the per-window rolling + concat chain."""
+    windows = [5, 10, 20, 30, 60, 90, 150, 250, 360]
+    close = random_walk(n)
+    data = pd.DataFrame({'close': close})
+
+    def concat_chain(windows: list[int]) -> pd.DataFrame:
+        frame = data
+        for window in windows:
+            rolling = frame['close'].rolling(window, min_periods=window)
+            lower, upper = rolling.min(), rolling.max()
+            channel = pd.DataFrame({
+                f'DCL_{window}': lower,
+                f'DCM_{window}': 0.5 * (lower + upper),
+                f'DCU_{window}': upper
+            })
+            frame = pd.concat([frame, channel], axis=1)
+        return frame
+
+    print(f'channels, {n} candles')
+    print(f'{"windows":>8} {"concat ms":>10} {"kernel ms":>10}')
+    for k in range(1, len(windows) + 1):
+        out = np.empty((3 * k, n))
+        concat_ms = timeit(lambda: concat_chain(windows[:k]))
+        kernel_ms = timeit(lambda: donchian_channels(close, windows[:k], out=out))
+        print(f'{k:>8} {concat_ms:>10.3f} {kernel_ms:>10.3f}')
+
+
+def random_candles(n: int, seed: int = 0) -> pd.DataFrame:
+    """Candle frame in the `PreProcessor.convert` layout around a random walk."""
+    rng = np.random.default_rng(seed)
+    close = random_walk(n, seed)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    timestamp = 1_700_000_000_000 + 60_000 * np.arange(n, dtype=np.int64)
+    return pd.DataFrame({
+        'timestamp': timestamp,
+        'end': timestamp + 59_999,
+        'open': open_,
+        'close': close,
+        'high': np.maximum(open_, close) * (1 + rng.uniform(0, 1e-3, n)),
+        'low': np.minimum(open_, close) * (1 - rng.uniform(0, 1e-3, n)),
+        'volume': rng.uniform(1, 100, n),
+    })
+
+
+def bench_features(n: int = 500, steps: int = 200) -> None:
+    """Batch `PreProcessor._features` vs the streaming engine, one new candle per request."""
+    candles = random_candles(n + steps)
+    engine = IncrementalFeatureStrategy(history=n)
+    engine.features('bench', candles.iloc[:n])
+
+    windows = [candles.iloc[i + 1:n + i + 1].reset_index(drop=True) for i in range(steps)]
+    batch_ms = timeit(lambda: [PreProcessor._features(w.copy()) for w in windows], repeat=1) / steps
+    stream_ms = timeit(lambda: [engine.features('bench', w) for w in windows], repeat=1) / steps
+
+    print(f'features, {n} candles, {steps} requests')
+    print(f'batch: {batch_ms:.3f} ms, streaming: {stream_ms:.3f} ms per request')
+
+
+def pandas_ta_features(data: pd.DataFrame) -> pd.DataFrame:
+    """`PreProcessor._features` as it was built on pandas_ta."""
+    import pandas_ta as ta
+
+    data["rsi_14"] = ta.rsi(data["close"], length=14)
+    data["mom_10d"] = data["close"].pct_change(periods=10)
+    data["mom_30d"] = data["close"].pct_change(periods=30)
+    data[["stochk_14_3_3", "stochd_14_3_3"]] = ta.stoch(data["high"], data["low"], data["close"], k=14, d=3, smooth_k=3)
+    data["macd_hist"] = ta.macd(data["close"])["MACDh_12_26_9"]
+    data[["adx_14", "plus_di_14", "minus_di_14"]] = ta.adx(data["high"], data["low"], data["close"], length=14)
+    data["sma_50_ratio"] = data["close"] / ta.sma(data["close"], length=50) - 1
+    data["ema_20_ratio"] = data["close"] / ta.ema(data["close"], length=50) - 1
+    data["atr_14_norm"] = ta.atr(data["high"], data["low"], data["close"], length=14) / data["close"]
+    bbands = ta.bbands(data["close"], length=20, std=2)
+    data["bbands_width_20_2"] = (bbands["BBU_20_2.0"] - bbands["BBL_20_2.0"]) / bbands["BBM_20_2.0"]
+    log_returns = np.log(data["close"] / data["close"].shift(1))
+    data["volatility_30d"] = log_returns.rolling(window=30).std()
+    data["volatility_90d"] = log_returns.rolling(window=90).std()
+    data["obv_pct_change_10d"] = ta.obv(data["close"], data["volume"]).pct_change(periods=10)
+    dc = ta.donchian(high=data["high"], low=data["low"], lower_length=60, upper_length=60)
+    data["donchian_width_rel_60"] = (dc["DCU_60_60"] - dc["DCL_60_60"]) / data["close"]
+
+    data[PreProcessor.FEATURE_COLS] = data[PreProcessor.FEATURE_COLS].shift(1)
+    data.ffill(inplace=True)
+    data.bfill(inplace=True)
+    return data
+
+
+def import_ms(module: str) -> float:
+    """Time to import `module` in a fresh interpreter, in milliseconds."""
+    code = f'from time import perf_counter; s = perf_counter(); import {module}; print(perf_counter() - s)'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(result.stdout) * 1000
+
+
+def bench_indicators(n: int = 500) -> None:
+    """NumPy indicator kernels vs pandas_ta: per-request latency and import time.
+
+    The pandas_ta side is skipped if it is not installed, parity is checked by
+    tests/test_indicators.py.
+    """
+    candles = random_candles(n)
+    try:
+        import pandas_ta # noqa: F401
+    except ImportError:
+        pandas_ta = None
+
+    print(f'indicators, {n} candles')
+    print(f'numpy: {timeit(lambda: PreProcessor._features(candles.copy())):.3f} ms per request, '
+          f'import {import_ms("src.ml.indicators"):.0f} ms')
+    if pandas_ta is None:
+        print('pandas_ta is not installed, skipping comparison')
+        return
+    print(f'pandas_ta: {timeit(lambda: pandas_ta_features(candles.copy())):.3f} ms per request, '
+          f'import {import_ms("pandas_ta"):.0f} ms')
+
+
+def bench_plan(n: int = 500) -> None:
+    """Last-row features through a `FeaturePlan` vs the full `_features` frame, per model feature set."""
+    candles = random_candles(n)
+    feature_sets = {
+        'all': PreProcessor.FEATURE_COLS,
+        'no obv': [f for f in PreProcessor.FEATURE_COLS if f != 'obv_pct_change_10d'],
+        'rolling only': ['mom_10d', 'mom_30d', 'volatility_30d', 'donchian_width_rel_60', 'stochk_14_3_3'],
+    }
+
+    print(f'feature plans, {n} candles')
+    print(f'{"features":>14} {"window":>7} {"full ms":>8} {"plan ms":>8}')
+    full_ms = timeit(lambda: PreProcessor._features(candles.copy()))
+    for name, features in feature_sets.items():
+        plan = plan_features(tuple(features))
+        plan_ms = timeit(lambda: plan.latest(candles))
+        print(f'{name:>14} {min(plan.window or n, n):>7} {full_ms:>8.3f} {plan_ms:>8.3f}')
+
+
+def bench_tail(n: int = 2000) -> None:
+    """Latest-only TECHNICAL evaluation per warm-up vs full recomputation, with agreement rate."""
+    windows = [5, 10, 20, 30, 60, 90, 150, 250, 360]
+    candles = random_candles(n)
+    full = DonchianStrategy(LOOK_BACK_WINDOWS=windows)
+    ends = range(max(windows) + 1, n + 1, 7)
+    expected = {end: full.get_signal(candles.iloc[:end])[1] for end in ends}
+
+    print(f'tail evaluation, {n} candles')
+    print(f'{"warm-up":>8} {"tail":>6} {"full ms":>8} {"tail ms":>8} {"agree %":>8}')
+    full_ms = timeit(lambda: full.get_signal(candles))
+    for warm_up in (0, 50, 140, 250, 500):
+        tail = DonchianStrategy(LOOK_BACK_WINDOWS=windows, TAIL_WARM_UP=warm_up)
+        tail_ms = timeit(lambda: tail.get_signal(candles))
+        agree = np.mean([tail.get_signal(candles.iloc[:end])[1] == expected[end] for end in ends])
+        print(f'{warm_up:>8} {tail.tail_length:>6} {full_ms:>8.3f} {tail_ms:>8.3f} {100 * agree:>8.2f}')
+
+
+def synthetic_model(directory: Path, n: int = 3_000, n_estimators: int = 200) -> Path:
+    """Model file in the production layout trained on random candles (next close up or not)."""
+    data = PreProcessor._features(random_candles(n, seed=1))
+    features = PreProcessor.FEATURE_COLS
+    target = (data['close'].shift(-5) > data['close']).astype(int)
+    scaler = StandardScaler().fit(data[features])
+    clf = LGBMClassifier(n_estimators=n_estimators, num_leaves=31, verbose=-1)
+    clf.fit(pd.DataFrame(scaler.transform(data[features]), columns=features), target)
+    path = directory / 'bench.joblib'
+    joblib.dump({'scaler': scaler, 'clf': clf, 'features': features, 'threshold': .5}, path)
+    return path
+
+
+def bench_batching(requests: int = 2_000, window_ms: float = 2.) -> None:
+    """Batched `transform` + `predict_proba` per batch size vs one call per request.
+
+    All requests are submitted at once, so batches fill up to the max size; the latency
+    is from submit to result. tests/test_batching.py checks the batched predictions.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        inference = ModelInference(
+            str(synthetic_model(Path(directory))), ModelLoader(directory), PreProcessor(), DonchianStrategy()
+        )
+    candles = random_candles(requests + 500, seed=2)
+    inputs = [inference.model_input(candles.iloc[i:i + 500]) for i in range(0, requests, 50)]
+    inputs = (inputs * -(-requests // len(inputs)))[:requests]
+
+    start = perf_counter()
+    for model_input in inputs:
+        inference.predict_batch([model_input])
+    single_rate = requests / (perf_counter() - start)
+
+    print(f'batching, {requests} requests, {window_ms} ms window')
+    print(f'{"batch":>6} {"mean size":>10} {"latency ms":>11} {"rows/s":>10} {"speed-up":>9}')
+    print(f'{"-":>6} {1:>10.1f} {1000 / single_rate:>11.3f} {single_rate:>10,.0f} {1:>9.1f}')
+    for size in (8, 32, 128):
+        batcher = InferenceBatcher(max_batch_size=size, window_ms=window_ms)
+        futures = [batcher.submit(inference, model_input, lambda suggestion, prediction: prediction) for model_input in inputs]
+        for future in futures:
+            future.result()
+        batcher.close()
+        stats = batcher.stats
+        print(
+            f'{size:>6} {stats["mean_batch_size"]:>10.1f} {stats["mean_latency_ms"]:>11.3f} '
+            f'{stats["rows_per_s"]:>10,.0f} {stats["rows_per_s"] / single_rate:>9.1f}'
+        )
+
+
+def bench_compiled(rows: int = 256) -> None:
+    """Compiled tree arrays vs scaler + `LGBMClassifier.predict_proba`, single row and batched.
+
+    tests/test_compiled.py checks the probabilities are equal.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        loader = ModelLoader(directory)
+        loader.load_model(synthetic_model(Path(directory)))
+    model = loader.get_model()
+    scaler, clf, features = model['scaler'], model['clf'], model['features']
+    compiled = loader.compile_model()
+
+    data = PreProcessor._features(random_candles(rows + 100, seed=3))[features].iloc[100:]
+    xs = data.to_numpy(dtype=np.float64)
+
+    print(f'compiled trees: {len(compiled.roots)} trees, depth {compiled.depth}, folded scaler: {compiled.folded}')
+    print(f'{"rows":>6} {"lightgbm ms":>12} {"compiled ms":>12} {"speed-up":>9}')
+    for n in (1, 8, 64, rows):
+        frame, batch = data.iloc[:n], xs[:n]
+        lightgbm_ms = timeit(lambda: clf.predict_proba(scaler.transform(frame))[:, 1])
+        compiled_ms = timeit(lambda: compiled.predict_proba(batch))
+        print(f'{n:>6} {lightgbm_ms:>12.3f} {compiled_ms:>12.3f} {lightgbm_ms / compiled_ms:>9.1f}')
+
+
+def bench_registry(swaps: int = 5, n_estimators: int = 1_000) -> None:
+    """Load time and resident memory per version with and without memory-mapping, and
+    requests served while new versions are swapped in."""
+    strategy = DonchianStrategy()
+    candles = random_candles(600, seed=4)
+
+    def load(mmap_mode: Optional[str]) -> Callable[[Path], ModelInference]:
+        return lambda path: ModelInference(
+            str(path), ModelLoader(path.parent), PreProcessor(), strategy, mmap_mode=mmap_mode
+        )
+
+    with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryDirectory() as staging:
+        models_dir = Path(directory)
+        synthetic_model(models_dir, n_estimators=n_estimators).rename(models_dir / 'v0.joblib')
+        print(f'registry, {n_estimators} trees per model')
+        for mmap_mode in (None, 'r'):
+            registry = ModelRegistry(models_dir, 'v0.joblib', load(mmap_mode), poll_interval=0)
+            model = registry.active
+            memory = f'{model.memory_bytes / 2**20:.1f} MiB' if model.memory_bytes is not None else 'n/a'
+            print(f'mmap {mmap_mode}: load {model.load_ms:.0f} ms, resident {memory}')
+
+        registry = ModelRegistry(models_dir, 'v0.joblib', load('r'), poll_interval=.05, follow_latest=True)
+        stop = Event()
+        served, failed = count(), count()
+
+        def requests() -> None:
+            while not stop.is_set():
+                try:
+                    registry.get().inference.predict(candles)
+                    next(served)
+                except Exception:
+                    next(failed)
+
+        thread = Thread(target=requests)
+        thread.start()
+        for version in range(1, swaps + 1):
+            # written elsewhere and renamed in, like a deployment would
+            path = synthetic_model(Path(staging), n_estimators=n_estimators)
+            path.rename(models_dir / f'v{version}.joblib')
+            while registry.active.name != f'v{version}':
+                sleep(.01)
+        stop.set()
+        thread.join()
+        registry.close()
+        print(f'{swaps} swaps, {next(served)} requests served, {next(failed)} failed, active: {registry.active.name}')
+
+
+def bench_shadow(requests: int = 500, shadows: int = 2, queue_size: int = 100) -> None:
+    """Primary ML latency without and with shadow models scoring in the background."""
+    strategy = DonchianStrategy()
+    candles = random_candles(requests + 500, seed=5)
+    windows = [candles.iloc[i:i + 500] for i in range(requests)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        models_dir = Path(directory)
+        synthetic_model(models_dir).rename(models_dir / 'primary.joblib')
+        for i in range(shadows):
+            synthetic_model(models_dir, n_estimators=100 * (i + 2)).rename(models_dir / f'shadow{i}.joblib')
+        registry = ModelRegistry(
+            models_dir, 'primary.joblib',
+            lambda path: ModelInference(str(path), ModelLoader(path.parent), PreProcessor(), strategy),
+            poll_interval=0,
+            preload=[f'shadow{i}' for i in range(shadows)]
+        )
+        scorer = ShadowScorer(
+            registry, [f'shadow{i}' for i in range(shadows)], models_dir / 'shadow.csv', queue_size=queue_size
+        )
+
+        def serve(shadow: bool) -> np.ndarray:
+            latencies = []
+            for window in windows:
+                start = perf_counter()
+                inference = registry.get().inference
+                model_input = inference.model_input(window)
+                suggestion, prediction = inference.predict_batch([model_input])[0]
+                if shadow:
+                    scorer.submit('bench', window, model_input, prediction.model_version, suggestion, prediction.confidence) # type: ignore
+                latencies.append(perf_counter() - start)
+            return np.array(latencies) * 1000
+
+        print(f'shadow scoring, {requests} requests, {shadows} shadow models, queue {queue_size}')
+        for shadow in (False, True):
+            p50, p99 = np.percentile(serve(shadow), [50, 99])
+            print(f'shadow {"on" if shadow else "off"}: p50 {p50:.3f} ms, p99 {p99:.3f} ms')
+        scorer.close()
+        print(f'stats: {scorer.stats}')
+
+
+def stress_snapshots(
+    symbols: int = 4,
+    writers: int = 2,
+    readers: int = 4,
+    capacity: int = 500,
+    seconds: float = 5.
+) -> None:
+    """Write and snapshot throughput of CandleBuffer with concurrent writers and readers.
+
+    That snapshots are never torn is checked by tests/test_buffer.py.
+    """
+    buffers = [CandleBuffer(capacity) for _ in range(symbols)]
+    stop = Event()
+    stats = {'writes': 0, 'snapshots': 0}
+
+    def write(buffer: CandleBuffer, seed: int) -> None:
+        rng = np.random.default_rng(seed)
+        timestamps = count(0, 60_000)
+        t = next(timestamps)
+        while not stop.is_set():
+            if rng.random() < .5:
+                t = next(timestamps)
+            k = float(rng.integers(1, 1_000))
+            buffer.merge({'t': t, 'T': t + 59_999, 'o': t, 'h': t + k, 'l': t - k, 'c': t + k, 'v': k})
+            stats['writes'] += 1
+            if rng.random() < .01:
+                sleep(0)
+
+    def read(buffer: CandleBuffer) -> None:
+        while not stop.is_set():
+            buffer.snapshot()
+            stats['snapshots'] += 1
+
+    threads = [
+        Thread(target=write, args=(buffer, i * writers + j), daemon=True)
+        for i, buffer in enumerate(buffers) for j in range(writers)
+    ] + [
+        Thread(target=read, args=(buffers[i % symbols],), daemon=True) for i in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f'snapshots: {symbols} buffers, {symbols * writers} writers, {readers} readers, {seconds:.0f}s')
+    print(f'writes: {stats["writes"] / seconds:.0f}/s, snapshots: {stats["snapshots"] / seconds:.0f}/s')
+
+
+def bench_feed(
+    symbols: int = 20,
+    candles: int = 3_000,
+    updates_per_candle: int = 4,
+    max_candles: int = 500
+) -> None:
+    """Collector ingestion rate and TECHNICAL signal latency under a synthetic replay feed.
+
+    The feed is replayed as fast as possible while one thread keeps requesting signals
+    for random symbols, as the consumer would.
+    """
+    names = [f'SYM{i}' for i in range(symbols)]
+    connection = ReplayConnection.synthetic(
+        names, n=candles, speed=0, updates_per_candle=updates_per_candle, history=max_candles
+    )
+    collector = HyperliquidCollector(
+        test_net=False, symbols=names, interval='1m', max_candles=max_candles, connection=connection
+    )
+    strategy = DonchianStrategy(
+        LOOK_BACK_WINDOWS=[5, 10], TARGET_VOLATILITY=.25, MAX_ALLOCATION=1., VOLATILITY_WINDOW=90,
+        TRADING_DAYS_PER_YEAR=252, RISK_FREE_RATE=0.
+    )
+    rng = np.random.default_rng(0)
+    latencies: list[float] = []
+
+    start = perf_counter()
+    collector.start()
+    while not connection.done:
+        symbol = names[rng.integers(symbols)]
+        request_start = perf_counter()
+        strategy.get_signal(PreProcessor.convert(collector.get_candles(symbol)))
+        latencies.append(perf_counter() - request_start)
+    seconds = perf_counter() - start
+    connection.close()
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f'feed: {symbols} symbols, {updates_per_candle} updates per candle')
+    print(f'messages: {connection.messages} in {seconds:.2f}s ({connection.messages / seconds:,.0f}/s)')
+    print(f'signals: {len(latencies)}, p50 {p50:.3f} ms, p99 {p99:.3f} ms')
+
+
+def bench_service(requests: int = 2_000, concurrency: int = 64, symbols: int = 4) -> None:
+    """Round-trip latency and throughput of main.py vs main_async.py over RabbitMQ.
+
+    Each entry point is started on a synthetic feed and model with its own queue, then
+    `concurrency` requests (TECHNICAL and ML alternating) are kept outstanding. Needs
+    a broker at RABBITMQ_HOST; the entry points take their other settings from the
+    environment, e.g. CONSUMER_WORKERS or REQUEST_TIMEOUT.
+    """
+    parameters = pika.ConnectionParameters(
+        host=settings.RABBITMQ_HOST,
+        credentials=pika.PlainCredentials(settings.RABBITMQ_DEFAULT_USER, settings.RABBITMQ_DEFAULT_PASS)
+    )
+    try:
+        connection = pika.BlockingConnection(parameters)
+    except (pika.exceptions.AMQPConnectionError, OSError):
+        print(f'service: no broker at {settings.RABBITMQ_HOST}, skipped')
+        return
+    channel = connection.channel()
+    queue = f'bench_{os.getpid()}'
+    channel.queue_declare(queue=queue)
+    reply_to = channel.queue_declare(queue='', exclusive=True).method.queue
+    names = [f'SYM{i}' for i in range(symbols)]
+
+    def round_trips(run: str) -> tuple[list[float], float]:
+        sent: dict[str, float] = {}
+        latencies: list[float] = []
+
+        def on_reply(ch, method, props, body) -> None:
+            latencies.append(perf_counter() - sent.pop(props.correlation_id))
+
+        tag = channel.basic_consume(reply_to, on_reply, auto_ack=True)
+        start = perf_counter()
+        for i in range(requests):
+            while len(sent) >= concurrency:
+                connection.process_data_events(time_limit=None)
+            request = {'symbol': names[i % symbols], 'signal_type': 'ML' if i % 2 else 'TECHNICAL'}
+            sent[f'{run}-{i}'] = perf_counter()
+            channel.basic_publish(
+                '', queue, json.dumps(request),
+                pika.BasicProperties(reply_to=reply_to, correlation_id=f'{run}-{i}')
+            )
+        while sent:
+            connection.process_data_events(time_limit=None)
+        seconds = perf_counter() - start
+        channel.basic_cancel(tag)
+        return latencies, seconds
+
+    print(f'service, {requests} requests, {concurrency} outstanding, {symbols} symbols')
+    print(f'{"entry point":>14} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        model = synthetic_model(Path(directory))
+        env = {
+            **os.environ,
+            'FEED': 'synthetic',
+            'SYMBOLS': json.dumps(names),
+            'MAX_SYMBOLS': str(symbols),
+            'RABBITMQ_QUEUE': queue,
+            'MODELS_DIR': directory,
+            'MODEL_FILE': model.name,
+        }
+        for script in ('main.py', 'main_async.py'):
+            process = subprocess.Popen(
+                [sys.executable, script], env=env, cwd=Path(__file__).parent,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                while channel.queue_declare(queue=queue, passive=True).method.consumer_count == 0:
+                    if process.poll() is not None:
+                        raise RuntimeError(f'{script} exited with {process.returncode}')
+                    sleep(.1)
+                latencies, seconds = round_trips(script)
+            finally:
+                process.terminate()
+                process.wait()
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f'{script:>14} {requests / seconds:>8,.0f} {p50:>8.3f} {p99:>8.3f}')
+    channel.queue_delete(queue=queue)
+    connection.close()
+
+
+def read_shared(names: dict[str, str], seconds: float, results) -> None:
+    """Worker of `bench_shared`: TECHNICAL signals on shared candles for `seconds`."""
+    candles = SharedCandles(names, '1m')
+    strategy = DonchianStrategy()
+    symbols = list(names)
+    signals = 0
+    end = perf_counter() + seconds
+    while perf_counter() < end:
+        strategy.get_signal(PreProcessor.convert(candles.get_candles(symbols[signals % len(symbols)])))
+        signals += 1
+    results.put((signals, resident_bytes()))
+    candles.stop()
+
+
+def bench_shared(symbols: int = 20, seconds: float = 3., max_candles: int = 500) -> None:
+    """TECHNICAL signal throughput of worker processes reading one collector's shared buffers.
+
+    The collector (one feed, a candle per second and symbol) stays in this process, so
+    shared memory and subscriptions don't grow with the workers; a replica per worker
+    would hold all buffers and subscriptions each.
+    """
+    import multiprocessing
+
+    names = [f'SYM{i}' for i in range(symbols)]
+    connection = ReplayConnection.synthetic(names, n=10_000, speed=60., history=max_candles)
+    buffers: dict[str, SharedCandleBuffer] = {}
+
+    def shared_buffer(symbol: str, capacity: int) -> SharedCandleBuffer:
+        buffer = buffers[symbol] = SharedCandleBuffer(capacity)
+        return buffer
+
+    collector = HyperliquidCollector(
+        test_net=False, symbols=names, interval='1m', max_candles=max_candles,
+        connection=connection, buffer_factory=shared_buffer
+    )
+    collector.start()
+    shared = {symbol: buffer.name for symbol, buffer in buffers.items()}
+    shared_mib = sum(SharedCandleBuffer.memory_size(buffer.capacity) for buffer in buffers.values()) / 2**20
+
+    context = multiprocessing.get_context('spawn')
+    print(f'shared buffers: {symbols} symbols, {shared_mib:.2f} MiB, 1 feed, {seconds:.0f}s per run')
+    print(f'{"workers":>8} {"signals/s":>10} {"worker RSS MiB":>15}')
+    try:
+        for workers in (1, 2, 4):
+            results = context.Queue()
+            processes = [
+                context.Process(target=read_shared, args=(shared, seconds, results)) for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            counts, resident = zip(*(results.get() for _ in processes))
+            for process in processes:
+                process.join()
+            rss = np.mean([r for r in resident if r is not None] or [np.nan]) / 2**20
+            print(f'{workers:>8} {sum(counts) / seconds:>10,.0f} {rss:>15.1f}')
+    finally:
+        connection.close()
+        collector.stop()
+        for buffer in buffers.values():
+            buffer.unlink()
+
+
+BENCHMARKS: dict[str, Callable[[], None]] = {
+    'channels': bench_channels,
+    'snapshots': stress_snapshots,
+    'features': bench_features,
+    'indicators': bench_indicators,
+    'plan': bench_plan,
+    'tail': bench_tail,
+    'batching': bench_batching,
+    'compiled': bench_compiled,
+    'registry': bench_registry,
+    'shadow': bench_shadow,
+    'feed': bench_feed,
+    'service': bench_service,
+    'shared': bench_shared,
+}
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[name]()
@@ -1,95 +1,47 @@
-import os
 import pika
 import json
 import logging
-from time import time
+import signal
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 
 from src.config import settings
-from src.hyperliquid.collection import HyperliquidCollector
-from src.donchian.donchian import DonchianStrategy
-from src.ml.preprocessor import PreProcessor
-from src.ml.loader import ModelLoader
-from src.ml.inference import ModelInference
-from src.types.signal import (
-    SignalType, Suggestion, SignalResponse, SignalRequest
-)
-from src.types.prediction import Prediction
+from src.service import SignalService, consumer_prefetch, create_workers, failed_response, start_service
+from src.types.signal import SignalResponse, SignalRequest
+from src.utils.timing import log_duration
 
 
 logging.basicConfig(level=logging.DEBUG)
-
-# set up data collection
-hl_collector = HyperliquidCollector(
-    test_net=settings.TEST_NET,
-    symbols=['BTC', 'ETH'],
-    interval='1m',
-    max_candles=500
-)
-hl_collector.start()
-
-# set up base technical strategy
-donchian = DonchianStrategy(
-    LOOK_BACK_WINDOWS=settings.LOOK_BACK_WINDOWS,
-    TARGET_VOLATILITY=settings.TARGET_VOLATILITY,
-    MAX_ALLOCATION=settings.MAX_ALLOCATION,
-    VOLATILITY_WINDOW=settings.VOLATILITY_WINDOW,
-    TRADING_DAYS_PER_YEAR=settings.TRADING_DAYS_PER_YEAR,
-    RISK_FREE_RATE=settings.RISK_FREE_RATE
-)
-
-# set up ml
-preprocessor = PreProcessor()
-loader = ModelLoader(settings.MODELS_DIR)
-inference = ModelInference(os.path.join(settings.MODELS_DIR, settings.MODEL_FILE), loader, preprocessor, donchian)
-
-# main generator
-def generate(request: SignalRequest) -> SignalResponse:
-    raw_candles = hl_collector.get_candles(symbol=request.symbol)
-    candles = preprocessor.convert(raw_candles) 
-    if request.signal_type == SignalType.TECHNICAL:
-        last_candle_timestamp, last_candle_suggestion = donchian.get_signal(candles)
-        return SignalResponse(
-            success=True,
-            suggestion=last_candle_suggestion,
-            timestamp=last_candle_timestamp
-        )
-    elif request.signal_type == SignalType.ML:
-        suggestion, prediction = inference.predict(candles)
-
-        return SignalResponse(
-            success=True,
-            suggestion=suggestion,
-            timestamp=candles.iloc[-1]['timestamp'],
-            prediction=prediction
-        )
-    else:
-        return SignalResponse(
-            success=False,
-            suggestion=Suggestion.HOLD,
-            timestamp=int(time()*1000)
+logger = logging.getLogger(__name__)
+
+
+def connect() -> pika.BlockingConnection:
+    with log_duration('broker connection', logger):
+        return pika.BlockingConnection(
+            pika.ConnectionParameters(
+                host=settings.RABBITMQ_HOST,
+                credentials=pika.PlainCredentials(
+                    settings.RABBITMQ_DEFAULT_USER,
+                    settings.RABBITMQ_DEFAULT_PASS
+                )
+            )
         )
 
-# set up queue
-connection = pika.BlockingConnection(
-    pika.ConnectionParameters(
-        host=settings.RABBITMQ_HOST,
-        credentials=pika.PlainCredentials(
-            settings.RABBITMQ_DEFAULT_USER,
-            settings.RABBITMQ_DEFAULT_PASS
-        )
-    )
-)
-channel = connection.channel()
 
-channel.queue_declare(queue=settings.RABBITMQ_QUEUE)
+# start up: collector snapshots and model load (see `start_service`) run concurrently with the broker connection
+with log_duration('startup', logger):
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='startup') as startup:
+        service_future = startup.submit(start_service, settings)
+        connection_future = startup.submit(connect)
+        service: SignalService = service_future.result()
+        connection = connection_future.result()
 
+channel = connection.channel()
 
-def on_request(ch, method, props, body):
-    data = json.loads(body)
-    request = SignalRequest(**data)
+channel.queue_declare(queue=settings.RABBITMQ_QUEUE)
 
-    response = generate(request)
 
+def reply(ch, method, props, response: SignalResponse) -> None:
     ch.basic_publish(
         exchange='',
         routing_key=props.reply_to,
@@ -100,7 +52,60 @@ def on_request(ch, method, props, body):
     ch.basic_ack(delivery_tag=method.delivery_tag)
 
 
-channel.basic_qos(prefetch_count=1)
+def reply_later(ch, method, props, future: 'Future[SignalResponse]') -> None:
+    """Reply from the connection thread (pika isn't thread safe) once a response computed by a worker, batched or coalesced is done."""
+    try:
+        response = future.result()
+    except Exception:
+        logger.exception('request failed')
+        response = failed_response()
+    connection.add_callback_threadsafe(partial(reply, ch, method, props, response))
+
+
+def on_request(ch, method, props, body):
+    data = json.loads(body)
+    request = SignalRequest(**data)
+
+    # coalesced on this thread, then computed on the lane of the symbol if there are
+    # workers: requests of a symbol are computed in order and never concurrently, an
+    # identical one arriving meanwhile is answered along with the first (so possibly
+    # before requests of the symbol that came between them)
+    response = service.respond(request, workers)
+    if isinstance(response, Future):
+        response.add_done_callback(partial(reply_later, ch, method, props))
+    else:
+        reply(ch, method, props, response)
+
+
+def stop(signum, frame) -> None:
+    logger.info(f'received signal {signum}, stopping')
+    connection.add_callback_threadsafe(channel.stop_consuming)
+
+
+def shut_down() -> None:
+    """Finish accepted requests, send their replies, then release everything."""
+    with log_duration('shutdown', logger):
+        if workers is not None:
+            workers.shutdown(wait=True)
+        # predicts what is batched, queueing its replies
+        if service.batcher is not None:
+            service.batcher.close()
+        # publishes the replies and acks queued by workers and batches
+        connection.process_data_events(time_limit=0)
+        service.close()
+        connection.close()
+
+
+# only consume once the collector and model are ready
+if not service.collector.ready:
+    raise RuntimeError('Collector is not ready')
+workers = create_workers(settings)
+prefetch_count = consumer_prefetch(settings, workers)
+channel.basic_qos(prefetch_count=prefetch_count)
 channel.basic_consume(queue=settings.RABBITMQ_QUEUE, on_message_callback=on_request)
+signal.signal(signal.SIGTERM, stop)
+signal.signal(signal.SIGINT, stop)
+logger.info(f'consuming from {settings.RABBITMQ_QUEUE} (prefetch {prefetch_count}, {workers.workers if workers else 1} workers)')
 
 channel.start_consuming()
+shut_down()
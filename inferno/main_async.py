@@ -0,0 +1,149 @@
+import json
+import logging
+import signal
+import asyncio
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+import pika
+
+from src.config import Settings, settings
+from src.service import SignalService, consumer_prefetch, create_workers, failed_response, start_service
+from src.types.signal import SignalResponse, SignalRequest
+from src.utils.amqp import AsyncBroker, Delivery
+from src.utils.lanes import KeyedExecutor
+from src.utils.timing import log_duration
+
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+
+class Consumer:
+    """Answers signal requests concurrently on the event loop.
+
+    Every delivery is a task: `SignalService.respond` coalesces identical requests on the
+    loop and computes the first of them on a worker lane (requests of a symbol in order,
+    as in main.py), its future is awaited, so the loop only parses, publishes and acks. Up to the prefetch count of requests
+    are in flight at once. A request taking longer than `timeout` seconds is answered
+    as failed; one cancelled on shutdown is requeued for another consumer.
+    """
+
+    def __init__(
+        self,
+        broker: AsyncBroker,
+        service: SignalService,
+        workers: KeyedExecutor,
+        timeout: Optional[float] = None
+    ):
+        self.broker = broker
+        self.service = service
+        self.workers = workers
+        self.timeout = timeout
+        self.in_flight: set[asyncio.Task] = set()
+
+    def on_message(self, delivery: Delivery) -> None:
+        task = asyncio.get_running_loop().create_task(self.handle(delivery))
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+
+    async def handle(self, delivery: Delivery) -> None:
+        _, method, props, body = delivery
+        try:
+            request = SignalRequest(**json.loads(body))
+            async with asyncio.timeout(self.timeout):
+                response = await self.compute(request)
+        except TimeoutError:
+            logger.warning(f'request timed out after {self.timeout}s: {body!r}')
+            response = failed_response()
+        except asyncio.CancelledError:
+            # not answered, another consumer gets it
+            self.broker.nack(method.delivery_tag, requeue=True)
+            raise
+        except Exception:
+            logger.exception(f'request failed: {body!r}')
+            response = failed_response()
+        self.reply(method, props, response)
+
+    async def compute(self, request: SignalRequest) -> SignalResponse:
+        # coalesced here on the loop, only the first of identical requests goes to a lane
+        response = self.service.respond(request, self.workers)
+        if not isinstance(response, Future):
+            return response
+        future = asyncio.wrap_future(response)
+        if self.service.single_flight is not None:
+            # shared with identical requests, a deadline must not cancel it for them
+            future = asyncio.shield(future)
+        # otherwise cancelling before a lane picks the request up skips it
+        return await future
+
+    def reply(self, method, props, response: SignalResponse) -> None:
+        if not self.broker.is_open:
+            logger.warning(f'broker connection closed, request {props.correlation_id} not answered')
+            return
+        self.broker.publish(
+            props.reply_to,
+            json.dumps(response.model_dump()),
+            pika.BasicProperties(correlation_id=props.correlation_id)
+        )
+        self.broker.ack(method.delivery_tag)
+
+    async def drain(self, timeout: float) -> None:
+        """Wait `timeout` seconds for requests in flight, cancel the rest."""
+        if self.in_flight:
+            _, pending = await asyncio.wait(self.in_flight, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def serve(start: Callable[[Settings], SignalService] = start_service) -> None:
+    loop = asyncio.get_running_loop()
+    broker = AsyncBroker(
+        pika.ConnectionParameters(
+            host=settings.RABBITMQ_HOST,
+            credentials=pika.PlainCredentials(
+                settings.RABBITMQ_DEFAULT_USER,
+                settings.RABBITMQ_DEFAULT_PASS
+            )
+        )
+    )
+
+    # start up: collector snapshots and model load run concurrently with the broker connection
+    with log_duration('startup', logger):
+        service, _ = await asyncio.gather(asyncio.to_thread(start, settings), broker.connect())
+
+    # only consume once the collector and model are ready
+    if not service.collector.ready:
+        raise RuntimeError('Collector is not ready')
+    # the loop never computes, so one worker still gets a lane of its own
+    workers = create_workers(settings) or KeyedExecutor(1, name='consumer')
+    prefetch_count = consumer_prefetch(settings, workers)
+    consumer = Consumer(broker, service, workers, timeout=settings.REQUEST_TIMEOUT)
+
+    stopping = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+
+    await broker.declare_queue(settings.RABBITMQ_QUEUE)
+    await broker.set_qos(prefetch_count)
+    broker.consume(settings.RABBITMQ_QUEUE, consumer.on_message)
+    logger.info(f'consuming from {settings.RABBITMQ_QUEUE} (prefetch {prefetch_count}, {workers.workers} workers)')
+
+    stop = loop.create_task(stopping.wait())
+    await asyncio.wait([stop, broker.closed], return_when=asyncio.FIRST_COMPLETED) # type: ignore
+    if broker.closed.done(): # type: ignore
+        logger.error(f'broker connection closed: {broker.closed.result()}') # type: ignore
+    stop.cancel()
+
+    # finish accepted requests and send their replies, then release everything
+    with log_duration('shutdown', logger):
+        await broker.cancel()
+        await consumer.drain(settings.SHUTDOWN_TIMEOUT)
+        await asyncio.to_thread(workers.shutdown)
+        await asyncio.to_thread(service.close)
+        await broker.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(serve())
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+from functools import partial
+from multiprocessing.process import BaseProcess
+from threading import Event
+
+from src.config import Settings, settings
+from src.hyperliquid.collection import HyperliquidCollector
+from src.hyperliquid.shared import SharedCandleBuffer, SharedCandles
+from src.service import start_collector, start_service
+from src.utils.timing import log_duration
+import main_async
+
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# seconds between stale flag updates and worker checks
+SUPERVISE_INTERVAL = .05
+
+
+def attach_candles(names: dict[str, str], interval: str, settings: Settings) -> SharedCandles:
+    return SharedCandles(names, interval)
+
+
+def run_worker(names: dict[str, str], interval: str) -> None:
+    """Consumer process: main_async.py with candles read from the collector's shared buffers."""
+    asyncio.run(main_async.serve(partial(start_service, start_candles=partial(attach_candles, names, interval))))
+
+
+def start_shared_collector(prefix: str) -> tuple[HyperliquidCollector, dict[str, SharedCandleBuffer]]:
+    """Collector whose base interval buffers are shared memory blocks named `{prefix}_{symbol}`."""
+    buffers: dict[str, SharedCandleBuffer] = {}
+
+    def shared_buffer(symbol: str, capacity: int) -> SharedCandleBuffer:
+        buffer = buffers[symbol] = SharedCandleBuffer(capacity, name=f'{prefix}_{symbol}')
+        return buffer
+
+    return start_collector(settings, buffer_factory=shared_buffer), buffers
+
+
+def main() -> int:
+    """One collector (and websocket) in this process, `WORKER_PROCESSES` consumers reading its buffers.
+
+    Workers serve the start `SYMBOLS` at the collected interval only. A worker exiting
+    on its own stops everything with exit code 1, like main.py failing would.
+    """
+    count = settings.WORKER_PROCESSES or os.cpu_count() or 1
+    collector, buffers = start_shared_collector(f'inferno_{os.getpid()}')
+    names = {symbol: buffer.name for symbol, buffer in buffers.items()}
+
+    stopping = Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+
+    # spawned, a fork would copy the websocket and collector threads' state
+    context = multiprocessing.get_context('spawn')
+    workers: list[BaseProcess] = []
+    for i in range(count):
+        worker = context.Process(target=run_worker, args=(names, collector.interval), name=f'worker-{i}')
+        worker.start()
+        workers.append(worker)
+    shared_bytes = sum(SharedCandleBuffer.memory_size(buffer.capacity) for buffer in buffers.values())
+    logger.info(f'{count} worker processes reading {len(buffers)} shared candle buffers ({shared_bytes / 2**20:.1f} MiB)')
+
+    failed = False
+    try:
+        while not stopping.wait(SUPERVISE_INTERVAL):
+            for symbol, buffer in buffers.items():
+                buffer.stale = collector.is_stale(symbol)
+            exited = [worker for worker in workers if not worker.is_alive()]
+            if exited and not stopping.is_set():
+                logger.error(f'{exited[0].name} exited with {exited[0].exitcode}, stopping')
+                failed = True
+                break
+    finally:
+        # workers finish their requests in flight on SIGTERM (see main_async.py)
+        with log_duration('shutdown', logger):
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+            for worker in workers:
+                worker.join()
+            collector.stop()
+            for buffer in buffers.values():
+                buffer.unlink()
+    return int(failed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,18 @@
+from pathlib import Path
+from typing import Union
+
+import pandas as pd
+
+from src.hyperliquid.files import load_candle_files
+from src.ml.preprocessor import PreProcessor
+
+
+def load_candles(paths: Union[str, Path, list[Union[str, Path]]]) -> pd.DataFrame:
+    """Candle history from files and/or directories of candle files as a frame.
+
+    See `src.hyperliquid.files.load_candle_files` for the formats and how files are merged.
+
+    Returns:
+        Candles in the same layout as `PreProcessor.convert`
+    """
+    return PreProcessor.convert(load_candle_files(paths))
@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import product
+from typing import Any, Optional
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from src.donchian.donchian import DonchianStrategy
+from src.donchian.kernels import donchian_channels, trailing_stop_positions
+
+logger = logging.getLogger(__name__)
+
+
+class ParameterSet(BaseModel):
+    LOOK_BACK_WINDOWS: list[int]
+    TARGET_VOLATILITY: float = .25
+    MAX_ALLOCATION: float = 2.
+    VOLATILITY_WINDOW: int = 90
+    TRADING_DAYS_PER_YEAR: int = 252
+    RISK_FREE_RATE: float = .0
+
+
+class SweepResult(BaseModel):
+    model_config = {'arbitrary_types_allowed': True}
+
+    summary: pd.DataFrame
+    equity: Optional[pd.DataFrame] = None
+
+
+def expand_grid(grid: dict[str, list[Any]]) -> list[ParameterSet]:
+    """Cartesian product of {parameter: [values]} into parameter sets."""
+    names = list(grid)
+    return [ParameterSet(**dict(zip(names, values))) for values in product(*grid.values())]
+
+
+# shared state of a sweep, set once per worker process by `_init_worker`
+_returns: np.ndarray = np.empty(0)
+_positions: dict[int, np.ndarray] = {}
+_sigmas: dict[tuple[int, int], np.ndarray] = {}
+
+
+def _init_worker(
+    returns: np.ndarray,
+    positions: dict[int, np.ndarray],
+    sigmas: dict[tuple[int, int], np.ndarray]
+) -> None:
+    global _returns, _positions, _sigmas
+    _returns, _positions, _sigmas = returns, positions, sigmas
+
+
+def _evaluate(params: ParameterSet, keep_equity: bool = True) -> tuple[dict[str, float], Optional[np.ndarray]]:
+    sigma = _sigmas[(params.VOLATILITY_WINDOW, params.TRADING_DAYS_PER_YEAR)]
+    weight = np.minimum(params.TARGET_VOLATILITY / sigma, params.MAX_ALLOCATION)
+
+    w_combo = np.zeros(len(sigma))
+    for window in params.LOOK_BACK_WINDOWS:
+        w = weight * _positions[window]
+        w_combo += np.where(np.isnan(w), 0., w)
+    w_combo /= len(params.LOOK_BACK_WINDOWS)
+
+    # the weight decided on a candle's close is held over the next candle
+    strategy_returns = np.zeros(len(w_combo))
+    strategy_returns[1:] = w_combo[:-1] * _returns[1:]
+    equity = np.cumprod(1 + strategy_returns)
+
+    periods = params.TRADING_DAYS_PER_YEAR
+    excess = strategy_returns[1:] - params.RISK_FREE_RATE / periods
+    std = excess.std(ddof=1) if len(excess) > 1 else 0.
+    sharpe = float(excess.mean() / std * np.sqrt(periods)) if std > 0 else 0.
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    return {
+        'total_return': float(equity[-1] - 1),
+        'sharpe': sharpe,
+        'max_drawdown': float(drawdown.min()),
+        'exposure': float((w_combo > 1e-6).mean()),
+        'turnover': float(np.abs(np.diff(w_combo)).sum()),
+    }, equity if keep_equity else None
+
+
+def _evaluate_chunk(chunk: list[ParameterSet], keep_equity: bool = True) -> list[tuple[dict[str, float], Optional[np.ndarray]]]:
+    # without `keep_equity` only the metrics are sent back to the parent process
+    return [_evaluate(params, keep_equity) for params in chunk]
+
+
+def run_sweep(
+    candles: pd.DataFrame,
+    grid: list[ParameterSet],
+    workers: Optional[int] = None,
+    keep_equity: bool = True
+) -> SweepResult:
+    """Backtests every parameter set of `grid` over one candle history.
+
+    Channels, positions and volatility only depend on a single look back window or
+    volatility window, so they are computed once per distinct value and shared by all
+    parameter sets; each set then only combines them into weights and equity.
+
+    Args:
+        candles: Candle history in `PreProcessor.convert` layout
+        grid: Parameter sets to evaluate
+        workers: Size of the process pool (defaults to CPU count, 1 runs inline)
+        keep_equity: Return the equity curve of every parameter set, otherwise workers
+            only send back the metrics
+
+    Returns:
+        Summary (one row per parameter set) and equity curves indexed by timestamp
+    """
+    if not grid:
+        raise ValueError('Empty parameter grid')
+
+    close = candles['close'].to_numpy(dtype=np.float64)
+    returns = np.zeros(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1
+
+    windows = sorted({window for params in grid for window in params.LOOK_BACK_WINDOWS})
+    channels = donchian_channels(close, windows)
+    positions = {
+        window: trailing_stop_positions(close, channels[3 * i + 1], channels[3 * i + 2])[0]
+        for i, window in enumerate(windows)
+    }
+
+    sigmas: dict[tuple[int, int], np.ndarray] = {}
+    for key in {(params.VOLATILITY_WINDOW, params.TRADING_DAYS_PER_YEAR) for params in grid}:
+        strategy = DonchianStrategy(VOLATILITY_WINDOW=key[0], TRADING_DAYS_PER_YEAR=key[1])
+        sigmas[key] = strategy._calc_volatility(candles[['close']])['sigma_t'].to_numpy()
+    logger.info(f'Prepared {len(windows)} windows and {len(sigmas)} volatility series for {len(grid)} parameter sets')
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(grid) == 1:
+        _init_worker(returns, positions, sigmas)
+        results = _evaluate_chunk(grid, keep_equity)
+    else:
+        chunk_size = max(1, len(grid) // (workers * 4))
+        chunks = [grid[i:i + chunk_size] for i in range(0, len(grid), chunk_size)]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(returns, positions, sigmas)
+        ) as pool:
+            evaluate = partial(_evaluate_chunk, keep_equity=keep_equity)
+            results = [result for chunk in pool.map(evaluate, chunks) for result in chunk]
+
+    summary = pd.DataFrame([
+        {**params.model_dump(), **metrics} for params, (metrics, _) in zip(grid, results)
+    ])
+    equity = None
+    if keep_equity:
+        equity = pd.DataFrame(
+            np.column_stack([curve for _, curve in results]),
+            index=candles['timestamp'].to_numpy()
+        )
+    return SweepResult(summary=summary, equity=equity)
@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings, ForceDecode
 
@@ -8,9 +8,29 @@ class Settings(BaseSettings):
     RABBITMQ_DEFAULT_PASS: str = Field(default="secret", description='User password for RabbitMQ service.') 
     RABBITMQ_QUEUE: str = Field(default='signal_queue', description='Rabbitmq queue to listen to.')
     API_BASE_URL: str = Field(default='http://oracle:8000', description='Oracle base URL.')
+    CONSUMER_WORKERS: int = Field(default=1, description='Threads computing requests, 1 computes them in the broker callback, 0 uses the CPU count.')
+    WORKER_PROCESSES: int = Field(default=0, description='Consumer processes main_shared.py starts on the shared candle buffers, 0 uses the CPU count.')
+    PREFETCH_COUNT: int = Field(default=0, description='Unacknowledged requests delivered at once, 0 sizes it from CONSUMER_WORKERS and INFERENCE_BATCH_SIZE.')
+    REQUEST_TIMEOUT: Optional[float] = Field(default=None, description='Seconds main_async.py lets a request run before answering it as failed, None for no deadline.')
+    SHUTDOWN_TIMEOUT: float = Field(default=10., description='Seconds main_async.py waits for requests in flight on shutdown before requeueing them.')
+    COALESCE_REQUESTS: bool = Field(default=True, description='Answer identical requests arriving while one is computed with its response, checked before requests are queued to a worker.')
+    SIGNAL_CACHE_SIZE: int = Field(default=1_024, description='Responses cached per symbol, interval, signal type, model version and candle state, 0 disables.')
     
     # connection
     TEST_NET: bool = Field(default=False, description='Do use Hyperliquid-test-net.')
+    STARTUP_WORKERS: int = Field(default=8, description='Concurrent candle snapshot requests on start up.')
+    SYMBOLS: Annotated[list[str], ForceDecode] = Field(default=['BTC', 'ETH'], description='Symbols to collect from start, others are subscribed on first request.')
+    MAX_SYMBOLS: int = Field(default=20, description='Max symbols collected at once, least recently requested ones are unsubscribed.')
+    CANDLES_DIR: Optional[str] = Field(default=None, description='Directory to persist closed candles in, disabled if not set.')
+    BACKFILL_PAGE_SIZE: int = Field(default=500, description='Candles per snapshot request when filling gaps.')
+    BACKFILL_MAX_PAGES: int = Field(default=20, description='Max snapshot requests per gap.')
+    BACKFILL_WORKERS: int = Field(default=2, description='Background threads filling gaps.')
+    BACKFILL_TIMEOUT: float = Field(default=5., description='Seconds a request may wait for a backfill.')
+    FEED: str = Field(default='hyperliquid', description='Market data source: hyperliquid, replay (REPLAY_PATH files) or synthetic (random walks of SYMBOLS).')
+    REPLAY_PATH: Optional[str] = Field(default=None, description='Candle file or directory to replay with FEED=replay.')
+    REPLAY_SPEED: float = Field(default=1., description='Replay speed-up over market time, 0 replays as fast as possible.')
+    REPLAY_UPDATES_PER_CANDLE: int = Field(default=1, description='Websocket updates sent per replayed candle.')
+    REPLAY_CANDLES: int = Field(default=10_000, description='Candles per symbol generated with FEED=synthetic.')
 
     # donchian settings
     LOOK_BACK_WINDOWS: Annotated[list[int], ForceDecode] = Field(default=[5, 10], description='Look back windows for technical strategy.')
@@ -19,9 +39,23 @@ class Settings(BaseSettings):
     VOLATILITY_WINDOW: int = Field(default=90, description='Window for calculate price volatility.')
     TRADING_DAYS_PER_YEAR: int = Field(default=252, description='Normalize.')
     RISK_FREE_RATE: float = Field(default=.0, description='Normalize.')
+    INCREMENTAL_TECHNICAL: bool = Field(default=False, description='Keep per-symbol Donchian state and update it per candle for TECHNICAL signals.')
+    TAIL_WARM_UP: Optional[int] = Field(default=None, description='Evaluate signals over the last max(LOOK_BACK_WINDOWS) + TAIL_WARM_UP candles only, None for all candles.')
+    TAIL_VALIDATION_RATE: float = Field(default=0., description='Fraction of latest-only evaluations checked against full recomputation (mismatches are logged and replaced).')
 
     # ml config
     MODELS_DIR: str = Field(default='src/models', description='Directory with model-object files.')
     MODEL_FILE: str = Field(default='combo_clf_prod.joblib', description='File name for model use.')
+    MODEL_POLL_INTERVAL: float = Field(default=5., description='Seconds between scans of MODELS_DIR for new or modified bundles (write them with an atomic rename), 0 disables.')
+    MODEL_FOLLOW_LATEST: bool = Field(default=False, description='Activate the most recently modified bundle instead of only MODEL_FILE.')
+    MODEL_MMAP_MODE: Optional[str] = Field(default='r', description='joblib memory-map mode for the arrays of uncompressed bundles, None loads them into memory.')
+    SHADOW_MODELS: Annotated[list[str], ForceDecode] = Field(default=[], description='Model versions (bundle file names without suffix) scoring ML requests in the background for comparison, loaded at startup like MODEL_FILE (other bundles are loaded on first use).')
+    SHADOW_LOG: str = Field(default='shadow.csv', description='CSV the shadow scores and agreement with the primary model are appended to.')
+    SHADOW_WORKERS: int = Field(default=1, description='Background threads scoring shadow models.')
+    SHADOW_QUEUE_SIZE: int = Field(default=1_000, description='Requests waiting for shadow scoring before new ones are dropped.')
+    COMPILE_MODEL: bool = Field(default=False, description='Predict with the classifier compiled to NumPy tree arrays (scaler folded in) instead of LightGBM.')
+    INFERENCE_BATCH_SIZE: int = Field(default=1, description='Max ML requests predicted in one call, 1 disables batching.')
+    INFERENCE_BATCH_WINDOW_MS: float = Field(default=2., description='Max time the first ML request of a batch waits for more.')
+    INCREMENTAL_FEATURES: bool = Field(default=False, description='Keep per-symbol indicator state and update it per candle for ML signals.')
 
 settings = Settings()
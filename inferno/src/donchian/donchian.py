@@ -1,8 +1,15 @@
+from typing import Optional
+import logging
+import math
+
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
 
 from src.types.signal import Suggestion
+from src.utils.validation import TailValidator
+from .kernels import donchian_channels, trailing_stop_positions
+
+logger = logging.getLogger(__name__)
 
 
 class DonchianStrategy:
@@ -13,7 +20,9 @@ class DonchianStrategy:
         MAX_ALLOCATION: float = 2.,
         VOLATILITY_WINDOW: int = 90,
         TRADING_DAYS_PER_YEAR: int = 252,
-        RISK_FREE_RATE: float = .0
+        RISK_FREE_RATE: float = .0,
+        TAIL_WARM_UP: Optional[int] = None,
+        TAIL_VALIDATION_RATE: float = 0.
     ):
         self.LOOK_BACK_WINDOWS = LOOK_BACK_WINDOWS
         self.TARGET_VOLATILITY = TARGET_VOLATILITY
@@ -21,8 +30,22 @@ class DonchianStrategy:
         self.VOLATILITY_WINDOW = VOLATILITY_WINDOW
         self.TRADING_DAYS_PER_YEAR = TRADING_DAYS_PER_YEAR
         self.RISK_FREE_RATE = RISK_FREE_RATE
+        self.TAIL_WARM_UP = TAIL_WARM_UP
 
         self._w_cols = [f'w_{window}' for window in self.LOOK_BACK_WINDOWS]
+        self.validator = TailValidator('donchian', TAIL_VALIDATION_RATE, logger)
+
+    @property
+    def tail_length(self) -> Optional[int]:
+        """Candles the latest-only evaluation runs over, None for all of them.
+
+        The channels need the largest look back window and the volatility its window of
+        returns; the trailing stop state depends on the whole path, so `TAIL_WARM_UP`
+        extra candles are replayed for it to converge to the full history's state.
+        """
+        if self.TAIL_WARM_UP is None:
+            return None
+        return max(max(self.LOOK_BACK_WINDOWS) + self.TAIL_WARM_UP, self.VOLATILITY_WINDOW + 1)
     
     def _calc_volatility(self, data: pd.DataFrame) -> pd.DataFrame:
         """Calculates {VOLATILITY_WINDOW}-day annualized volatility of log returns."""
@@ -39,77 +62,28 @@ class DonchianStrategy:
         df = df.drop(columns=["log_returns"])
         return df
 
-    @staticmethod
-    def _calc_donchian(data: pd.DataFrame, window: int) -> pd.DataFrame:
+    def _calc_windows(self, data: pd.DataFrame) -> pd.DataFrame:
         """
-        Calculates Donchian Channels (based on close), Trailing Stop, and Trading Signal (Pos).
+        Calculates Donchian Channels (based on close), Trailing Stop, Trading Signal (Pos)
+        and position weight for every look back window.
         """
-
-        donchian = ta.donchian(high=data["close"], low=data["close"], lower_length=window, upper_length=window)
-        if donchian is None:
-            raise ValueError(f'Cant calculate ta.donchian')
-        
-        donchian.rename({
-            f'DCL_{window}_{window}': f'DCL_{window}',
-            f'DCM_{window}_{window}': f'DCM_{window}',
-            f'DCU_{window}_{window}': f'DCU_{window}'
-        }, inplace=True, axis=1)
-        
-        data = pd.concat([data, donchian], axis=1)
-        
-        return data
-
-    def _calc_pos_and_trailing_stop(self, data: pd.DataFrame, window: int) -> pd.DataFrame:
-        POS_COL = f'POS_{window}'
-        TRAILING_STOP_COL = f'TRL_STOP_{window}'
-        
-        data[POS_COL] = 0
-        data[TRAILING_STOP_COL] = np.nan
-
-        idx = data.index
-
-        for i in range(1, len(data)):
-            curr_data_idx = idx[i]
-            pred_data_idx = idx[i-1]
-
-            current_close: np.float64 = data.loc[curr_data_idx, "close"] # type: ignore
-            prev_pos: np.float64 = data.loc[pred_data_idx, POS_COL] # type: ignore
-            prev_stop: np.float64 = data.loc[pred_data_idx, TRAILING_STOP_COL] # type: ignore
-            current_dcm: np.float64 = data.loc[curr_data_idx, f'DCM_{window}'] # type: ignore
-            current_dcu: np.float64 = data.loc[curr_data_idx, f'DCU_{window}'] # type: ignore
-            prev_dcm: np.float64 = data.loc[pred_data_idx, f'DCM_{window}'] # type: ignore
-            # Entry condition: previous position was flat AND close hits upper band
-            if prev_pos == 0 and current_close >= current_dcu:
-                data.loc[curr_data_idx, POS_COL] = 1.
-                data.loc[curr_data_idx, TRAILING_STOP_COL] = current_dcm
-
-            # Exit condition: previous position was long AND close hits trailing stop from previous day
-            elif prev_pos == 1 and not np.isnan(prev_stop) and current_close <= prev_stop:
-                data.loc[curr_data_idx, POS_COL] = 0.
-                data.loc[curr_data_idx, TRAILING_STOP_COL] = np.nan
-            
-            # Hold condition: previous position was long and exit not triggered
-            elif prev_pos == 1:
-                data.loc[curr_data_idx, POS_COL] = 1.
-                # Update trailing stop: max of previous stop and previous day midpoint
-                if not np.isnan(prev_stop) and not np.isnan(prev_dcm):
-                    data.loc[curr_data_idx, TRAILING_STOP_COL] = np.maximum(prev_stop, prev_dcm)
-                else:
-                    data.loc[curr_data_idx, TRAILING_STOP_COL] = prev_stop
-            
-            # No position condition (otherwise)
-            else:
-                data.loc[curr_data_idx, POS_COL] = 0.
-                data.loc[curr_data_idx, TRAILING_STOP_COL] = np.nan
-        return data
-
-    def _calc_position(self, data: pd.DataFrame, window: int) -> pd.DataFrame:
-        W_COL = f'w_{window}'
-        POS_COL = f'POS_{window}'
-        weight = np.minimum(self.TARGET_VOLATILITY / data['sigma_t'], self.MAX_ALLOCATION)
-        data[W_COL] = weight * data[POS_COL]
-        data[W_COL] = data[W_COL].fillna(0)
-        return data
+        close = data["close"].to_numpy(dtype=np.float64)
+        channels = donchian_channels(close, self.LOOK_BACK_WINDOWS)
+        weight = np.minimum(self.TARGET_VOLATILITY / data['sigma_t'].to_numpy(), self.MAX_ALLOCATION)
+
+        columns: dict[str, np.ndarray] = {}
+        for i, window in enumerate(self.LOOK_BACK_WINDOWS):
+            dcl, dcm, dcu = channels[3 * i], channels[3 * i + 1], channels[3 * i + 2]
+            pos, trailing_stop = trailing_stop_positions(close, dcm, dcu)
+            columns[f'DCL_{window}'] = dcl
+            columns[f'DCM_{window}'] = dcm
+            columns[f'DCU_{window}'] = dcu
+            columns[f'POS_{window}'] = pos
+            columns[f'TRL_STOP_{window}'] = trailing_stop
+            w = weight * pos
+            columns[f'w_{window}'] = np.where(np.isnan(w), 0., w)
+
+        return pd.concat([data, pd.DataFrame(columns, index=data.index)], axis=1)
 
     def _aggregate_windows(self, data: pd.DataFrame) -> pd.DataFrame:
         data['w_combo'] = data[self._w_cols].mean(axis=1)
@@ -118,18 +92,54 @@ class DonchianStrategy:
 
     def get_weights(self, data: pd.DataFrame) -> pd.DataFrame:
         data = self._calc_volatility(data)
-        for window in self.LOOK_BACK_WINDOWS:
-            data = self._calc_donchian(data, window)
-            data = self._calc_pos_and_trailing_stop(data, window)
-            data = self._calc_position(data, window)
-        data = self._aggregate_windows(data)        
+        data = self._calc_windows(data)
+        data = self._aggregate_windows(data)
         return data
 
+    def get_latest(self, data: pd.DataFrame) -> dict[str, float]:
+        """Last row of `get_weights(data)` (NaNs forward filled) over the last `tail_length` candles.
+
+        Only plain arrays are used and the volatility is computed for the last row only.
+        """
+        tail = data if self.tail_length is None else data.iloc[-self.tail_length:]
+        close = tail['close'].to_numpy(dtype=np.float64)
+
+        # same as the last row of `_calc_volatility`: NaN only if no row has enough returns
+        recent = close[-self.VOLATILITY_WINDOW - 1:]
+        returns = np.log(recent[1:] / recent[:-1])
+        returns = returns[~np.isnan(returns)]
+        sigma = math.nan
+        if len(returns) >= max(self.VOLATILITY_WINDOW // 2, 2):
+            sigma = float(np.std(returns, ddof=1)) * math.sqrt(self.TRADING_DAYS_PER_YEAR) or 1e-6
+        weight = min(self.TARGET_VOLATILITY / sigma, self.MAX_ALLOCATION) if not math.isnan(sigma) else math.nan
+
+        latest = {column: value for column, value in data.iloc[-1].items()}
+        latest['sigma_t'] = sigma
+        channels = donchian_channels(close, self.LOOK_BACK_WINDOWS)
+        for i, window in enumerate(self.LOOK_BACK_WINDOWS):
+            dcl, dcm, dcu = channels[3 * i], channels[3 * i + 1], channels[3 * i + 2]
+            pos, trailing_stop = trailing_stop_positions(close, dcm, dcu)
+            stops = trailing_stop[~np.isnan(trailing_stop)]
+            latest[f'DCL_{window}'] = float(dcl[-1])
+            latest[f'DCM_{window}'] = float(dcm[-1])
+            latest[f'DCU_{window}'] = float(dcu[-1])
+            latest[f'POS_{window}'] = float(pos[-1])
+            latest[f'TRL_STOP_{window}'] = float(stops[-1]) if len(stops) else math.nan
+            w = weight * pos[-1]
+            latest[f'w_{window}'] = 0. if math.isnan(w) else float(w)
+        latest['w_combo'] = sum(latest[column] for column in self._w_cols) / len(self._w_cols)
+        return latest
+
     def get_signal(self, data: pd.DataFrame) -> tuple[int, Suggestion]:
-        data = self.get_weights(data)
-        last_candle = data.iloc[-1]
-        timestamp: int = last_candle['timestamp'] # type: ignore
-        weight = last_candle['w_combo']
+        timestamp: int = data['timestamp'].iloc[-1] # type: ignore
+        if self.tail_length is None:
+            weight = self.get_weights(data)['w_combo'].iloc[-1]
+        else:
+            weight = self.get_latest(data)['w_combo']
+            if self.validator.sample():
+                full = self.get_weights(data)['w_combo'].iloc[-1]
+                if not self.validator.check({'w_combo': weight}, {'w_combo': full}):
+                    weight = full
         suggestion = Suggestion.HOLD
         if weight > 1e-6:
             suggestion = Suggestion.BUY
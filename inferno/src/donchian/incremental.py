@@ -0,0 +1,224 @@
+from typing import Optional
+from collections import deque
+import math
+
+import numpy as np
+import pandas as pd
+
+from src.types.signal import Suggestion
+from .donchian import DonchianStrategy
+
+
+class _RollingExtreme:
+    """Monotonic deque keeping the rolling max (or min) of committed values."""
+
+    def __init__(self, window: int, is_max: bool):
+        self.window = window
+        self.is_max = is_max
+        self._items: deque[tuple[int, float]] = deque()
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a >= b if self.is_max else a <= b
+
+    def push(self, idx: int, value: float) -> None:
+        while self._items and self._dominates(value, self._items[-1][1]):
+            self._items.pop()
+        self._items.append((idx, value))
+        while self._items[0][0] <= idx - self.window:
+            self._items.popleft()
+
+    def peek(self, idx: int, value: float) -> float:
+        """Extreme over the window ending at a not yet committed `idx` holding `value`."""
+        if idx < self.window - 1:
+            return np.nan
+        extreme = value
+        for item_idx, item_value in self._items:
+            # committed entries only reach one row past the window, skip it
+            if item_idx <= idx - self.window:
+                continue
+            if self._dominates(item_value, extreme):
+                extreme = item_value
+            break
+        return extreme
+
+
+class _RollingStd:
+    """Rolling sample std of log returns (same window semantics as pandas rolling)."""
+
+    def __init__(self, window: int, min_periods: int):
+        self.window = window
+        self.min_periods = min_periods
+        self._values: deque[float] = deque()
+        self._sum = 0.
+        self._sum_sq = 0.
+        self._pushes = 0
+
+    def push(self, value: float) -> None:
+        self._values.append(value)
+        self._sum += value
+        self._sum_sq += value * value
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            self._sum -= old
+            self._sum_sq -= old * old
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            # drop accumulated rounding error once per full window
+            self._sum = math.fsum(self._values)
+            self._sum_sq = math.fsum(v * v for v in self._values)
+
+    def peek(self, value: float) -> float:
+        """Std over the committed values plus a not yet committed `value`."""
+        count = len(self._values) + 1
+        total = self._sum + value
+        total_sq = self._sum_sq + value * value
+        if count > self.window:
+            old = self._values[0]
+            count -= 1
+            total -= old
+            total_sq -= old * old
+        if count < max(self.min_periods, 2):
+            return np.nan
+        variance = (total_sq - total * total / count) / (count - 1)
+        return math.sqrt(variance) if variance > 0 else 0.
+
+
+class _WindowState:
+    def __init__(self, window: int):
+        self.upper = _RollingExtreme(window, is_max=True)
+        self.lower = _RollingExtreme(window, is_max=False)
+        self.pos = 0
+        self.stop = np.nan
+        self.dcm = np.nan
+
+    def step(self, idx: int, close: float) -> tuple[int, float, float]:
+        """Position, trailing stop and midline for row `idx` without committing it."""
+        dcu = self.upper.peek(idx, close)
+        dcl = self.lower.peek(idx, close)
+        dcm = 0.5 * (dcl + dcu)
+        if idx == 0:
+            return 0, np.nan, dcm
+
+        pos, stop = self.pos, self.stop
+        if pos == 0 and close >= dcu:
+            pos, stop = 1, dcm
+        elif pos == 1 and not math.isnan(stop) and close <= stop:
+            pos, stop = 0, np.nan
+        elif pos == 1:
+            if not math.isnan(stop) and not math.isnan(self.dcm):
+                stop = max(stop, self.dcm)
+        else:
+            pos, stop = 0, np.nan
+        return pos, stop, dcm
+
+    def commit(self, idx: int, close: float) -> None:
+        self.pos, self.stop, self.dcm = self.step(idx, close)
+        self.upper.push(idx, close)
+        self.lower.push(idx, close)
+
+
+class IncrementalDonchian:
+    """Streaming Donchian state for one symbol.
+
+    Every candle except the latest one is folded into the rolling state. The latest
+    candle stays pending so that updates with the same `t` only re-apply the last step.
+    """
+
+    def __init__(self, strategy: DonchianStrategy):
+        self._strategy = strategy
+        self._windows = {window: _WindowState(window) for window in strategy.LOOK_BACK_WINDOWS}
+        self._std = _RollingStd(strategy.VOLATILITY_WINDOW, strategy.VOLATILITY_WINDOW // 2)
+        self._idx = -1
+        self._last_close = np.nan
+        self._pending: Optional[tuple[int, float]] = None
+        self._last_committed: Optional[int] = None
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return self._pending[0] if self._pending is not None else None
+
+    @property
+    def last_committed_timestamp(self) -> Optional[int]:
+        return self._last_committed
+
+    def _commit(self, close: float) -> None:
+        self._idx += 1
+        for state in self._windows.values():
+            state.commit(self._idx, close)
+        if self._idx > 0:
+            self._std.push(math.log(close / self._last_close))
+        self._last_close = close
+
+    def update(self, timestamp: int, close: float) -> None:
+        """Fold in a new candle, or replace the pending one if `timestamp` did not change."""
+        if self._pending is not None:
+            pending_timestamp, pending_close = self._pending
+            if timestamp < pending_timestamp:
+                return
+            if timestamp > pending_timestamp:
+                self._commit(pending_close)
+                self._last_committed = pending_timestamp
+        self._pending = (timestamp, close)
+
+    def weights(self) -> dict[int, float]:
+        """Per-window weights for the pending candle."""
+        if self._pending is None:
+            raise RuntimeError('No candles were folded in yet')
+        _, close = self._pending
+        idx = self._idx + 1
+        log_return = math.log(close / self._last_close) if idx > 0 else np.nan
+        sigma = self._std.peek(log_return) * math.sqrt(self._strategy.TRADING_DAYS_PER_YEAR)
+        if sigma == 0:
+            sigma = 1e-6
+        weight = min(self._strategy.TARGET_VOLATILITY / sigma, self._strategy.MAX_ALLOCATION)
+
+        weights = {}
+        for window, state in self._windows.items():
+            pos, _, _ = state.step(idx, close)
+            w = weight * pos
+            weights[window] = 0. if math.isnan(w) else w
+        return weights
+
+    def get_signal(self) -> tuple[int, Suggestion]:
+        weights = self.weights()
+        timestamp, _ = self._pending # type: ignore
+        suggestion = Suggestion.HOLD
+        if sum(weights.values()) / len(weights) > 1e-6:
+            suggestion = Suggestion.BUY
+        return timestamp, suggestion
+
+
+class IncrementalDonchianStrategy:
+    """Keeps an IncrementalDonchian per key (symbol and interval) and feeds it only the candles it has not seen."""
+
+    def __init__(self, strategy: DonchianStrategy):
+        self._strategy = strategy
+        self._engines: dict[str, IncrementalDonchian] = {}
+
+    def reset(self, key: str) -> None:
+        self._engines.pop(key, None)
+
+    def drop_symbol(self, symbol: str) -> None:
+        """Forget the engines of every interval of `symbol`, e.g. once it is no longer collected."""
+        for key in [key for key in self._engines if key.split(':', 1)[0] == symbol]:
+            self._engines.pop(key, None)
+
+    def sync(self, key: str, candles: pd.DataFrame) -> IncrementalDonchian:
+        timestamps = candles['timestamp'].to_numpy()
+        engine = self._engines.get(key)
+        start = 0
+        if engine is not None and engine.last_timestamp is not None:
+            start = int(np.searchsorted(timestamps, engine.last_timestamp, side='left'))
+            if start > 0 and timestamps[start - 1] != engine.last_committed_timestamp:
+                # rows were inserted before the pending one (backfill), start over
+                engine, start = None, 0
+        if engine is None:
+            engine = self._engines[key] = IncrementalDonchian(self._strategy)
+
+        closes = candles['close'].to_numpy(dtype=np.float64)
+        for timestamp, close in zip(timestamps[start:].tolist(), closes[start:].tolist()):
+            engine.update(timestamp, close)
+        return engine
+
+    def get_signal(self, key: str, candles: pd.DataFrame) -> tuple[int, Suggestion]:
+        return self.sync(key, candles).get_signal()
@@ -0,0 +1,109 @@
+from typing import Optional
+import math
+
+import numpy as np
+
+
+def _rolling_extreme(values: np.ndarray, window: int, is_max: bool, out: np.ndarray) -> np.ndarray:
+    """Rolling max/min with full-window semantics (van Herk/Gil-Werman, O(n) per window)."""
+    n = len(values)
+    out[:min(max(window - 1, 0), n)] = np.nan
+    if window <= 0 or window > n:
+        out[:] = np.nan
+        return out
+
+    reduce = np.maximum if is_max else np.minimum
+    blocks = -(-n // window)
+    padded = np.full(blocks * window, -np.inf if is_max else np.inf, dtype=np.float64)
+    padded[:n] = values
+    padded = padded.reshape(blocks, window)
+
+    prefix = reduce.accumulate(padded, axis=1).ravel()
+    suffix = reduce.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    # window [j - window + 1, j] = suffix of its first block + prefix of its last block
+    reduce(suffix[:n - window + 1], prefix[window - 1:n], out=out[window - 1:])
+    return out
+
+
+def donchian_channels(
+    values: np.ndarray,
+    windows: list[int],
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Computes DCL/DCM/DCU for every window in one batch.
+
+    Args:
+        values: Series the channels are built on (close prices).
+        windows: Look back windows.
+        out: Optional preallocated array of shape (3 * len(windows), len(values)).
+
+    Returns:
+        2-D array with rows DCL, DCM, DCU for windows[0], then for windows[1], and so on.
+        Rows are NaN until a window is full, same as `ta.donchian`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    shape = (3 * len(windows), len(values))
+    if out is None:
+        out = np.empty(shape, dtype=np.float64)
+    elif out.shape != shape:
+        raise ValueError(f'Expected output of shape {shape}, got {out.shape}')
+
+    for i, window in enumerate(windows):
+        dcl, dcm, dcu = out[3 * i], out[3 * i + 1], out[3 * i + 2]
+        _rolling_extreme(values, window, is_max=False, out=dcl)
+        _rolling_extreme(values, window, is_max=True, out=dcu)
+        np.add(dcl, dcu, out=dcm)
+        dcm *= 0.5
+    return out
+
+
+def trailing_stop_positions(
+    close: np.ndarray,
+    dcm: np.ndarray,
+    dcu: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Runs the long-only Donchian breakout state machine over plain arrays.
+
+    Args:
+        close: Close prices.
+        dcm: Donchian channel midline for the same rows.
+        dcu: Donchian channel upper band for the same rows.
+
+    Returns:
+        Tuple of positions (0/1, int64) and trailing stops (float64, NaN while flat).
+    """
+    n = len(close)
+    pos = [0] * n
+    stop = [np.nan] * n
+
+    # python floats make the per-row comparisons much cheaper than numpy scalars
+    close_ = np.asarray(close, dtype=np.float64).tolist()
+    dcm_ = np.asarray(dcm, dtype=np.float64).tolist()
+    dcu_ = np.asarray(dcu, dtype=np.float64).tolist()
+
+    prev_pos = 0
+    prev_stop = np.nan
+    for i in range(1, n):
+        current_close = close_[i]
+        # Entry condition: previous position was flat AND close hits upper band
+        if prev_pos == 0 and current_close >= dcu_[i]:
+            prev_pos, prev_stop = 1, dcm_[i]
+
+        # Exit condition: previous position was long AND close hits trailing stop from previous day
+        elif prev_pos == 1 and not math.isnan(prev_stop) and current_close <= prev_stop:
+            prev_pos, prev_stop = 0, np.nan
+
+        # Hold condition: previous position was long and exit not triggered
+        elif prev_pos == 1:
+            prev_dcm = dcm_[i - 1]
+            # Update trailing stop: max of previous stop and previous day midpoint
+            if not math.isnan(prev_stop) and not math.isnan(prev_dcm):
+                prev_stop = max(prev_stop, prev_dcm)
+
+        # No position condition (otherwise)
+        else:
+            prev_pos, prev_stop = 0, np.nan
+
+        pos[i] = prev_pos
+        stop[i] = prev_stop
+    return np.array(pos, dtype=np.int64), np.array(stop, dtype=np.float64)
@@ -0,0 +1,81 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Event, Lock
+from typing import Any, Callable
+import logging
+
+from .connection import CandleFeed, INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+
+class PendingBackfill:
+    """Gaps of one symbol waiting to be filled, and closed candles held back meanwhile."""
+
+    def __init__(self):
+        self.ranges: list[tuple[int, int]] = []
+        self.closed: list[dict[str, Any]] = []
+        self.done = Event()
+
+
+class GapBackfiller:
+    """Fetches missing candles with bounded, paginated snapshot calls on a background pool."""
+
+    def __init__(
+        self,
+        connection: CandleFeed,
+        interval: str,
+        page_size: int = 500,
+        max_pages: int = 20,
+        workers: int = 2
+    ):
+        self._connection = connection
+        self._interval = interval
+        self._interval_ms = INTERVAL_MS[interval]
+        self._page_size = page_size
+        self._max_pages = max_pages
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backfill')
+        self._stats_lock = Lock()
+        self._stats = {
+            'gaps': 0,
+            'missing_candles': 0,
+            'backfilled_candles': 0,
+            'pages': 0,
+            'failures': 0,
+        }
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._stats_lock:
+            return self._stats.copy()
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        return self._executor.submit(fn, *args)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def fetch(self, symbol: str, start_time: int, end_time: int) -> list[dict[str, Any]]:
+        """Candles with `start_time <= t <= end_time`, oldest first.
+
+        At most `max_pages * page_size` candles are fetched; for longer gaps only the
+        newest part is, as older candles would not fit the buffers anyway.
+        """
+        span = self._page_size * self._interval_ms
+        start_time = max(start_time, end_time - self._max_pages * span + self._interval_ms)
+
+        candles: list[dict[str, Any]] = []
+        page_start = start_time
+        while page_start <= end_time:
+            page_end = min(page_start + span - 1, end_time)
+            page = self._connection.candles_snapshot(
+                symbol, self._interval, self._page_size, start_time=page_start, end_time=page_end
+            )
+            self.count('pages')
+            candles.extend(c for c in page if page_start <= int(c['t']) <= page_end)
+            page_start = page_end + 1
+        self.count('backfilled_candles', len(candles))
+        return candles
@@ -0,0 +1,187 @@
+from itertools import count
+from typing import Any, Iterable, Optional
+from threading import Lock
+from time import sleep
+
+import numpy as np
+
+
+CANDLE_FIELDS: dict[str, type] = {
+    't': np.int64,
+    'T': np.int64,
+    'o': np.float64,
+    'h': np.float64,
+    'l': np.float64,
+    'c': np.float64,
+    'v': np.float64,
+}
+
+
+class CandleBuffer:
+    """Fixed-capacity, column-oriented ring buffer of candles for one symbol.
+
+    Every column is stored twice back to back (`2 * capacity` slots), so the
+    buffered candles are always one contiguous slice and can be handed out as
+    zero-copy views ordered from oldest to newest.
+
+    Writers bump a sequence number to an odd value before touching the buffer and
+    back to an even one afterwards (a seqlock). Readers take consistent snapshots
+    by copying and retrying if the sequence moved, so they never lock and writers
+    never wait on them. Concurrent writers are serialized by a writer-only lock.
+    """
+
+    # distinguishes buffers in this process, `version` restarts with a new buffer
+    _generations = count(1)
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f'Capacity must be positive, got {capacity}')
+        self._capacity = capacity
+        self._columns = {
+            name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in CANDLE_FIELDS.items()
+        }
+        self._head = 0
+        self._size = 0
+        self._seq = 0
+        self._write_lock = Lock()
+        self.generation = next(CandleBuffer._generations)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        if self._size == 0:
+            return None
+        return int(self._columns['t'][self._head + self._size - 1])
+
+    @property
+    def version(self) -> int:
+        """Number of completed writes."""
+        return self._seq // 2
+
+    # There are no memory barriers around the sequence number: between threads the GIL
+    # orders the writes (taking and dropping it is a full barrier). `SharedCandleBuffer`
+    # readers in other processes depend on the CPU keeping the stores in program order,
+    # which x86 (TSO) does and ARM or POWER don't.
+    def _begin_write(self) -> None:
+        self._write_lock.acquire()
+        self._seq += 1
+
+    def _end_write(self) -> None:
+        self._seq += 1
+        self._write_lock.release()
+
+    def _write(self, slot: int, candle: dict[str, Any]) -> None:
+        for name, column in self._columns.items():
+            value = candle[name]
+            column[slot] = value
+            column[slot + self._capacity] = value
+
+    def _append(self, candle: dict[str, Any]) -> None:
+        if self._size < self._capacity:
+            slot = (self._head + self._size) % self._capacity
+            self._write(slot, candle)
+            self._size += 1
+        else:
+            self._write(self._head, candle)
+            self._head = (self._head + 1) % self._capacity
+
+    def _merge(self, candle: dict[str, Any]) -> bool:
+        if self._size and self.last_timestamp == int(candle['t']):
+            self._write((self._head + self._size - 1) % self._capacity, candle)
+            return False
+        self._append(candle)
+        return True
+
+    def append(self, candle: dict[str, Any]) -> None:
+        """Append a candle, overwriting the oldest one when the buffer is full."""
+        self._begin_write()
+        try:
+            self._append(candle)
+        finally:
+            self._end_write()
+
+    def merge(self, candle: dict[str, Any]) -> bool:
+        """Update the latest candle in place if `t` matches, append otherwise.
+
+        Returns:
+            True if a new candle was appended
+        """
+        self._begin_write()
+        try:
+            return self._merge(candle)
+        finally:
+            self._end_write()
+
+    def extend(self, candles: Iterable[dict[str, Any]]) -> None:
+        self._begin_write()
+        try:
+            for candle in candles:
+                self._merge(candle)
+        finally:
+            self._end_write()
+
+    def load(self, columns: dict[str, np.ndarray]) -> None:
+        """Replace the buffer contents with (the newest `capacity` rows of) `columns`."""
+        self._begin_write()
+        try:
+            size = min(len(columns['t']), self._capacity)
+            for name, column in self._columns.items():
+                values = columns[name][len(columns[name]) - size:]
+                column[:size] = values
+                column[self._capacity:self._capacity + size] = values
+            self._head = 0
+            self._size = size
+        finally:
+            self._end_write()
+
+    def last_candle(self) -> Optional[dict[str, Any]]:
+        """The newest candle as a dict of python scalars."""
+        if self._size == 0:
+            return None
+        slot = self._head + self._size - 1
+        return {name: column[slot].item() for name, column in self._columns.items()}
+
+    def clear(self) -> None:
+        self._begin_write()
+        self._head = 0
+        self._size = 0
+        self._end_write()
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Consistent, immutable copy of the buffered candles from oldest to newest.
+
+        Safe to call from any thread while writers are active.
+        """
+        while True:
+            seq = self._seq
+            if seq % 2:
+                # a write is in progress, let the writer thread run
+                sleep(0)
+                continue
+            head, size = self._head, self._size
+            columns = {
+                name: column[head:head + size].copy() for name, column in self._columns.items()
+            }
+            if self._seq == seq:
+                break
+        for column in columns.values():
+            column.flags.writeable = False
+        return columns
+
+    def view(self) -> dict[str, np.ndarray]:
+        """Read-only, zero-copy columns of the buffered candles from oldest to newest.
+
+        The view tracks later writes, use `snapshot` when writers run on another thread.
+        """
+        columns = {}
+        for name, column in self._columns.items():
+            view = column[self._head:self._head + self._size]
+            view.flags.writeable = False
+            columns[name] = view
+        return columns
@@ -1,8 +1,19 @@
-from typing import Any
+from typing import Any, Callable, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from threading import Event, Lock, RLock
 import logging
 
-from .connection import HyperliquidConnection
+import numpy as np
+
+from .backfill import GapBackfiller, PendingBackfill
+from .buffer import CandleBuffer
+from .connection import CandleFeed, HyperliquidConnection, INTERVAL_MS
+from .resample import CandleResampler
+from .storage import CandleStore
+from src.types.error import UnknownSymbolError, UnsupportedIntervalError
+from src.utils.error import log_raise
 
 logger = logging.getLogger(__name__)
 
@@ -13,17 +24,48 @@ class HyperliquidCollector:
         test_net: bool,
         symbols: list[str],
         interval: str,
-        max_candles: int
+        max_candles: int,
+        max_symbols: Optional[int] = None,
+        storage_dir: Optional[str] = None,
+        backfill_page_size: int = 500,
+        backfill_max_pages: int = 20,
+        backfill_workers: int = 2,
+        connection: Optional[CandleFeed] = None,
+        buffer_factory: Optional[Callable[[str, int], CandleBuffer]] = None
     ):
-        self._connection = HyperliquidConnection(test_net=test_net)
+        # a replay feed (see `replay.ReplayConnection`) can stand in for the exchange
+        self._connection = connection or HyperliquidConnection(test_net=test_net)
+        # (symbol, capacity) -> base interval buffer, e.g. one in shared memory (see `shared.SharedCandleBuffer`)
+        self._buffer_factory = buffer_factory or (lambda symbol, capacity: CandleBuffer(capacity))
         self._symbols = symbols
         self._interval = interval
         self._max_candles = max_candles
-        self.candles: dict[str, list[dict[str, Any]]] = {}
+        self._max_symbols = max_symbols
+        self._storage_dir = storage_dir
+        # least recently requested symbol first
+        self.candles: OrderedDict[str, CandleBuffer] = OrderedDict()
+        # higher intervals built locally from the `interval` stream
+        self._resamplers: dict[str, dict[str, CandleResampler]] = {}
+        # closed candles of collected symbols persisted under `storage_dir`
+        self._stores: dict[str, CandleStore] = {}
+        # symbols with missing candles being fetched in the background
+        self._backfills: dict[str, PendingBackfill] = {}
+        self._backfiller = GapBackfiller(
+            self._connection, interval,
+            page_size=backfill_page_size,
+            max_pages=backfill_max_pages,
+            workers=backfill_workers
+        )
+        self._subscription_lock = Lock()
+        self._ready = Event()
+        # serializes writers (websocket updates and resampler seeding), readers never take it
+        self._merge_lock = RLock()
+        # called with the symbol after it is evicted, e.g. to drop per-symbol state
+        self._eviction_listeners: list[Callable[[str], None]] = []
 
     @property
     def symbols(self):
-        return self._symbols
+        return list(self.candles.keys())
 
     @property
     def interval(self):
@@ -33,40 +75,272 @@ class HyperliquidCollector:
     def max_candles(self):
         return self._max_candles
 
-    def start(self):
-        for symbol in self._symbols:
-            self.candles[symbol] = self._connection.candles_snapshot(
-                symbol, self._interval, self.max_candles
-            )
-            self._connection.subscribe(
-                interval=self._interval,
-                coin=symbol,
-                callback=self.handle_message
-            )
+    @property
+    def max_symbols(self):
+        return self._max_symbols
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def start(self, workers: int = 8):
+        """Fetch snapshots of all start symbols concurrently, then subscribe to them."""
+        symbols = [symbol for symbol in dict.fromkeys(self._symbols) if symbol not in self.candles]
+        for symbol in symbols:
+            if symbol not in self._connection.perps:
+                log_raise(f'Unknown symbol: {symbol}', logger, UnknownSymbolError)
+
+        if symbols:
+            with ThreadPoolExecutor(max_workers=min(workers, len(symbols)), thread_name_prefix='snapshot') as pool:
+                buffers = list(pool.map(self._load_buffer, symbols))
+            with self._subscription_lock:
+                for symbol, buffer in zip(symbols, buffers):
+                    self._register(symbol, buffer)
+        self._ready.set()
         logger.debug(f'started collection for symbols: {self.symbols} (interval: {self.interval})')
 
+    @property
+    def gap_stats(self) -> dict[str, int]:
+        """Counters of detected gaps, missing/backfilled candles, snapshot pages and failures."""
+        return self._backfiller.stats
+
     def stop(self):
-        for symbol in self._symbols:
-            self._connection.unsubscribe(self._interval, symbol)
+        self._backfiller.shutdown()
+        with self._subscription_lock:
+            while self.candles:
+                self._evict(next(iter(self.candles)))
+
+    def ensure_symbol(self, symbol: str) -> CandleBuffer:
+        """Return the candle buffer of `symbol`, subscribing to it on first use.
+
+        New subscriptions are backfilled with a snapshot; once more than `max_symbols`
+        are collected, the least recently requested one is unsubscribed and dropped.
+        """
+        buffer = self.candles.get(symbol)
+        if buffer is not None:
+            try:
+                self.candles.move_to_end(symbol)
+            except KeyError:
+                pass # evicted meanwhile, the caller still gets the last candles
+            return buffer
+
+        if symbol not in self._connection.perps:
+            log_raise(f'Unknown symbol: {symbol}', logger, UnknownSymbolError)
+
+        with self._subscription_lock:
+            buffer = self.candles.get(symbol)
+            if buffer is not None:
+                return buffer
+
+            buffer = self._load_buffer(symbol)
+            self._register(symbol, buffer)
+        return buffer
+
+    def _register(self, symbol: str, buffer: CandleBuffer) -> None:
+        self.candles[symbol] = buffer
+        self._connection.subscribe(
+            interval=self._interval,
+            coin=symbol,
+            callback=self.handle_message
+        )
+        logger.debug(f'subscribed to {symbol} (interval: {self.interval})')
+
+        if self.max_symbols is not None:
+            while len(self.candles) > self.max_symbols:
+                self._evict(next(iter(self.candles)))
+
+    def _load_buffer(self, symbol: str) -> CandleBuffer:
+        """Fill a new buffer from the on-disk store (if any) and fetch only the missing candles."""
+        buffer = self._buffer_factory(symbol, self.max_candles)
+        start_time = None
+        store = None
+        if self._storage_dir is not None:
+            store = self._stores[symbol] = CandleStore.open(self._storage_dir, symbol, self._interval)
+            if store.last_timestamp is not None:
+                buffer.load(store.read(self.max_candles))
+                start_time = store.last_timestamp + INTERVAL_MS[self._interval]
+
+        candles = self._connection.candles_snapshot(
+            symbol, self._interval, self.max_candles, start_time=start_time
+        )
+        if start_time is not None and candles and int(candles[0]['t']) > start_time:
+            # down for longer than the snapshot reaches back, page what the store misses
+            candles = self._fetch_missing(symbol, start_time, int(candles[0]['t']) - INTERVAL_MS[self._interval]) + candles
+        buffer.extend(candles)
+        if store is not None:
+            # the newest candle is still open, it is stored once the next one arrives
+            store.append(candles[:-1])
+        logger.debug(f'loaded {symbol}: {len(buffer)} candles, {len(candles)} fetched')
+        return buffer
+
+    def _fetch_missing(self, symbol: str, start_time: int, end_time: int) -> list[dict[str, Any]]:
+        """Candles from `start_time` to `end_time` the store is missing, empty if fetching fails."""
+        missing = (end_time - start_time) // INTERVAL_MS[self._interval] + 1
+        logger.warning(f"Store of {symbol} misses {missing} candles from {start_time} to {end_time}")
+        self._backfiller.count('gaps')
+        self._backfiller.count('missing_candles', missing)
+        try:
+            candles = self._backfiller.fetch(symbol, start_time, end_time)
+        except Exception as e:
+            self._backfiller.count('failures')
+            logger.error(f"Error fetching missing candles of {symbol}: {str(e)}")
+            return []
+        if len(candles) < missing:
+            logger.warning(f"Store of {symbol} keeps a gap of {missing - len(candles)} candles before {end_time}")
+        return candles
+
+    def ensure_interval(self, symbol: str, interval: str) -> CandleBuffer:
+        """Return the `interval` candle buffer of `symbol`, aggregated from the base stream.
+
+        The first request seeds the buffer from one snapshot of that interval; from then
+        on it is only updated from base interval candles, without another subscription.
+        """
+        base = self.ensure_symbol(symbol)
+        if interval == self._interval:
+            return base
+
+        resampler = self._resamplers.get(symbol, {}).get(interval)
+        if resampler is not None:
+            return resampler.buffer
+
+        base_ms = INTERVAL_MS[self._interval]
+        if interval not in INTERVAL_MS or INTERVAL_MS[interval] % base_ms or INTERVAL_MS[interval] < base_ms:
+            log_raise(f'Unsupported interval: {interval}', logger, UnsupportedIntervalError)
+
+        snapshot = self._connection.candles_snapshot(symbol, interval, self.max_candles)
+        with self._merge_lock:
+            resampler = self._resamplers.get(symbol, {}).get(interval)
+            if resampler is None:
+                resampler = CandleResampler(interval, CandleBuffer(self.max_candles))
+                resampler.seed(base.view(), snapshot)
+                self._resamplers.setdefault(symbol, {})[interval] = resampler
+                logger.debug(f'aggregating {symbol} {interval} candles from {self.interval}')
+        return resampler.buffer
+
+    def add_eviction_listener(self, listener: Callable[[str], None]) -> None:
+        """Call `listener(symbol)` whenever a symbol is dropped from collection."""
+        self._eviction_listeners.append(listener)
+
+    def _evict(self, symbol: str) -> None:
+        self._connection.unsubscribe(self._interval, symbol)
+        with self._merge_lock:
+            self._resamplers.pop(symbol, None)
+            self._stores.pop(symbol, None)
+        del self.candles[symbol]
+        for listener in self._eviction_listeners:
+            listener(symbol)
+        logger.debug(f'unsubscribed from {symbol} (interval: {self.interval})')
 
     def merge_candle(self, symbol: str, data: dict[str, Any]) -> None:
         """Merge new candle data with existing candles."""
-        if not symbol in self.candles.keys():
-            self.candles[symbol] = [data]
+        buffer = self.candles.get(symbol)
+        if buffer is None:
+            # late message for a symbol that was evicted
             return
 
-        latest_candle = self.candles[symbol][-1]
-        if latest_candle['t'] == data['t']:
-            self.candles[symbol][-1] = data
+        t = int(data['t'])
+        interval_ms = INTERVAL_MS[self._interval]
+        with self._merge_lock:
+            last_timestamp = buffer.last_timestamp
+            if last_timestamp is not None and t < last_timestamp:
+                logger.debug(f"Dropped out of order candle of {symbol} at {t}")
+                return
+
+            store = self._stores.get(symbol)
+            if store is not None and last_timestamp is not None and last_timestamp != t:
+                # the latest candle is closed by this one
+                closed = buffer.last_candle()
+                pending = self._backfills.get(symbol)
+                if pending is not None:
+                    # keep the store ordered, these go in once the gap is filled
+                    pending.closed.append(closed) # type: ignore
+                else:
+                    store.append([closed]) # type: ignore
+            if last_timestamp is not None and t > last_timestamp + interval_ms:
+                self._schedule_backfill(symbol, last_timestamp + interval_ms, t - interval_ms)
+
+            if buffer.merge(data):
+                logger.debug(f"Add new candle to {symbol}")
+            for resampler in self._resamplers.get(symbol, {}).values():
+                resampler.update(data)
+
+    def _schedule_backfill(self, symbol: str, start_time: int, end_time: int) -> None:
+        missing = (end_time - start_time) // INTERVAL_MS[self._interval] + 1
+        logger.warning(f"Gap of {missing} candles in {symbol} from {start_time} to {end_time}")
+        self._backfiller.count('gaps')
+        self._backfiller.count('missing_candles', missing)
+
+        pending = self._backfills.get(symbol)
+        if pending is None:
+            pending = self._backfills[symbol] = PendingBackfill()
+            pending.ranges.append((start_time, end_time))
+            self._backfiller.submit(self._backfill, symbol, pending)
         else:
-            self.candles[symbol].append(data)
-            logger.debug(f"Add new candle to {symbol}")
+            pending.ranges.append((start_time, end_time))
+
+    def _backfill(self, symbol: str, pending: PendingBackfill) -> None:
+        try:
+            while True:
+                with self._merge_lock:
+                    if not pending.ranges or symbol not in self.candles:
+                        self._finish_backfill(symbol, pending)
+                        return
+                    start_time, end_time = pending.ranges.pop(0)
+
+                candles = self._backfiller.fetch(symbol, start_time, end_time)
+
+                with self._merge_lock:
+                    buffer = self.candles.get(symbol)
+                    if buffer is not None:
+                        self._insert(buffer, candles)
+                        pending.closed.extend(candles)
+                logger.info(f"Backfilled {len(candles)} candles of {symbol} from {start_time} to {end_time}")
+        except Exception as e:
+            self._backfiller.count('failures')
+            logger.error(f"Error backfilling {symbol}: {str(e)}")
+            with self._merge_lock:
+                self._finish_backfill(symbol, pending)
 
-    def check_max_candles(self, symbol: str) -> None:
-        """Ensure we don't exceed the maximum number of candles."""
-        if len(self.candles[symbol]) > self.max_candles:
-            self.candles[symbol] = self.candles[symbol][-self.max_candles:]
-            logger.debug(f"Trimmed candles to {self.max_candles}")
+    def _finish_backfill(self, symbol: str, pending: PendingBackfill) -> None:
+        store = self._stores.get(symbol)
+        if store is not None:
+            store.merge(pending.closed)
+        # aggregates over the gap are incomplete, reseed them on next request
+        self._resamplers.pop(symbol, None)
+        self._backfills.pop(symbol, None)
+        pending.done.set()
+
+    @staticmethod
+    def _insert(buffer: CandleBuffer, candles: list[dict[str, Any]]) -> None:
+        """Merge older candles into `buffer` by `t`, keeping buffered ones on conflicts."""
+        if not candles:
+            return
+        current = buffer.view()
+        fetched = CandleBuffer(len(candles))
+        fetched.extend(candles)
+        columns = {
+            name: np.concatenate([current[name], column]) for name, column in fetched.view().items()
+        }
+        _, order = np.unique(columns['t'], return_index=True)
+        buffer.load({name: column[order] for name, column in columns.items()})
+
+    def is_stale(self, symbol: str) -> bool:
+        """Whether `symbol` has missing candles that are still being backfilled."""
+        return symbol in self._backfills
+
+    def wait_for_backfill(self, symbol: str, timeout: Optional[float] = None) -> bool:
+        """Block until pending backfills of `symbol` are done.
+
+        Returns:
+            False if still stale after `timeout` seconds
+        """
+        pending = self._backfills.get(symbol)
+        if pending is None:
+            return True
+        return pending.done.wait(timeout)
 
     def handle_message(self, msg: dict[str, Any]):
         symbol = msg['data']['s']
@@ -77,11 +351,50 @@ class HyperliquidCollector:
         try:
             if 'data' in data:
                 self.merge_candle(symbol, data['data'])
-                self.check_max_candles(symbol)
                 logger.debug(
                     f"Updated candles at {datetime.fromtimestamp(data['data']['t']/1000)}")
         except Exception as e:
             logger.error(f"Error handling candles: {str(e)}")
 
-    def get_candles(self, symbol: str):
-        return self.candles[symbol]
+    def candle_state(self, symbol: str, interval: Optional[str] = None) -> tuple[int, int, Optional[int]]:
+        """Generation, write count and last candle open time of the buffer `get_candles` reads.
+
+        Any merged update, backfill or resampled candle changes it, so it identifies the
+        candles without copying them. The generation tells apart buffers rebuilt after an
+        eviction or backfill, whose write counts start over. Raises like `get_candles`.
+        """
+        buffer = self.ensure_interval(symbol, interval or self._interval)
+        # version first: a write in between only makes the candles newer than the state
+        version = buffer.version
+        return buffer.generation, version, buffer.last_timestamp
+
+    def get_candles(self, symbol: str, interval: Optional[str] = None) -> dict[str, np.ndarray]:
+        """Consistent snapshot of the columns (t/T/o/h/l/c/v) of the buffered candles, oldest first.
+
+        Args:
+            symbol: Perp name
+            interval: Candle interval, defaults to the collected one
+
+        Raises:
+            UnknownSymbolError: If `symbol` is not a Hyperliquid perp
+            UnsupportedIntervalError: If `interval` can't be built from the collected one
+        """
+        return self.ensure_interval(symbol, interval or self._interval).snapshot()
+
+    def get_history(
+        self,
+        symbol: str,
+        n: Optional[int] = None,
+        start_time: Optional[int] = None
+    ) -> dict[str, np.ndarray]:
+        """Closed candles of `symbol` from the on-disk store, not limited by `max_candles`.
+
+        Args:
+            symbol: Perp name
+            n: Only the last `n` candles
+            start_time: Only candles from this timestamp (ms)
+        """
+        if self._storage_dir is None:
+            raise RuntimeError('Candle storage is not configured')
+        store = self._stores.get(symbol) or CandleStore.open(self._storage_dir, symbol, self._interval)
+        return store.read(n, start_time=start_time)
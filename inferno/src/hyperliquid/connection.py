@@ -1,9 +1,40 @@
-from typing import Any, Callable
+from typing import Any, Callable, Optional, Protocol
 from hyperliquid.info import Info
 from hyperliquid.utils.constants import MAINNET_API_URL, TESTNET_API_URL
 from hyperliquid.utils.types import Subscription
 from time import time
 
+
+INTERVAL_MS: dict[str, int] = {
+    "1m": 60 * 1000,
+    "5m": 5 * 60 * 1000,
+    "15m": 15 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "4h": 4 * 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000
+}
+
+
+class CandleFeed(Protocol):
+    """What the collector needs from a market-data source, see `HyperliquidConnection`."""
+
+    @property
+    def perps(self) -> list[str]: ...
+
+    def subscribe(self, interval: str, coin: str, callback: Callable): ...
+
+    def unsubscribe(self, interval: str, coin: str): ...
+
+    def candles_snapshot(
+        self,
+        name: str,
+        interval: str,
+        limit: int,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> list[dict[str, Any]]: ...
+
+
 class HyperliquidConnection:
     def __init__(self, test_net: bool):
         self._info = Info(
@@ -36,18 +67,19 @@ class HyperliquidConnection:
         sub_id = self._subscriptions.pop((coin, interval))
         self._info.unsubscribe(message, sub_id)
 
-    def candles_snapshot(self, name: str, interval: str, limit: int) -> list[dict[str, Any]]:
-        end_time = int(time() * 1000) # ms
-        interval_ms = {
-            "1m": 60 * 1000,
-            "5m": 5 * 60 * 1000,
-            "15m": 15 * 60 * 1000,
-            "1h": 60 * 60 * 1000,
-            "4h": 4 * 60 * 60 * 1000,
-            "1d": 24 * 60 * 60 * 1000
-        }.get(interval, 60 * 1000) # ms
-
-        start_time = end_time - (interval_ms * limit) # ms
+    def candles_snapshot(
+        self,
+        name: str,
+        interval: str,
+        limit: int,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> list[dict[str, Any]]:
+        """Candles of the last `limit` intervals before `end_time` (now), but none before `start_time`."""
+        end_time = end_time or int(time() * 1000) # ms
+        interval_ms = INTERVAL_MS.get(interval, 60 * 1000) # ms
+
+        start_time = max(start_time or 0, end_time - (interval_ms * limit)) # ms
 
         return self._info.candles_snapshot(
             name=name,
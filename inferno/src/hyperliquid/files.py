@@ -0,0 +1,84 @@
+from pathlib import Path
+from typing import Union
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .buffer import CANDLE_FIELDS
+from .storage import CANDLE_DTYPE, STORE_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+CANDLE_SUFFIXES = ('.json', '.csv', STORE_SUFFIX)
+
+# candle fields by their column name in candle frames (see `PreProcessor.convert`)
+CANDLE_COLUMNS = {
+    "t": "timestamp",
+    "T": "end",
+    "o": "open",
+    "c": "close",
+    "h": "high",
+    "l": "low",
+    "v": "volume",
+}
+
+Columns = dict[str, np.ndarray]
+
+
+def read_candle_file(path: Path) -> Columns:
+    """Candle columns (`CANDLE_FIELDS`) of one .json, .csv or collector .candles file."""
+    if path.suffix == '.json':
+        # same layout as HyperliquidConnection.candles_snapshot returns, prices as strings
+        with path.open() as file:
+            candles = json.load(file)
+        return {name: np.array([candle[name] for candle in candles], dtype=dtype) for name, dtype in CANDLE_FIELDS.items()}
+    if path.suffix == STORE_SUFFIX:
+        # read-only, unlike opening a CandleStore, a torn last record is skipped instead of truncated
+        records = np.fromfile(path, dtype=CANDLE_DTYPE, count=path.stat().st_size // CANDLE_DTYPE.itemsize)
+        return {name: np.array(records[name]) for name in CANDLE_DTYPE.names} # type: ignore
+    if path.suffix == '.csv':
+        data = pd.read_csv(path, float_precision='round_trip')
+        if 'timestamp' in data.columns:
+            data = data.rename(columns={column: name for name, column in CANDLE_COLUMNS.items()})
+        return {name: data[name].to_numpy(dtype=dtype) for name, dtype in CANDLE_FIELDS.items()}
+    raise ValueError(f'Unsupported candle file format: {path.suffix}')
+
+
+def load_candle_files(paths: Union[str, Path, list[Union[str, Path]]]) -> Columns:
+    """Loads candle history from files and/or directories of candle files.
+
+    Files are concatenated, de-duplicated by `t` (later files win) and sorted.
+
+    Args:
+        paths: .json (list of raw Hyperliquid candles), .csv (raw candles or candle
+            frames) or collector .candles files, or directories with them
+
+    Returns:
+        Candle columns in the `CandleBuffer` layout
+    """
+    if not isinstance(paths, list):
+        paths = [paths]
+
+    files: list[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix in CANDLE_SUFFIXES))
+        elif path.exists():
+            files.append(path)
+        else:
+            raise FileNotFoundError(f'Candle file not found: {path}')
+    if not files:
+        raise FileNotFoundError(f'No candle files found in: {paths}')
+
+    read = [read_candle_file(file) for file in files]
+    columns = {name: np.concatenate([candles[name] for candles in read]) for name in CANDLE_FIELDS}
+    # stable, so the last of equal timestamps is the one read last
+    order = np.argsort(columns['t'], kind='stable')
+    t = columns['t'][order]
+    if len(t):
+        order = order[np.append(t[1:] != t[:-1], True)]
+    columns = {name: column[order] for name, column in columns.items()}
+    logger.info(f'Loaded {len(order)} candles from {len(files)} files')
+    return columns
@@ -0,0 +1,305 @@
+from collections import defaultdict
+from pathlib import Path
+from threading import Condition, Event, Thread
+from time import perf_counter, sleep
+from typing import Any, Callable, Optional, Union
+import heapq
+import logging
+
+import numpy as np
+
+from .connection import INTERVAL_MS
+from .files import CANDLE_SUFFIXES, Columns, load_candle_files
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_candles(
+    n: int,
+    start_time: int,
+    interval: str = '1m',
+    seed: int = 0,
+    price: float = 100.,
+    volatility: float = 2e-3
+) -> Columns:
+    """Random-walk candles with consistent OHLC and log-normal volume."""
+    rng = np.random.default_rng(seed)
+    interval_ms = INTERVAL_MS[interval]
+    close = price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.concatenate([[price], close[:-1]])
+    wick = np.abs(rng.normal(0, volatility / 2, (2, n)))
+    t = start_time - start_time % interval_ms + interval_ms * np.arange(n, dtype=np.int64)
+    return {
+        't': t,
+        'T': t + interval_ms - 1,
+        'o': open_,
+        'h': np.maximum(open_, close) * (1 + wick[0]),
+        'l': np.minimum(open_, close) * (1 - wick[1]),
+        'c': close,
+        'v': rng.lognormal(3, 1, n),
+    }
+
+
+def load_recorded(paths: Union[str, Path, list[Union[str, Path]]], interval: str = '1m') -> dict[str, Columns]:
+    """Candle columns per symbol from recorded files (see `load_candle_files`).
+
+    The symbol is the file name up to the first `_` (collector stores are named
+    `{symbol}_{interval}.candles`); files of other intervals are skipped.
+    """
+    if not isinstance(paths, list):
+        paths = [paths]
+
+    files: dict[str, list[Path]] = defaultdict(list)
+    for path in map(Path, paths):
+        for file in sorted(path.iterdir()) if path.is_dir() else [path]:
+            if file.suffix not in CANDLE_SUFFIXES:
+                continue
+            symbol, _, file_interval = file.stem.partition('_')
+            if file_interval in ('', interval):
+                files[symbol].append(file)
+    if not files:
+        raise FileNotFoundError(f'No {interval} candle files found in: {paths}')
+
+    candles: dict[str, Columns] = {}
+    for symbol, group in files.items():
+        candles[symbol] = load_candle_files(list(group)) # type: ignore
+    return candles
+
+
+class ReplayClock:
+    """Market time running `speed` times faster than wall time from `start_time`.
+
+    A speed of 0 replays as fast as possible: time then only moves when `advance` is called.
+    """
+
+    def __init__(self, start_time: int, speed: float = 1.):
+        self.speed = speed
+        self._start_time = start_time
+        self._time = start_time
+        self._wall = perf_counter()
+
+    def now(self) -> int:
+        if self.speed > 0:
+            return self._start_time + int((perf_counter() - self._wall) * 1000 * self.speed)
+        return self._time
+
+    def advance(self, time: int) -> None:
+        """Wait until `time` in real-time mode, jump to it otherwise."""
+        if self.speed > 0:
+            delay = (time - self.now()) / 1000 / self.speed
+            if delay > 0:
+                sleep(delay)
+        else:
+            self._time = max(self._time, time)
+
+
+class ReplayConnection:
+    """Drop-in for `HyperliquidConnection` serving recorded or synthetic candles offline.
+
+    Base interval candles are replayed per symbol on a `ReplayClock`, each one as
+    `updates_per_candle` websocket-style updates converging on the final candle; higher
+    intervals are aggregated from it. Callbacks run on one feed thread, like the
+    websocket thread of `hyperliquid.info.Info`. The clock starts `history` candles into
+    the data so snapshots have history from the first request.
+    """
+
+    def __init__(
+        self,
+        candles: dict[str, Columns],
+        interval: str = '1m',
+        speed: float = 1.,
+        updates_per_candle: int = 1,
+        history: int = 500
+    ):
+        if not candles:
+            raise ValueError('No candles to replay')
+        self._interval = interval
+        self._interval_ms = INTERVAL_MS[interval]
+        self._updates = max(updates_per_candle, 1)
+        self._tracks: dict[tuple[str, str], Columns] = {
+            (symbol, interval): columns for symbol, columns in candles.items()
+        }
+        self._perps = list(candles)
+        start_time = max(int(c['t'][min(history, len(c['t']) - 1)]) for c in candles.values())
+        self.clock = ReplayClock(start_time, speed)
+
+        # (update time, sequence, coin, interval, candle index, update number)
+        self._events: list[tuple[int, int, str, str, int, int]] = []
+        self._sequence = 0
+        self._subscriptions: dict[tuple[str, str], list[Callable]] = {}
+        self._condition = Condition()
+        self._closed = Event()
+        self.messages = 0
+        self._thread = Thread(target=self._run, name='replay', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def synthetic(
+        cls,
+        symbols: list[str],
+        n: int = 10_000,
+        start_time: int = 1_700_000_000_000,
+        interval: str = '1m',
+        seed: int = 0,
+        **kwargs: Any
+    ) -> 'ReplayConnection':
+        candles = {
+            symbol: synthetic_candles(n, start_time, interval, seed=seed + i)
+            for i, symbol in enumerate(symbols)
+        }
+        return cls(candles, interval=interval, **kwargs)
+
+    @classmethod
+    def recorded(
+        cls,
+        paths: Union[str, Path, list[Union[str, Path]]],
+        interval: str = '1m',
+        **kwargs: Any
+    ) -> 'ReplayConnection':
+        return cls(load_recorded(paths, interval), interval=interval, **kwargs)
+
+    @property
+    def perps(self):
+        return self._perps
+
+    @property
+    def done(self) -> bool:
+        """Whether all subscribed streams have been replayed to their end."""
+        with self._condition:
+            return not self._events
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._condition:
+            self._condition.notify()
+        self._thread.join()
+
+    def _track(self, coin: str, interval: str) -> Columns:
+        track = self._tracks.get((coin, interval))
+        if track is None:
+            base = self._tracks[(coin, self._interval)]
+            interval_ms = INTERVAL_MS[interval]
+            buckets = base['t'] - base['t'] % interval_ms
+            starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+            track = self._tracks[(coin, interval)] = {
+                't': buckets[starts],
+                'T': buckets[starts] + interval_ms - 1,
+                'o': base['o'][starts],
+                'h': np.maximum.reduceat(base['h'], starts),
+                'l': np.minimum.reduceat(base['l'], starts),
+                'c': base['c'][np.append(starts[1:] - 1, len(buckets) - 1)],
+                'v': np.add.reduceat(base['v'], starts),
+            }
+        return track
+
+    def _update_time(self, track: Columns, index: int, update: int) -> int:
+        duration = int(track['T'][index] - track['t'][index]) + 1
+        return int(track['t'][index]) + duration * update // self._updates - 1
+
+    def _candle(self, coin: str, interval: str, track: Columns, index: int, update: int) -> dict[str, Any]:
+        """Candle `index` as of update `update`, in the string format of the Hyperliquid API."""
+        o, c = float(track['o'][index]), float(track['c'][index])
+        h, l, v = float(track['h'][index]), float(track['l'][index]), float(track['v'][index])
+        if update < self._updates:
+            fraction = update / self._updates
+            c = o + (c - o) * fraction
+            h, l, v = max(o, c), min(o, c), v * fraction
+        return {
+            't': int(track['t'][index]),
+            'T': int(track['T'][index]),
+            's': coin,
+            'i': interval,
+            'o': str(o),
+            'c': str(c),
+            'h': str(h),
+            'l': str(l),
+            'v': str(v),
+            'n': update,
+        }
+
+    def _schedule(self, coin: str, interval: str, index: int, update: int) -> None:
+        track = self._tracks[(coin, interval)]
+        if update > self._updates:
+            index, update = index + 1, 1
+        if index >= len(track['t']):
+            logger.info(f'replay of {coin} {interval} finished')
+            return
+        self._sequence += 1
+        heapq.heappush(
+            self._events,
+            (self._update_time(track, index, update), self._sequence, coin, interval, index, update)
+        )
+
+    def subscribe(self, interval: str, coin: str, callback: Callable):
+        track = self._track(coin, interval)
+        with self._condition:
+            callbacks = self._subscriptions.setdefault((coin, interval), [])
+            callbacks.append(callback)
+            if len(callbacks) == 1:
+                now = self.clock.now()
+                index = int(np.searchsorted(track['t'], now, side='right')) - 1
+                update = 1
+                if index >= 0:
+                    # continue the open candle from its next update
+                    while update <= self._updates and self._update_time(track, index, update) <= now:
+                        update += 1
+                self._schedule(coin, interval, max(index, 0), update)
+                self._condition.notify()
+
+    def unsubscribe(self, interval: str, coin: str):
+        with self._condition:
+            self._subscriptions.pop((coin, interval), None)
+            self._events = [event for event in self._events if event[2:4] != (coin, interval)]
+            heapq.heapify(self._events)
+
+    def candles_snapshot(
+        self,
+        name: str,
+        interval: str,
+        limit: int,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> list[dict[str, Any]]:
+        """Same contract as `HyperliquidConnection.candles_snapshot`, the open candle as of now."""
+        now = self.clock.now()
+        end_time = min(end_time or now, now)
+        start_time = max(start_time or 0, end_time - INTERVAL_MS.get(interval, 60 * 1000) * limit)
+
+        track = self._track(name, interval)
+        first = int(np.searchsorted(track['t'], start_time))
+        last = int(np.searchsorted(track['t'], end_time, side='right'))
+        candles = []
+        for index in range(first, last):
+            update = self._updates
+            if track['T'][index] > now:
+                elapsed = now - int(track['t'][index]) + 1
+                duration = int(track['T'][index] - track['t'][index]) + 1
+                update = min(max(elapsed * self._updates // duration, 1), self._updates)
+            candles.append(self._candle(name, interval, track, index, update))
+        return candles
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            with self._condition:
+                while not self._events and not self._closed.is_set():
+                    self._condition.wait()
+                if self._closed.is_set():
+                    return
+                time = self._events[0][0]
+
+            self.clock.advance(time)
+
+            with self._condition:
+                if not self._events or self._events[0][0] != time:
+                    continue # (un)subscribed meanwhile
+                _, _, coin, interval, index, update = heapq.heappop(self._events)
+                callbacks = list(self._subscriptions.get((coin, interval), []))
+                self._schedule(coin, interval, index, update + 1)
+
+            message = {
+                'channel': 'candle',
+                'data': self._candle(coin, interval, self._tracks[(coin, interval)], index, update)
+            }
+            for callback in callbacks:
+                callback(message)
+            self.messages += 1
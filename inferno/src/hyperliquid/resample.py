@@ -0,0 +1,105 @@
+from typing import Any, Optional
+
+import numpy as np
+
+from .buffer import CandleBuffer
+from .connection import INTERVAL_MS
+
+
+def _combine(first: dict[str, Any], last: dict[str, Any]) -> dict[str, Any]:
+    return {
+        'o': first['o'],
+        'h': max(first['h'], last['h']),
+        'l': min(first['l'], last['l']),
+        'c': last['c'],
+        'v': first['v'] + last['v'],
+    }
+
+
+def _parse(candle: dict[str, Any]) -> dict[str, Any]:
+    return {
+        't': int(candle['t']),
+        'o': float(candle['o']),
+        'h': float(candle['h']),
+        'l': float(candle['l']),
+        'c': float(candle['c']),
+        'v': float(candle['v']),
+    }
+
+
+class CandleResampler:
+    """Builds higher-timeframe candles from base interval (1m) updates.
+
+    Buckets are aligned to the epoch like Hyperliquid's own candles. Base candles of
+    the current bucket that are already closed are folded into one aggregate, so an
+    update of the open base candle only re-combines two candles.
+    """
+
+    def __init__(self, interval: str, buffer: CandleBuffer):
+        if interval not in INTERVAL_MS:
+            raise ValueError(f'Unsupported interval: {interval}')
+        self.interval = interval
+        self.buffer = buffer
+        self._interval_ms = INTERVAL_MS[interval]
+        self._bucket: Optional[int] = None
+        self._closed: Optional[dict[str, Any]] = None
+        self._current: Optional[dict[str, Any]] = None
+
+    def _emit(self) -> None:
+        assert self._bucket is not None and self._current is not None
+        aggregate = self._current if self._closed is None else _combine(self._closed, self._current)
+        self.buffer.merge({
+            't': self._bucket,
+            'T': self._bucket + self._interval_ms - 1,
+            **{key: aggregate[key] for key in ('o', 'h', 'l', 'c', 'v')}
+        })
+
+    def update(self, candle: dict[str, Any]) -> None:
+        """Fold in a new or updated base interval candle."""
+        candle = _parse(candle)
+        bucket = candle['t'] - candle['t'] % self._interval_ms
+        if self._bucket is None or bucket > self._bucket:
+            self._bucket, self._closed, self._current = bucket, None, candle
+        elif bucket < self._bucket:
+            return
+        else:
+            assert self._current is not None
+            if candle['t'] > self._current['t']:
+                self._closed = (
+                    self._current if self._closed is None else _combine(self._closed, self._current)
+                )
+                self._current = candle
+            elif candle['t'] == self._current['t']:
+                self._current = candle
+            else:
+                return
+        self._emit()
+
+    def seed(self, base: dict[str, np.ndarray], snapshot: list[dict[str, Any]]) -> None:
+        """Start from a snapshot of this interval and the base candles collected so far.
+
+        The current bucket is rebuilt from base candles when they reach back to its start.
+        Otherwise the snapshot's bucket candle stands in for the base candles before the
+        open one (its volume less that of the open base candle).
+        """
+        self.buffer.extend(snapshot)
+        if len(base['t']) == 0:
+            return
+
+        last_t = int(base['t'][-1])
+        bucket = last_t - last_t % self._interval_ms
+        start = int(np.searchsorted(base['t'], bucket))
+        rows = [
+            {key: base[key][i].item() for key in ('t', 'o', 'h', 'l', 'c', 'v')}
+            for i in range(start, len(base['t']))
+        ]
+
+        self._bucket, self._closed, self._current = bucket, None, rows[-1]
+        if int(base['t'][0]) > bucket and snapshot and int(snapshot[-1]['t']) == bucket:
+            closed = _parse(snapshot[-1])
+            closed['v'] = max(closed['v'] - self._current['v'], 0.)
+            self._closed = closed
+        else:
+            for row in rows[:-1]:
+                self._closed = row if self._closed is None else _combine(self._closed, row)
+        self._emit()
@@ -0,0 +1,181 @@
+from functools import cache
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from time import monotonic, sleep
+from typing import Optional
+import logging
+import platform
+
+import numpy as np
+
+from .buffer import CANDLE_FIELDS, CandleBuffer
+from src.types.error import UnknownSymbolError, UnsupportedIntervalError
+from src.utils.error import log_raise
+
+logger = logging.getLogger(__name__)
+
+# seq, head, size, stale, capacity
+HEADER_FIELDS = 5
+# CPUs that keep stores (and loads) in program order, which the seqlock relies on
+TSO_MACHINES = ('x86_64', 'amd64', 'i386', 'i686', 'x86')
+
+
+@cache
+def _check_memory_order() -> None:
+    machine = platform.machine()
+    if machine.lower() not in TSO_MACHINES:
+        logger.warning(
+            f'shared candle buffers assume x86 memory ordering, readers on {machine} may take torn snapshots'
+        )
+
+
+class _HeaderField:
+    """`CandleBuffer` state kept in the shared header, so every process sees the same."""
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def __get__(self, buffer: Optional['SharedCandleBuffer'], owner: type) -> int:
+        if buffer is None:
+            return self # type: ignore
+        return int(buffer._header[self.index])
+
+    def __set__(self, buffer: 'SharedCandleBuffer', value: int) -> None:
+        buffer._header[self.index] = value
+
+
+class SharedCandleBuffer(CandleBuffer):
+    """`CandleBuffer` in a `multiprocessing.shared_memory` block, written by one process
+    and read by any number of others.
+
+    The sequence number, head and size live in a header before the columns, so readers
+    in other processes take consistent snapshots with the same seqlock. Only one process
+    may write (writers in it are serialized as usual). `stale` is set by the writer
+    while candles are being backfilled.
+
+    The header and columns are written with plain stores, no barriers or atomics, so
+    across processes the seqlock is only sound on x86 (total store order); other
+    machines log a warning when a buffer is created or attached.
+    """
+
+    _seq = _HeaderField(0)
+    _head = _HeaderField(1)
+    _size = _HeaderField(2)
+    stale = _HeaderField(3)
+
+    def __init__(self, capacity: int, name: Optional[str] = None):
+        if capacity <= 0:
+            raise ValueError(f'Capacity must be positive, got {capacity}')
+        _check_memory_order()
+        self._memory = SharedMemory(name=name, create=True, size=self.memory_size(capacity))
+        self._map(capacity)
+        self._header[:] = 0
+        self._header[4] = capacity
+        self._write_lock = Lock()
+        self.generation = next(CandleBuffer._generations)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedCandleBuffer':
+        """Reader of the buffer another process created as `name`.
+
+        Readers are meant to be children of the creator: they share its resource tracker,
+        which would otherwise unlink the block when the reader exits.
+        """
+        _check_memory_order()
+        buffer = cls.__new__(cls)
+        buffer._memory = SharedMemory(name=name)
+        header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=buffer._memory.buf)
+        buffer._map(int(header[4]))
+        buffer._write_lock = Lock()
+        buffer.generation = next(CandleBuffer._generations)
+        return buffer
+
+    @staticmethod
+    def memory_size(capacity: int) -> int:
+        return 8 * (HEADER_FIELDS + 2 * capacity * len(CANDLE_FIELDS))
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def _map(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=self._memory.buf)
+        offset = 8 * HEADER_FIELDS
+        self._columns = {}
+        for name, dtype in CANDLE_FIELDS.items():
+            self._columns[name] = np.ndarray(2 * capacity, dtype=dtype, buffer=self._memory.buf, offset=offset)
+            offset += 8 * 2 * capacity
+
+    def close(self) -> None:
+        """Unmap the block, this buffer can't be used afterwards."""
+        # numpy views keep the mapping exported, release them first
+        self._columns = {}
+        self._header = None # type: ignore
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """Close and free the block, by the creating process once readers are done."""
+        self.close()
+        self._memory.unlink()
+
+
+class SharedCandles:
+    """Read side of a collector's shared buffers (see `SharedCandleBuffer`).
+
+    Stands in for `HyperliquidCollector` in worker processes: it serves the symbols
+    in `names` (symbol to block name) at the collector's `interval` only and never
+    subscribes to anything itself.
+    """
+
+    def __init__(self, names: dict[str, str], interval: str):
+        self.candles = {symbol: SharedCandleBuffer.attach(name) for symbol, name in names.items()}
+        self._interval = interval
+
+    @property
+    def symbols(self) -> list[str]:
+        return list(self.candles)
+
+    @property
+    def interval(self) -> str:
+        return self._interval
+
+    @property
+    def ready(self) -> bool:
+        return True
+
+    def stop(self) -> None:
+        for buffer in self.candles.values():
+            buffer.close()
+        self.candles = {}
+
+    def _buffer(self, symbol: str, interval: Optional[str]) -> SharedCandleBuffer:
+        if interval is not None and interval != self._interval:
+            log_raise(f'Unsupported interval: {interval}', logger, UnsupportedIntervalError)
+        buffer = self.candles.get(symbol)
+        if buffer is None:
+            log_raise(f'Unknown symbol: {symbol}', logger, UnknownSymbolError)
+        return buffer # type: ignore
+
+    def is_stale(self, symbol: str) -> bool:
+        buffer = self.candles.get(symbol)
+        return buffer is not None and bool(buffer.stale)
+
+    def wait_for_backfill(self, symbol: str, timeout: Optional[float] = None, poll: float = .01) -> bool:
+        """Poll until `symbol` is no longer stale, False if it still is after `timeout` seconds."""
+        deadline = None if timeout is None else monotonic() + timeout
+        while self.is_stale(symbol):
+            if deadline is not None and monotonic() >= deadline:
+                return False
+            sleep(poll)
+        return True
+
+    def candle_state(self, symbol: str, interval: Optional[str] = None) -> tuple[int, int, Optional[int]]:
+        """See `HyperliquidCollector.candle_state`."""
+        buffer = self._buffer(symbol, interval)
+        version = buffer.version
+        return buffer.generation, version, buffer.last_timestamp
+
+    def get_candles(self, symbol: str, interval: Optional[str] = None) -> dict[str, np.ndarray]:
+        """See `HyperliquidCollector.get_candles`."""
+        return self._buffer(symbol, interval).snapshot()
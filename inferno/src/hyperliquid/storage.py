@@ -0,0 +1,129 @@
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+import logging
+import os
+
+import numpy as np
+
+from .buffer import CANDLE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+CANDLE_DTYPE = np.dtype([(name, dtype) for name, dtype in CANDLE_FIELDS.items()])
+STORE_SUFFIX = '.candles'
+
+
+class CandleStore:
+    """On-disk history of closed candles for one symbol and interval, appended to as
+    candles close and merged into when gaps are backfilled.
+
+    The file is a flat array of fixed-size little-endian records (see `CANDLE_DTYPE`)
+    ordered by `t`, so it can be memory-mapped and sliced without loading it.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        size = self.path.stat().st_size
+        if size % CANDLE_DTYPE.itemsize:
+            # torn write from a crash, drop the partial record
+            logger.warning(f'Truncating partial record at the end of {self.path}')
+            with self.path.open('r+b') as file:
+                file.truncate(size - size % CANDLE_DTYPE.itemsize)
+        self._last_timestamp = self._read_last_timestamp()
+
+    @classmethod
+    def open(cls, directory: Union[str, Path], symbol: str, interval: str) -> 'CandleStore':
+        return cls(Path(directory) / f'{symbol}_{interval}{STORE_SUFFIX}')
+
+    def __len__(self) -> int:
+        return self.path.stat().st_size // CANDLE_DTYPE.itemsize
+
+    def _read_last_timestamp(self) -> Optional[int]:
+        if len(self) == 0:
+            return None
+        return int(self.memmap()[-1]['t'])
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return self._last_timestamp
+
+    def memmap(self) -> np.ndarray:
+        """Read-only memory map of all stored candles."""
+        if len(self) == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.memmap(self.path, dtype=CANDLE_DTYPE, mode='r')
+
+    def read(self, n: Optional[int] = None, start_time: Optional[int] = None) -> dict[str, np.ndarray]:
+        """Columns of the stored candles, optionally only the last `n` and/or from `start_time`."""
+        records = self.memmap()
+        if start_time is not None:
+            records = records[int(np.searchsorted(records['t'], start_time)):]
+        if n is not None:
+            records = records[-n:] if n else records[:0]
+        return {name: np.array(records[name]) for name in CANDLE_DTYPE.names} # type: ignore
+
+    @staticmethod
+    def _records(candles: Iterable[dict[str, Any]]) -> np.ndarray:
+        return np.array([
+            tuple(
+                float(candle[name]) if CANDLE_DTYPE[name].kind == 'f' else int(candle[name])
+                for name in CANDLE_DTYPE.names # type: ignore
+            )
+            for candle in candles
+        ], dtype=CANDLE_DTYPE)
+
+    def append(self, candles: Iterable[dict[str, Any]]) -> int:
+        """Append closed candles newer than the last stored one.
+
+        Returns:
+            Number of candles written
+        """
+        rows = []
+        last = self._last_timestamp
+        for candle in candles:
+            t = int(candle['t'])
+            if last is not None and t <= last:
+                continue
+            rows.append(candle)
+            last = t
+        if not rows:
+            return 0
+
+        with self.path.open('ab') as file:
+            file.write(self._records(rows).tobytes())
+        self._last_timestamp = last
+        return len(rows)
+
+    def merge(self, candles: Iterable[dict[str, Any]]) -> int:
+        """Insert closed candles by `t`, e.g. backfilled ones older than the last stored one.
+
+        Candles already stored are kept. Only newer ones are appended, anything else
+        rewrites the file (through a temporary file, so a crash leaves the old one).
+
+        Returns:
+            Number of candles written
+        """
+        records = self._records(candles)
+        if len(records) == 0:
+            return 0
+        _, first = np.unique(records['t'], return_index=True)
+        records = records[first]
+        if self._last_timestamp is None or records['t'][0] > self._last_timestamp:
+            with self.path.open('ab') as file:
+                file.write(records.tobytes())
+            self._last_timestamp = int(records['t'][-1])
+            return len(records)
+
+        stored = np.array(self.memmap())
+        records = records[~np.isin(records['t'], stored['t'])]
+        if len(records) == 0:
+            return 0
+        merged = np.concatenate([stored, records])
+        merged = merged[np.argsort(merged['t'], kind='stable')]
+        temporary = self.path.with_name(self.path.name + '.tmp')
+        temporary.write_bytes(merged.tobytes())
+        os.replace(temporary, self.path)
+        self._last_timestamp = int(merged['t'][-1])
+        return len(records)
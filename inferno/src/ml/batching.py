@@ -0,0 +1,151 @@
+from concurrent.futures import Future
+from threading import Condition, Thread
+from time import perf_counter
+from typing import Callable, NamedTuple, TypeVar
+import logging
+
+from .inference import ModelInference
+from src.types.prediction import Prediction
+from src.types.signal import Suggestion
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class _Pending(NamedTuple):
+    inference: ModelInference
+    model_input: dict[str, float]
+    respond: Callable[[Suggestion, Prediction], object]
+    future: Future
+    enqueued: float
+
+
+class InferenceBatcher:
+    """Predicts model inputs submitted within `window_ms` of each other (up to
+    `max_batch_size`) with one `ModelInference.predict_batch` call per model.
+
+    The window starts with the oldest pending input, so a lone request waits at most
+    `window_ms`. Batches run on one background thread, which also resolves the futures.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 32,
+        window_ms: float = 2.,
+        log_every: int = 10_000
+    ):
+        self.max_batch_size = max(max_batch_size, 1)
+        self.window_ms = window_ms
+        self._log_every = log_every
+
+        self._pending: list[_Pending] = []
+        self._condition = Condition()
+        self._closed = False
+
+        self._batches = 0
+        self._requests = 0
+        self._largest = 0
+        self._wait_ms = 0.
+        self._predict_ms = 0.
+
+        self._thread = Thread(target=self._run, name='inference-batcher', daemon=True)
+        self._thread.start()
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Batch sizes, time from submit to result (latency) and predicted rows per second of predict time."""
+        with self._condition:
+            batches, requests = max(self._batches, 1), max(self._requests, 1)
+            return {
+                'batches': self._batches,
+                'requests': self._requests,
+                'mean_batch_size': self._requests / batches,
+                'max_batch_size': self._largest,
+                'mean_latency_ms': self._wait_ms / requests,
+                'mean_predict_ms': self._predict_ms / batches,
+                'rows_per_s': 1000 * self._requests / self._predict_ms if self._predict_ms else 0.,
+            }
+
+    def submit(
+        self,
+        inference: ModelInference,
+        model_input: dict[str, float],
+        respond: Callable[[Suggestion, Prediction], T]
+    ) -> 'Future[T]':
+        """Queue `model_input` (see `ModelInference.model_input`) for the next batch of `inference`.
+
+        Returns:
+            Future of `respond` applied to its prediction (or the exception raised)
+        """
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Inference batcher is closed')
+            self._pending.append(_Pending(inference, model_input, respond, future, perf_counter()))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch_size:
+                self._condition.notify()
+        return future
+
+    def close(self) -> None:
+        """Predict what is pending and stop."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _next_batch(self) -> list[_Pending]:
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if self._pending:
+                deadline = self._pending[0].enqueued + self.window_ms / 1000
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            models: dict[int, list[_Pending]] = {}
+            for pending in batch:
+                models.setdefault(id(pending.inference), []).append(pending)
+            for group in models.values():
+                self._predict(group)
+
+    def _predict(self, batch: list[_Pending]) -> None:
+        start = perf_counter()
+        try:
+            results = batch[0].inference.predict_batch([pending.model_input for pending in batch])
+        except Exception as e:
+            logger.exception(f'batch of {len(batch)} predictions failed')
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+        end = perf_counter()
+
+        for pending, (suggestion, prediction) in zip(batch, results):
+            try:
+                pending.future.set_result(pending.respond(suggestion, prediction))
+            except Exception as e:
+                pending.future.set_exception(e)
+        self._record(batch, start, end)
+
+    def _record(self, batch: list[_Pending], start: float, end: float) -> None:
+        with self._condition:
+            self._batches += 1
+            self._requests += len(batch)
+            self._largest = max(self._largest, len(batch))
+            self._wait_ms += sum(end - pending.enqueued for pending in batch) * 1000
+            self._predict_ms += (end - start) * 1000
+            requests = self._requests
+        if requests // self._log_every > (requests - len(batch)) // self._log_every:
+            logger.info(f'inference batches: {self.stats}')
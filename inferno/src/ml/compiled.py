@@ -0,0 +1,145 @@
+from typing import Any, Optional
+import logging
+import math
+
+import numpy as np
+from lightgbm import LGBMClassifier
+from sklearn.preprocessing import StandardScaler
+
+from src.types.error import UnsupportedModelError
+from src.utils.error import log_raise
+
+logger = logging.getLogger(__name__)
+
+
+def _fold_threshold(threshold: float, mean: float, scale: float) -> float:
+    """Largest raw value `x` with `(x - mean) / scale <= threshold` as sklearn computes it.
+
+    The scaling is monotonic in `x`, so comparing raw values with the result takes the
+    same branch as comparing scaled values with `threshold`, rounding included.
+    """
+    def left(x: float) -> bool:
+        return (x - mean) / scale <= threshold
+
+    folded = threshold * scale + mean
+    if math.isinf(folded) or math.isnan(folded):
+        return folded
+    while not left(folded):
+        folded = math.nextafter(folded, -math.inf)
+    while left(math.nextafter(folded, math.inf)):
+        folded = math.nextafter(folded, math.inf)
+    return folded
+
+
+def _sigmoid(score: float, sigmoid: float) -> float:
+    """LightGBM's binary output transform, with the scalar libm `exp` it uses."""
+    try:
+        return 1. / (1. + math.exp(-sigmoid * score))
+    except OverflowError:
+        return 0.
+
+
+class CompiledTrees:
+    """A binary `LGBMClassifier` (and its `StandardScaler`) as flat node arrays.
+
+    All trees are walked at once with NumPy indexing: leaves point to themselves, so
+    `depth` steps bring every row to a leaf of every tree. Raw scores are summed in tree
+    order and passed through the sigmoid like LightGBM does, so probabilities are equal
+    to `predict_proba` bit for bit.
+
+    The scaler is folded into the split thresholds when every split's missing value
+    handling allows it (no `Zero` missing type), otherwise rows are scaled first.
+    """
+
+    def __init__(self, clf: LGBMClassifier, scaler: Optional[StandardScaler] = None):
+        model = clf.booster_.dump_model()
+        if model['num_tree_per_iteration'] != 1 or not model['objective'].startswith('binary'):
+            log_raise(f'Only binary classifiers can be compiled, got: {model["objective"]}', logger, UnsupportedModelError)
+        sigmoid = float(model['objective'].partition('sigmoid:')[2] or 1.)
+        if model.get('average_output'):
+            log_raise('Averaged (random forest) outputs can not be compiled', logger, UnsupportedModelError)
+
+        self.n_features = model['max_feature_idx'] + 1
+        self.sigmoid = sigmoid
+        features: list[int] = []
+        thresholds: list[float] = []
+        children: list[tuple[int, int]] = []
+        nan_left: list[bool] = []
+        zero_missing: list[bool] = []
+        values: list[float] = []
+        roots: list[int] = []
+        self.depth = 0
+
+        def add(node: dict[str, Any], depth: int) -> int:
+            index = len(features)
+            features.append(0)
+            thresholds.append(0.)
+            children.append((index, index))
+            nan_left.append(True)
+            zero_missing.append(False)
+            values.append(0.)
+            if 'leaf_value' in node:
+                values[index] = node['leaf_value']
+                self.depth = max(self.depth, depth)
+                return index
+            if node['decision_type'] != '<=' or node.get('is_linear'):
+                log_raise(f'Only numerical splits can be compiled, got: {node["decision_type"]}', logger, UnsupportedModelError)
+            features[index] = node['split_feature']
+            thresholds[index] = node['threshold']
+            missing = node['missing_type']
+            # LightGBM sends NaN to the default side, or treats it as 0 without NaN missing type
+            nan_left[index] = node['default_left'] if missing == 'NaN' else 0. <= node['threshold']
+            zero_missing[index] = missing == 'Zero'
+            if zero_missing[index]:
+                nan_left[index] = node['default_left']
+            children[index] = (add(node['left_child'], depth + 1), add(node['right_child'], depth + 1))
+            return index
+
+        for tree in model['tree_info']:
+            roots.append(add(tree['tree_structure'], 0))
+
+        self.roots = np.array(roots, dtype=np.intp)
+        self.features = np.array(features, dtype=np.intp)
+        self.thresholds = np.array(thresholds, dtype=np.float64)
+        self.left = np.array([left for left, _ in children], dtype=np.intp)
+        self.right = np.array([right for _, right in children], dtype=np.intp)
+        self.nan_left = np.array(nan_left, dtype=bool)
+        self.zero_missing = np.array(zero_missing, dtype=bool)
+        self.values = np.array(values, dtype=np.float64)
+        # next node at `2 * node + go_left`
+        self._children = np.stack([self.right, self.left], axis=1).ravel()
+
+        self.scaler = scaler
+        self.folded = scaler is not None and not self.zero_missing.any()
+        if self.folded:
+            mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(self.n_features) # type: ignore
+            scale = scaler.scale_ if scaler.scale_ is not None else np.ones(self.n_features) # type: ignore
+            internal = self.left != np.arange(len(self.left))
+            for node in np.flatnonzero(internal):
+                feature = self.features[node]
+                self.thresholds[node] = _fold_threshold(self.thresholds[node], mean[feature], scale[feature])
+
+    def raw_scores(self, xs: np.ndarray) -> np.ndarray:
+        """Summed leaf values per row of unscaled features."""
+        xs = np.asarray(xs, dtype=np.float64).reshape(-1, self.n_features)
+        if self.scaler is not None and not self.folded:
+            xs = self.scaler.transform(xs)
+        values = xs.ravel()
+        offsets = (np.arange(len(xs)) * self.n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (len(xs), len(self.roots)))
+        check_zero = self.zero_missing.any()
+        for _ in range(self.depth):
+            split = values[offsets + self.features[nodes]]
+            go_left = split <= self.thresholds[nodes]
+            missing = np.isnan(split)
+            if check_zero:
+                missing |= self.zero_missing[nodes] & (np.abs(split) <= 1e-35)
+            if missing.any():
+                go_left = np.where(missing, self.nan_left[nodes], go_left)
+            nodes = self._children[2 * nodes + go_left]
+        # cumulative sums add sequentially, in tree order like LightGBM
+        return np.cumsum(self.values[nodes], axis=1)[:, -1]
+
+    def predict_proba(self, xs: np.ndarray) -> np.ndarray:
+        """Buy probability per row of unscaled features (the second `predict_proba` column)."""
+        return np.array([_sigmoid(score, self.sigmoid) for score in self.raw_scores(xs).tolist()])
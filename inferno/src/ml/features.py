@@ -0,0 +1,137 @@
+from functools import lru_cache
+from typing import Any, Callable, Mapping, Optional, Sequence
+import math
+
+import numpy as np
+import pandas as pd
+
+from . import indicators as ta
+
+CANDLE_INPUTS = ('high', 'low', 'close', 'volume')
+# start effects of recursive indicators are below this once warmed up
+WARM_UP_TOLERANCE = 1e-10
+
+
+def _decay_rows(alpha: float) -> int:
+    """Rows until the weight of an exponential average's start drops below `WARM_UP_TOLERANCE`."""
+    return math.ceil(math.log(WARM_UP_TOLERANCE) / math.log(1. - alpha))
+
+
+class Node:
+    """An indicator or feature computed from candle columns and/or other nodes.
+
+    Attributes:
+        depends: Candle columns and node names passed to `compute`, in order
+        compute: Function of the dependencies' arrays
+        lookback: Earlier rows of its dependencies the value of a row needs to match the
+            value over the full frame (its warm-up), None if it depends on all rows
+    """
+
+    def __init__(self, depends: tuple[str, ...], compute: Callable[..., Any], lookback: Optional[int]):
+        self.depends = depends
+        self.compute = compute
+        self.lookback = lookback
+
+
+_RMA_14 = 13 + _decay_rows(1 / 14)
+
+INDICATORS: dict[str, Node] = {
+    'log_returns': Node(('close',), lambda close: np.log(close / ta.shift(close)), 1),
+    'stoch': Node(('high', 'low', 'close'), lambda h, l, c: ta.stoch(h, l, c, k=14, d=3, smooth_k=3), 13 + 2 + 2),
+    'macd': Node(('close',), ta.macd, 25 + _decay_rows(2 / 27) + 8 + _decay_rows(2 / 10)),
+    'atr': Node(('high', 'low', 'close'), lambda h, l, c: ta.atr(h, l, c, length=14), 1 + _RMA_14),
+    'adx': Node(('high', 'low', 'close'), lambda h, l, c: ta.adx(h, l, c, length=14), 1 + 2 * _RMA_14),
+    'bbands': Node(('close',), lambda close: ta.bbands(close, length=20, std=2), 19),
+    'obv': Node(('close', 'volume'), ta.obv, None),
+    'donchian': Node(('high', 'low'), lambda h, l: ta.donchian(h, l, lower_length=60, upper_length=60), 59),
+}
+
+FEATURES: dict[str, Node] = {
+    'rsi_14': Node(('close',), lambda close: ta.rsi(close, length=14), 1 + _RMA_14),
+    'mom_10d': Node(('close',), lambda close: ta.pct_change(close, periods=10), 10),
+    'mom_30d': Node(('close',), lambda close: ta.pct_change(close, periods=30), 30),
+    'stochk_14_3_3': Node(('stoch',), lambda stoch: stoch[0], 0),
+    'stochd_14_3_3': Node(('stoch',), lambda stoch: stoch[1], 0),
+    'macd_hist': Node(('macd',), lambda macd: macd[1], 0),
+    'adx_14': Node(('adx',), lambda adx: adx[0], 0),
+    'plus_di_14': Node(('adx',), lambda adx: adx[1], 0),
+    'minus_di_14': Node(('adx',), lambda adx: adx[2], 0),
+    'sma_50_ratio': Node(('close',), lambda close: close / ta.sma(close, length=50) - 1, 49),
+    # the name is historical, models were trained on the 50 period EMA
+    'ema_20_ratio': Node(('close',), lambda close: close / ta.ema(close, length=50) - 1, 49 + _decay_rows(2 / 51)),
+    'atr_14_norm': Node(('atr', 'close'), lambda atr, close: atr / close, 0),
+    'bbands_width_20_2': Node(('bbands',), lambda bbands: (bbands[2] - bbands[0]) / bbands[1], 0),
+    'volatility_30d': Node(('log_returns',), lambda log_returns: ta.rolling_std(log_returns, 30), 29),
+    'volatility_90d': Node(('log_returns',), lambda log_returns: ta.rolling_std(log_returns, 90), 89),
+    'obv_pct_change_10d': Node(('obv',), lambda obv: ta.pct_change(obv, periods=10), 10),
+    'donchian_width_rel_60': Node(('donchian', 'close'), lambda donchian, close: (donchian[2] - donchian[0]) / close, 0),
+}
+
+NODES: dict[str, Node] = {**INDICATORS, **FEATURES}
+
+
+class FeaturePlan:
+    """Computes only the registered features a model uses and the indicators they depend on.
+
+    Features that are not registered (e.g. Donchian columns) are ignored, see `missing`.
+    """
+
+    def __init__(self, features: Sequence[str]):
+        self.features = [feature for feature in features if feature in FEATURES]
+        self.missing = [feature for feature in features if feature not in FEATURES]
+
+        self.order: list[str] = []
+        lookbacks: dict[str, Optional[int]] = {name: 0 for name in CANDLE_INPUTS}
+
+        def visit(name: str) -> None:
+            if name in lookbacks:
+                return
+            node = NODES[name]
+            for dependency in node.depends:
+                visit(dependency)
+            required = [lookbacks[dependency] for dependency in node.depends]
+            if node.lookback is None or None in required:
+                lookbacks[name] = None
+            else:
+                lookbacks[name] = node.lookback + max(required) # type: ignore
+            self.order.append(name)
+
+        for feature in self.features:
+            visit(feature)
+        required = [lookbacks[feature] for feature in self.features]
+        # candles the features of the last closed candle need, None for all
+        self.window: Optional[int] = None if None in required else 1 + max(required, default=0) # type: ignore
+        self.inputs = [name for name in CANDLE_INPUTS if any(name in NODES[node].depends for node in self.order)]
+
+    def compute(self, columns: Mapping[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """Planned features over all rows of `columns` (not shifted or filled)."""
+        values: dict[str, Any] = {name: columns[name] for name in self.inputs}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name in self.order:
+                node = NODES[name]
+                values[name] = node.compute(*(values[dependency] for dependency in node.depends))
+        return {feature: values[feature] for feature in self.features}
+
+    def latest(self, data: pd.DataFrame) -> dict[str, float]:
+        """Planned features of the last row of `PreProcessor._features(data)`.
+
+        That row holds the (forward filled) features of the previous candle, so only the
+        `window` candles before the last one are evaluated.
+        """
+        end = max(len(data) - 1, 0)
+        start = 0 if self.window is None else max(end - self.window, 0)
+        values = self.compute({
+            name: data[name].to_numpy(dtype=np.float64)[start:end] for name in self.inputs
+        })
+
+        latest = {}
+        for feature, column in values.items():
+            valid = np.flatnonzero(~np.isnan(column))
+            latest[feature] = float(column[valid[-1]]) if len(valid) else math.nan
+        return latest
+
+
+@lru_cache(maxsize=None)
+def plan_features(features: tuple[str, ...]) -> FeaturePlan:
+    """Cached plan per feature list (a model's `features`)."""
+    return FeaturePlan(features)
@@ -0,0 +1,379 @@
+from typing import Optional
+from collections import deque
+import math
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .preprocessor import PreProcessor
+
+
+def _div(a: float, b: float) -> float:
+    """`a / b` with NumPy semantics (inf or nan instead of ZeroDivisionError)."""
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1., b)
+    return a / b
+
+
+class _Ewm:
+    """Exponentially weighted mean, step by step as pandas `ewm(...).mean()` computes it."""
+
+    def __init__(self, alpha: float, adjust: bool = True, min_periods: int = 0):
+        self._old_wt_factor = 1. - alpha
+        self._new_wt = 1. if adjust else alpha
+        self._adjust = adjust
+        self._min_periods = max(min_periods, 1)
+        self._weighted = math.nan
+        self._old_wt = 1.
+        self._observations = 0
+        self.value = math.nan
+
+    def push(self, value: float) -> float:
+        is_observation = not math.isnan(value)
+        self._observations += is_observation
+        if not math.isnan(self._weighted):
+            self._old_wt *= self._old_wt_factor
+            if is_observation:
+                if self._weighted != value:
+                    self._weighted = (
+                        (self._old_wt * self._weighted + self._new_wt * value) / (self._old_wt + self._new_wt)
+                    )
+                self._old_wt = self._old_wt + self._new_wt if self._adjust else 1.
+        elif is_observation:
+            self._weighted = value
+        self.value = self._weighted if self._observations >= self._min_periods else math.nan
+        return self.value
+
+
+class _Rma(_Ewm):
+    """Wilder's moving average (`indicators.rma`)."""
+
+    def __init__(self, length: int):
+        super().__init__(1. / length, min_periods=length)
+
+
+class _Ema:
+    """`indicators.ema`: seeded with the SMA of the first `length` values, leading NaNs skipped."""
+
+    def __init__(self, length: int):
+        self._length = length
+        self._seed: list[float] = []
+        self._ewm = _Ewm(2. / (length + 1), adjust=False)
+        self.value = math.nan
+
+    def push(self, value: float) -> float:
+        if len(self._seed) < self._length:
+            if not math.isnan(value):
+                self._seed.append(value)
+                if len(self._seed) == self._length:
+                    self.value = self._ewm.push(sum(self._seed) / self._length)
+            return self.value
+        self.value = self._ewm.push(value)
+        return self.value
+
+
+class _RollingMoments:
+    """Rolling mean and std over full windows, leading NaNs skipped.
+
+    Sums are kept relative to a shift that is reset with an exact re-summation once per
+    window, so cancellation stays small for price levels far from zero.
+    """
+
+    def __init__(self, window: int, ddof: int = 1):
+        self._window = window
+        self._ddof = ddof
+        self._values: deque[float] = deque()
+        self._shift = 0.
+        self._sum = 0.
+        self._sum_sq = 0.
+        self._pushes = 0
+
+    def push(self, value: float) -> None:
+        if math.isnan(value) and not self._values:
+            return
+        if not self._values:
+            self._shift = value
+        delta = value - self._shift
+        self._values.append(value)
+        self._sum += delta
+        self._sum_sq += delta * delta
+        if len(self._values) > self._window:
+            old = self._values.popleft() - self._shift
+            self._sum -= old
+            self._sum_sq -= old * old
+        self._pushes += 1
+        if self._pushes % self._window == 0:
+            self._shift = self._values[0]
+            self._sum = math.fsum(v - self._shift for v in self._values)
+            self._sum_sq = math.fsum((v - self._shift) ** 2 for v in self._values)
+
+    @property
+    def full(self) -> bool:
+        return len(self._values) == self._window
+
+    @property
+    def mean(self) -> float:
+        if not self.full:
+            return math.nan
+        return self._shift + self._sum / self._window
+
+    @property
+    def std(self) -> float:
+        if not self.full:
+            return math.nan
+        variance = (self._sum_sq - self._sum * self._sum / self._window) / (self._window - self._ddof)
+        return math.sqrt(variance) if variance > 0 else 0.
+
+
+class _RollingExtreme:
+    """Rolling max (or min) over full windows with a monotonic deque."""
+
+    def __init__(self, window: int, is_max: bool):
+        self._window = window
+        self._is_max = is_max
+        self._items: deque[tuple[int, float]] = deque()
+        self._count = 0
+
+    def push(self, value: float) -> None:
+        idx = self._count
+        self._count += 1
+        while self._items and (
+            value >= self._items[-1][1] if self._is_max else value <= self._items[-1][1]
+        ):
+            self._items.pop()
+        self._items.append((idx, value))
+        if self._items[0][0] <= idx - self._window:
+            self._items.popleft()
+
+    @property
+    def value(self) -> float:
+        return self._items[0][1] if self._count >= self._window else math.nan
+
+
+class IncrementalFeatures:
+    """Streaming `PreProcessor` features for one symbol.
+
+    Each indicator keeps its recursive state (Wilder and exponential averages, rolling
+    sums and extremes), so committing a candle is O(1). As in the batch path, the
+    features of the newest row are those of the previous (closed) candle, forward
+    filled; the newest candle itself stays pending until a later `t` arrives.
+
+    OBV is a cumulative sum from the first row of the batch frame, so the feature depends
+    on how many rows the batch would see; the engine keeps `history` rows to rebase it.
+    """
+
+    OBV_PERIODS = 10
+
+    def __init__(self, history: int = 500):
+        self._history = history
+        self._count = 0
+        self._pending: Optional[tuple[int, float, float, float, float]] = None
+        self._last_committed: Optional[int] = None
+        self._prev: Optional[tuple[float, float, float]] = None # high, low, close
+
+        self._closes: deque[float] = deque(maxlen=31)
+        self._rsi_up = _Rma(14)
+        self._rsi_down = _Rma(14)
+        self._stoch_high = _RollingExtreme(14, is_max=True)
+        self._stoch_low = _RollingExtreme(14, is_max=False)
+        self._stoch_k = _RollingMoments(3)
+        self._stoch_d = _RollingMoments(3)
+        self._macd_fast = _Ema(12)
+        self._macd_slow = _Ema(26)
+        self._macd_signal = _Ema(9)
+        self._atr = _Rma(14)
+        self._dm_plus = _Rma(14)
+        self._dm_minus = _Rma(14)
+        self._adx = _Rma(14)
+        self._sma_50 = _RollingMoments(50)
+        self._ema_50 = _Ema(50)
+        self._bbands = _RollingMoments(20, ddof=0)
+        self._volatility_30 = _RollingMoments(30)
+        self._volatility_90 = _RollingMoments(90)
+        self._donchian_high = _RollingExtreme(60, is_max=True)
+        self._donchian_low = _RollingExtreme(60, is_max=False)
+        # running signed volume and volume per committed row, to rebase OBV
+        self._obv = 0.
+        self._obv_rows: deque[tuple[float, float]] = deque(maxlen=history)
+
+        self._values = np.full(len(PreProcessor.FEATURE_COLS), np.nan)
+        self._obv_index = PreProcessor.FEATURE_COLS.index('obv_pct_change_10d')
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return self._pending[0] if self._pending is not None else None
+
+    @property
+    def last_committed_timestamp(self) -> Optional[int]:
+        return self._last_committed
+
+    @property
+    def rows(self) -> int:
+        """Rows seen so far, the pending one included."""
+        return self._count + (self._pending is not None)
+
+    def update(self, timestamp: int, high: float, low: float, close: float, volume: float) -> None:
+        """Fold in a new candle, or replace the pending one if `timestamp` did not change."""
+        if self._pending is not None:
+            if timestamp < self._pending[0]:
+                return
+            if timestamp > self._pending[0]:
+                self._commit(*self._pending)
+        self._pending = (timestamp, high, low, close, volume)
+
+    def _commit(self, timestamp: int, high: float, low: float, close: float, volume: float) -> None:
+        values = np.full(len(PreProcessor.FEATURE_COLS), np.nan)
+        prev_high, prev_low, prev_close = self._prev if self._prev is not None else (math.nan,) * 3
+
+        # rsi
+        change = close - prev_close
+        up = self._rsi_up.push(max(change, 0.) if not math.isnan(change) else math.nan)
+        down = self._rsi_down.push(min(change, 0.) if not math.isnan(change) else math.nan)
+        rsi = 100 * _div(up, up + abs(down))
+
+        # momentum
+        self._closes.append(close)
+        mom_10 = _div(close, self._closes[-11]) - 1 if len(self._closes) > 10 else math.nan
+        mom_30 = _div(close, self._closes[-31]) - 1 if len(self._closes) > 30 else math.nan
+
+        # stochastic
+        self._stoch_high.push(high)
+        self._stoch_low.push(low)
+        lowest, highest = self._stoch_low.value, self._stoch_high.value
+        span = highest - lowest
+        stoch = 100 * (close - lowest) / (span if span != 0 else sys.float_info.epsilon)
+        self._stoch_k.push(stoch)
+        stoch_k = self._stoch_k.mean
+        self._stoch_d.push(stoch_k)
+
+        # macd
+        macd = self._macd_fast.push(close) - self._macd_slow.push(close)
+        macd_hist = macd - self._macd_signal.push(macd)
+
+        # adx
+        if self._prev is None:
+            true_range = dm_plus = dm_minus = math.nan
+        else:
+            true_range = max(abs(high - low), abs(high - prev_close), abs(prev_close - low))
+            move_up, move_down = high - prev_high, prev_low - low
+            dm_plus = move_up if move_up > move_down and move_up > 0 else 0.
+            dm_minus = move_down if move_down > move_up and move_down > 0 else 0.
+            dm_plus = 0. if abs(dm_plus) < sys.float_info.epsilon else dm_plus
+            dm_minus = 0. if abs(dm_minus) < sys.float_info.epsilon else dm_minus
+        atr = self._atr.push(true_range)
+        scale = _div(100, atr)
+        plus_di = scale * self._dm_plus.push(dm_plus)
+        minus_di = scale * self._dm_minus.push(dm_minus)
+        adx = self._adx.push(100 * _div(abs(plus_di - minus_di), plus_di + minus_di))
+
+        # averages, bands and volatility
+        self._sma_50.push(close)
+        ema_50 = self._ema_50.push(close)
+        self._bbands.push(close)
+        mid, std = self._bbands.mean, self._bbands.std
+        log_return = math.log(_div(close, prev_close)) if self._prev is not None else math.nan
+        self._volatility_30.push(log_return)
+        self._volatility_90.push(log_return)
+
+        # donchian
+        self._donchian_high.push(high)
+        self._donchian_low.push(low)
+
+        # obv, signed like `indicators.obv` with the first row counted as up
+        sign = 1. if math.isnan(change) or change > 0 else -1. if change < 0 else 0.
+        self._obv += sign * volume
+        self._obv_rows.append((self._obv, volume))
+
+        values[:] = [
+            rsi,
+            mom_10,
+            mom_30,
+            stoch_k,
+            self._stoch_d.mean,
+            macd_hist,
+            adx,
+            plus_di,
+            minus_di,
+            _div(close, self._sma_50.mean) - 1,
+            _div(close, ema_50) - 1,
+            _div(atr, close),
+            _div((mid + 2 * std) - (mid - 2 * std), mid),
+            self._volatility_30.std,
+            self._volatility_90.std,
+            math.nan, # obv, see `features`
+            _div(self._donchian_high.value - self._donchian_low.value, close),
+        ]
+        # forward fill like the batch path
+        self._values = np.where(np.isnan(values), self._values, values)
+
+        self._prev = (high, low, close)
+        self._last_committed = timestamp
+        self._count += 1
+
+    def _obv_change(self, rows: int) -> float:
+        """OBV change over `OBV_PERIODS` at the last committed row, OBV summed over the last `rows` rows."""
+        committed = len(self._obv_rows)
+        base = max(self._count + 1 - rows, 0) - (self._count - committed)
+        base = max(base, 0)
+        base_obv, base_volume = self._obv_rows[base] if committed else (math.nan, math.nan)
+        offset = base_volume - base_obv
+        # forward fill over rows with an undefined change
+        for row in range(committed - 1, base + self.OBV_PERIODS - 1, -1):
+            change = _div(self._obv_rows[row][0] + offset, self._obv_rows[row - self.OBV_PERIODS][0] + offset) - 1
+            if not math.isnan(change):
+                return change
+        return math.nan
+
+    def features(self, rows: Optional[int] = None) -> np.ndarray:
+        """Feature vector (`PreProcessor.FEATURE_COLS`) of the newest row.
+
+        Args:
+            rows: Length of the candle frame the batch path would see, defaults to all
+                rows since the first update (up to `history`)
+        """
+        values = self._values.copy()
+        values[self._obv_index] = self._obv_change(rows or self.rows)
+        return values
+
+
+class IncrementalFeatureStrategy:
+    """Keeps an IncrementalFeatures per key (symbol and interval) and feeds it only the candles it has not seen."""
+
+    def __init__(self, history: int = 500):
+        self._history = history
+        self._engines: dict[str, IncrementalFeatures] = {}
+
+    def reset(self, key: str) -> None:
+        self._engines.pop(key, None)
+
+    def drop_symbol(self, symbol: str) -> None:
+        """Forget the engines of every interval of `symbol`, e.g. once it is no longer collected."""
+        for key in [key for key in self._engines if key.split(':', 1)[0] == symbol]:
+            self._engines.pop(key, None)
+
+    def sync(self, key: str, candles: pd.DataFrame) -> IncrementalFeatures:
+        timestamps = candles['timestamp'].to_numpy()
+        engine = self._engines.get(key)
+        start = 0
+        if engine is not None and engine.last_timestamp is not None:
+            start = int(np.searchsorted(timestamps, engine.last_timestamp, side='left'))
+            if start > 0 and timestamps[start - 1] != engine.last_committed_timestamp:
+                # rows were inserted before the pending one (backfill), start over
+                engine, start = None, 0
+        if engine is None:
+            engine = self._engines[key] = IncrementalFeatures(self._history)
+
+        columns = [
+            candles[column].to_numpy(dtype=np.float64)[start:].tolist()
+            for column in ('high', 'low', 'close', 'volume')
+        ]
+        for timestamp, high, low, close, volume in zip(timestamps[start:].tolist(), *columns):
+            engine.update(timestamp, high, low, close, volume)
+        return engine
+
+    def features(self, key: str, candles: pd.DataFrame) -> np.ndarray:
+        """Feature vector of the last row of `PreProcessor._features(candles)`."""
+        return self.sync(key, candles).features(len(candles))
@@ -0,0 +1,216 @@
+"""NumPy implementations of the pandas_ta (0.3.14b) indicators used by `PreProcessor`.
+
+All functions take and return float64 arrays of equal length, with NaN where the
+indicator is not defined yet, and follow pandas_ta's defaults and quirks (SMA-seeded
+EMA, Wilder's RMA as an adjusted EWM, epsilon-padded zero ranges).
+"""
+import sys
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+EPSILON = sys.float_info.epsilon
+
+
+def _full_window(values: np.ndarray, window: int, reduce) -> np.ndarray:
+    """Reduce every full window (pandas `rolling(window)` semantics, NaN propagates)."""
+    out = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        out[window - 1:] = reduce(sliding_window_view(values, window))
+    return out
+
+
+def _non_zero_range(high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    diff = high - low
+    if np.any(diff == 0):
+        diff = diff + EPSILON
+    return diff
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+
+def pct_change(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    return values / shift(values, periods) - 1
+
+
+def sma(values: np.ndarray, length: int) -> np.ndarray:
+    return _full_window(values, length, lambda w: w.mean(axis=1))
+
+
+def rolling_std(values: np.ndarray, length: int, ddof: int = 1) -> np.ndarray:
+    return _full_window(values, length, lambda w: w.std(axis=1, ddof=ddof))
+
+
+def rolling_max(values: np.ndarray, length: int) -> np.ndarray:
+    return _full_window(values, length, lambda w: w.max(axis=1))
+
+
+def rolling_min(values: np.ndarray, length: int) -> np.ndarray:
+    return _full_window(values, length, lambda w: w.min(axis=1))
+
+
+def _decay_sum(values: np.ndarray, decay: float, initial: float = 0.) -> np.ndarray:
+    """`out[t] = decay * out[t - 1] + values[t]` with `out[-1] = initial`, vectorized per block.
+
+    Blocks are short enough that `decay ** -block` stays below 1e3, which bounds the
+    rounding error of the scaled cumulative sums.
+    """
+    n = len(values)
+    if decay <= 0 or n == 0:
+        return values.astype(np.float64)
+    block = min(n, max(1, int(np.log(1e3) / -np.log(decay)))) if decay < 1 else n
+    blocks = -(-n // block)
+    padded = np.zeros(blocks * block)
+    padded[:n] = values
+    steps = np.arange(block)
+    local = np.cumsum(padded.reshape(blocks, block) * decay ** -steps, axis=1) * decay ** steps
+
+    # state carried into each block, one step per block
+    carried = np.empty(blocks)
+    state = initial
+    for b in range(blocks):
+        carried[b] = state
+        state = decay ** block * state + local[b, -1]
+    return (local + carried[:, None] * decay ** (steps + 1)).ravel()[:n]
+
+
+def ewm_mean(values: np.ndarray, alpha: float, adjust: bool = True, min_periods: int = 0) -> np.ndarray:
+    """pandas `ewm(alpha=alpha, adjust=adjust, min_periods=min_periods).mean()`.
+
+    Missing values decay the weights like pandas (`ignore_na=False`); with `adjust=False`
+    only leading ones are supported.
+    """
+    out = np.full(len(values), np.nan)
+    observed = ~np.isnan(values)
+    if not observed.any():
+        return out
+    first = int(np.argmax(observed))
+    decay = 1. - alpha
+
+    if adjust:
+        weighted = _decay_sum(np.where(observed[first:], values[first:], 0.), decay)
+        out[first:] = weighted / _decay_sum(observed[first:].astype(np.float64), decay)
+    else:
+        out[first:] = alpha * _decay_sum(values[first:], decay, initial=values[first] / alpha)
+
+    out[np.cumsum(observed) < max(min_periods, 1)] = np.nan
+    return out
+
+
+def rma(values: np.ndarray, length: int) -> np.ndarray:
+    return ewm_mean(values, 1. / length, min_periods=length)
+
+
+def ema(values: np.ndarray, length: int) -> np.ndarray:
+    """EMA seeded with the SMA of the first `length` values, leading NaNs skipped."""
+    out = np.full(len(values), np.nan)
+    observed = ~np.isnan(values)
+    if not observed.any():
+        return out
+    first = int(np.argmax(observed))
+    seed = first + length - 1
+    if seed >= len(values):
+        return out
+    seeded = values[seed:].copy()
+    seeded[0] = values[first:seed + 1].mean()
+    out[seed:] = ewm_mean(seeded, 2. / (length + 1), adjust=False)
+    return out
+
+
+def rsi(close: np.ndarray, length: int = 14) -> np.ndarray:
+    change = close - shift(close)
+    positive = np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.))
+    negative = np.where(change < 0, change, np.where(np.isnan(change), np.nan, 0.))
+    average_gain, average_loss = rma(positive, length), rma(negative, length)
+    return 100 * average_gain / (average_gain + np.abs(average_loss))
+
+
+def stoch(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    k: int = 14,
+    d: int = 3,
+    smooth_k: int = 3
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns: %K and %D"""
+    lowest, highest = rolling_min(low, k), rolling_max(high, k)
+    stoch_k = sma(100 * (close - lowest) / _non_zero_range(highest, lowest), smooth_k)
+    return stoch_k, sma(stoch_k, d)
+
+
+def macd(
+    close: np.ndarray,
+    fast: int = 12,
+    slow: int = 26,
+    signal: int = 9
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns: MACD line, histogram and signal line"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, line - signal_line, signal_line
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = shift(close)
+    ranges = np.abs(np.stack([_non_zero_range(high, low), high - prev_close, prev_close - low]))
+    out = np.nanmax(ranges, axis=0) if len(close) else np.empty(0)
+    out[:1] = np.nan
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int = 14) -> np.ndarray:
+    return rma(true_range(high, low, close), length)
+
+
+def adx(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    length: int = 14
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns: ADX, +DI and -DI"""
+    average_range = atr(high, low, close, length)
+    up, down = high - shift(high), shift(low) - low
+    plus = ((up > down) & (up > 0)) * up
+    minus = ((down > up) & (down > 0)) * down
+    plus[np.abs(plus) < EPSILON] = 0.
+    minus[np.abs(minus) < EPSILON] = 0.
+
+    scale = 100 / average_range
+    plus_di, minus_di = scale * rma(plus, length), scale * rma(minus, length)
+    dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return rma(dx, length), plus_di, minus_di
+
+
+def bbands(
+    close: np.ndarray,
+    length: int = 20,
+    std: float = 2.
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns: lower, middle and upper band"""
+    middle = sma(close, length)
+    deviation = std * rolling_std(close, length, ddof=0)
+    return middle - deviation, middle, middle + deviation
+
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    sign = np.sign(close - shift(close))
+    sign[:1] = 1.
+    return np.cumsum(sign * volume)
+
+
+def donchian(
+    high: np.ndarray,
+    low: np.ndarray,
+    lower_length: int = 20,
+    upper_length: int = 20
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns: lower, middle and upper channel"""
+    lower, upper = rolling_min(low, lower_length), rolling_max(high, upper_length)
+    return lower, 0.5 * (lower + upper), upper
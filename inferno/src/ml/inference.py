@@ -1,10 +1,14 @@
-from typing import Any
+from pathlib import Path
+from typing import Any, Optional
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from lightgbm import LGBMClassifier
 from time import time
 import logging
 
+from .features import plan_features
+from .incremental import IncrementalFeatureStrategy
 from .preprocessor import PreProcessor
 from .loader import ModelLoader
 from src.donchian.donchian import DonchianStrategy
@@ -12,48 +16,98 @@ from src.types.prediction import Prediction
 from src.types.signal import Suggestion
 from src.types.error import ValidateLoadingError
 from src.utils.error import log_raise
+from src.utils.validation import TailValidator
 
 
 logger = logging.getLogger(__name__)
 
 class ModelInference:
+    # compiled trees are walked row by row in NumPy, LightGBM is faster for larger batches
+    COMPILED_MAX_ROWS = 64
+
     def __init__(
         self,
         file: str,
         loader: ModelLoader,
         preprocessor: PreProcessor,
-        donchian: DonchianStrategy
-
+        donchian: DonchianStrategy,
+        incremental: Optional[IncrementalFeatureStrategy] = None,
+        validation_rate: float = 0.,
+        compile: bool = False,
+        mmap_mode: Optional[str] = None
     ):
         self._loader = loader
         self._preprocessor = preprocessor
         self._donchian = donchian
-        self._loader.load_model(file)
+        self._incremental = incremental
+        self.version = Path(file).stem
+        self._loader.load_model(file, mmap_mode=mmap_mode)
         loading = self._loader.get_model()
 
         self.scaler: StandardScaler = loading['scaler']
         self.clf: LGBMClassifier = loading['clf']
         self.features: list[str] = loading['features']
         self.threshold: float = loading['threshold']
+        self.compiled = self._loader.compile_model() if compile else None
+        self.plan = plan_features(tuple(self.features))
+        self.validator = TailValidator('ml', validation_rate, logger)
 
     
-    def predict(self, candles: pd.DataFrame) -> tuple[Suggestion, Prediction]:
-        data = self._donchian.get_weights(candles)
-        
-        features = self._preprocessor._features(data)
-        
-        x = features[self.features]
-        xs = self.scaler.transform(x)
-        
-        last_candle_model_input = xs[-1].reshape(1, -1)
-        probability = self.clf.predict_proba(last_candle_model_input)[0, 1] # type: ignore
-        
-        suggestion = Suggestion.HOLD
-        if probability > self.threshold:
-            suggestion = Suggestion.BUY
-        
-
-        return suggestion, Prediction(
-            confidence=probability,
-            timestamp=int(time() * 1000)
-        )
+    def _model_input(self, row: dict[str, float], candles: pd.DataFrame) -> dict[str, float]:
+        """Model input of the last candle from its `PreProcessor` features.
+
+        Model features that are not `PreProcessor` features (Donchian columns) come from
+        the latest Donchian weights, forward filled like the batch path does.
+        """
+        if any(feature not in row for feature in self.features):
+            latest = self._donchian.get_latest(candles)
+            row = {**row, **{feature: latest[feature] for feature in self.features if feature not in row}}
+        return {feature: row[feature] for feature in self.features}
+
+    def _full_model_input(self, candles: pd.DataFrame) -> dict[str, float]:
+        """Model input of the last candle recomputed over all candles (batch path)."""
+        data = self._preprocessor._features(self._donchian.get_weights(candles.copy()))
+        return {feature: float(data[feature].iloc[-1]) for feature in self.features}
+
+    def model_input(self, candles: pd.DataFrame, key: Optional[str] = None) -> dict[str, float]:
+        """Unscaled model features of the last candle.
+
+        Args:
+            candles: Candle frame as returned by `PreProcessor.convert`
+            key: Symbol and interval of `candles`, enables the streaming feature engine if configured
+        """
+        if self._incremental is not None and key is not None:
+            row = dict(zip(PreProcessor.FEATURE_COLS, self._incremental.features(key, candles)))
+        else:
+            # only the features (and trailing candles) this model needs
+            row = self.plan.latest(candles)
+        model_input = self._model_input(row, candles)
+        if self.validator.sample():
+            full = self._full_model_input(candles)
+            if not self.validator.check(model_input, full):
+                model_input = full
+        return model_input
+
+    def predict_batch(self, model_inputs: list[dict[str, float]]) -> list[tuple[Suggestion, Prediction]]:
+        """Predictions for `model_input` rows with one `transform` and `predict_proba` call."""
+        if not model_inputs:
+            return []
+        rows = [[model_input[feature] for feature in self.features] for model_input in model_inputs]
+        if self.compiled is not None and len(rows) <= self.COMPILED_MAX_ROWS:
+            probabilities = self.compiled.predict_proba(np.array(rows, dtype=np.float64))
+        else:
+            xs = self.scaler.transform(pd.DataFrame(rows, columns=self.features))
+            probabilities = self.clf.predict_proba(xs)[:, 1] # type: ignore
+
+        timestamp = int(time() * 1000)
+        return [
+            (
+                Suggestion.BUY if probability > self.threshold else Suggestion.HOLD,
+                Prediction(confidence=probability, timestamp=timestamp, model_version=self.version)
+            )
+            for probability in probabilities
+        ]
+
+    def predict(self, candles: pd.DataFrame, key: Optional[str] = None) -> tuple[Suggestion, Prediction]:
+        """Buy probability of the last candle, see `model_input` for the arguments."""
+        return self.predict_batch([self.model_input(candles, key)])[0]
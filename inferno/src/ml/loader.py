@@ -4,6 +4,8 @@ import joblib
 import logging
 from datetime import datetime
 
+from .compiled import CompiledTrees
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,11 +32,12 @@ class ModelLoader:
         self.current_model: Optional[Any] = None
         self.model_metadata: Dict[str, Any] = {}
 
-    def load_model(self, model_path: Union[str, Path]) -> None:
+    def load_model(self, model_path: Union[str, Path], mmap_mode: Optional[str] = None) -> None:
         """Load a model from the specified path.
 
         Args:
             model_path: Path to the model file (.pkl or .joblib)
+            mmap_mode: Memory-map the arrays of uncompressed joblib files (see `joblib.load`)
 
         Raises:
             FileNotFoundError: If model file doesn't exist
@@ -48,7 +51,10 @@ class ModelLoader:
             raise ValueError(f"Unsupported model format: {model_path.suffix}")
 
         try:
-            self.current_model = joblib.load(model_path)
+            if mmap_mode is not None and model_path.suffix == ".joblib":
+                self.current_model = joblib.load(model_path, mmap_mode=mmap_mode)
+            else:
+                self.current_model = joblib.load(model_path)
             self.model_metadata = {"loaded_at": datetime.now().isoformat(), "model_path": str(model_path), "model_type": type(self.current_model).__name__}
             logger.info(f"Successfully loaded model from {model_path}")
         except Exception as e:
@@ -75,3 +81,21 @@ class ModelLoader:
             Dictionary containing model metadata
         """
         return self.model_metadata.copy()
+
+    def compile_model(self) -> CompiledTrees:
+        """Compile the classifier of the currently loaded model, with its scaler folded in.
+
+        Returns:
+            Flat tree ensemble taking unscaled feature rows
+
+        Raises:
+            RuntimeError: If no model is currently loaded
+            UnsupportedModelError: If the classifier is not a binary LightGBM model with numerical splits
+        """
+        model = self.get_model()
+        compiled = CompiledTrees(model['clf'], model.get('scaler'))
+        logger.info(
+            f"Compiled {len(compiled.roots)} trees ({len(compiled.values)} nodes, depth {compiled.depth}), "
+            f"scaler {'folded' if compiled.folded else 'applied per row'}"
+        )
+        return compiled
@@ -1,7 +1,9 @@
-from typing import Any
+from typing import Any, Mapping, Union
 import numpy as np
 import pandas as pd
-import pandas_ta as ta
+
+from .features import CANDLE_INPUTS, plan_features
+from src.hyperliquid.files import CANDLE_COLUMNS
 
 
 class PreProcessor:
@@ -26,19 +28,17 @@ class PreProcessor:
     ]
 
     @classmethod
-    def convert(cls, data: list[dict[str, Any]]) -> pd.DataFrame:
+    def convert(cls, data: Union[list[dict[str, Any]], Mapping[str, np.ndarray]]) -> pd.DataFrame:
+        if isinstance(data, Mapping):
+            # typed columns from CandleBuffer, nothing to parse
+            return pd.DataFrame({
+                column: data[key] for key, column in CANDLE_COLUMNS.items()
+            })
+
         df = pd.DataFrame(
             data=data,
         ).rename(
-            columns={
-                "T": "end",
-                "o": "open",
-                "c": "close",
-                "h": "high",
-                "l": "low",
-                "v": "volume",
-                "t": "timestamp",
-            }
+            columns=CANDLE_COLUMNS
         )
         df['end'] = df["end"].astype(int)
         df['open'] = df["open"].astype(float)
@@ -52,45 +52,17 @@ class PreProcessor:
 
     @classmethod
     def _features(cls, data: pd.DataFrame) -> pd.DataFrame:
-        data["rsi_14"] = ta.rsi(data["close"], length=14)
-
-        data["mom_10d"] = data["close"].pct_change(periods=10)
-        data["mom_30d"] = data["close"].pct_change(periods=30)
-
-        data[["stochk_14_3_3", "stochd_14_3_3"]] = ta.stoch(
-            data["high"], data["low"], data["close"], k=14, d=3, smooth_k=3
-        )
-
-        data["macd_hist"] = ta.macd(data["close"])["MACDh_12_26_9"]  # type: ignore[reportOptionalMemberAccess]
-
-        data[["adx_14", "plus_di_14", "minus_di_14"]] = ta.adx(
-            data["high"], data["low"], data["close"], length=14
-        )
-
-        data["sma_50_ratio"] = data["close"] / ta.sma(data["close"], length=50) - 1  # type: ignore[reportOptionalMemberAccess]
-        data["ema_20_ratio"] = data["close"] / ta.ema(data["close"], length=50) - 1  # type: ignore[reportOptionalMemberAccess]
-
-        data["atr_14_norm"] = ta.atr(data["high"], data["low"], data["close"], length=14) / data["close"]  # type: ignore[reportOptionalMemberAccess]
-
-        _bbands = ta.bbands(data["close"], length=20, std=2)
-        data["bbands_width_20_2"] = (_bbands["BBU_20_2.0"] - _bbands["BBL_20_2.0"]) / _bbands["BBM_20_2.0"]  # type: ignore[reportOptionalMemberAccess]
-
-        data["log_returns_1d"] = np.log(data["close"] / data["close"].shift(1))
-        data["volatility_30d"] = data["log_returns_1d"].rolling(window=30).std()
-        data["volatility_90d"] = data["log_returns_1d"].rolling(window=90).std()
-
-        data["obv_pct_change_10d"] = ta.obv(data["close"], data["volume"]).pct_change(
-            periods=10
-        )
-
-        _dc = ta.donchian(
-            high=data["high"], low=data["low"], lower_length=60, upper_length=60
-        )
-        data["donchian_width_rel_60"] = (_dc["DCU_60_60"] - _dc["DCL_60_60"]) / data["close"]  # type: ignore[reportOptionalMemberAccess]
-
-        data.drop(columns=["log_returns_1d"], errors="ignore", inplace=True)
-
-        data[cls.FEATURE_COLS] = data[cls.FEATURE_COLS].shift(1)
+        features = plan_features(tuple(cls.FEATURE_COLS)).compute({
+            name: data[name].to_numpy(dtype=np.float64) for name in CANDLE_INPUTS
+        })
+
+        # features of a row only use candles up to the previous one
+        values = np.full((len(data), len(cls.FEATURE_COLS)), np.nan)
+        values[1:] = np.column_stack([features[column][:-1] for column in cls.FEATURE_COLS])
+        data = pd.concat([
+            data.drop(columns=cls.FEATURE_COLS, errors="ignore"),
+            pd.DataFrame(values, columns=cls.FEATURE_COLS, index=data.index)
+        ], axis=1)
 
         data.ffill(inplace=True)
         data.bfill(inplace=True)
@@ -98,6 +70,6 @@ class PreProcessor:
         return data
 
     @classmethod
-    def process(cls, data: list[dict[str, Any]]) -> pd.DataFrame:
+    def process(cls, data: Union[list[dict[str, Any]], Mapping[str, np.ndarray]]) -> pd.DataFrame:
         _data = cls.convert(data)
         return cls._features(_data)
@@ -0,0 +1,220 @@
+from pathlib import Path
+from threading import Event, Lock, Thread
+from time import perf_counter
+from typing import Callable, NamedTuple, Optional, Union
+import logging
+import os
+
+from .inference import ModelInference
+from src.types.error import UnknownModelError
+from src.utils.error import log_raise
+
+logger = logging.getLogger(__name__)
+
+MODEL_SUFFIXES = ('.joblib', '.pkl')
+
+
+def resident_bytes() -> Optional[int]:
+    """Resident memory of this process, None where `/proc` is not available."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelVersion(NamedTuple):
+    """A loaded model bundle, named after its file (without suffix)."""
+    name: str
+    path: Path
+    modified: float
+    inference: ModelInference
+    load_ms: float
+    # growth of the process' resident memory while loading, an estimate
+    memory_bytes: Optional[int]
+
+
+class ModelRegistry:
+    """Model versions loaded from the bundles in `models_dir`, one of them active.
+
+    The active bundle and the `preload` versions (shadow models) are loaded up front, a
+    preload that fails is logged and skipped, only the active one is required. Any other
+    bundle is loaded by the first `get` naming it, so old bundles in the directory cost
+    neither startup time nor memory until they are used, and a broken one only fails its
+    own requests.
+
+    A background thread polls the directory and reloads modified bundles of loaded
+    versions off the request path; `load` builds a version's `ModelInference` from a file
+    path. A version replaces the one of the same name, and the active one when it is the
+    active file (or the most recently modified one with `follow_latest`), with a single
+    reference swap, so requests in flight finish on the version they started with.
+    """
+
+    def __init__(
+        self,
+        models_dir: Union[str, Path],
+        active: str,
+        load: Callable[[Path], ModelInference],
+        poll_interval: float = 5.,
+        follow_latest: bool = False,
+        preload: list[str] = []
+    ):
+        self.models_dir = Path(models_dir)
+        self._load = load
+        self.poll_interval = poll_interval
+        self.follow_latest = follow_latest
+        self.preload = set(preload)
+
+        self._lock = Lock()
+        # serializes loads on first use, concurrent requests for a version load it once
+        self._loading = Lock()
+        self._versions: dict[str, ModelVersion] = {}
+        self._bundles: dict[str, Path] = {}
+        self._failed: dict[Path, float] = {}
+        self._seen: dict[Path, float] = {}
+        self._active = self.load(self.models_dir / active).name
+        self._index()
+        for version in sorted(self.preload - {self._active}):
+            path = self._bundles.get(version)
+            if path is None:
+                logger.warning(f'model {version} to preload is not in {self.models_dir}')
+            else:
+                self._try_load(path)
+
+        self._closed = Event()
+        self._thread: Optional[Thread] = None
+        if poll_interval > 0:
+            self._thread = Thread(target=self._watch, name='model-registry', daemon=True)
+            self._thread.start()
+
+    @property
+    def active(self) -> ModelVersion:
+        return self._versions[self._active]
+
+    @property
+    def versions(self) -> dict[str, ModelVersion]:
+        """The loaded versions."""
+        return dict(self._versions)
+
+    @property
+    def bundles(self) -> dict[str, Path]:
+        """Bundle files by version name as of the last scan, loaded or not."""
+        return dict(self._bundles)
+
+    def get(self, version: Optional[str] = None) -> ModelVersion:
+        """The version named `version`, the active one if None.
+
+        A version that is not loaded yet is loaded from its bundle first.
+
+        Raises:
+            UnknownModelError: If there is no bundle for `version` or it can't be loaded
+        """
+        model = self._versions.get(version or self._active)
+        if model is not None:
+            return model
+        path = self._bundles.get(version) # type: ignore
+        if path is None:
+            log_raise(f'Unknown model version: {version}', logger, UnknownModelError)
+        with self._loading:
+            model = self._versions.get(version) # type: ignore
+            if model is None:
+                model = self._try_load(path) # type: ignore
+        if model is None:
+            log_raise(f'Model version {version} could not be loaded', logger, UnknownModelError)
+        return model # type: ignore
+
+    def activate(self, version: str) -> None:
+        self.get(version)
+        with self._lock:
+            self._active = version
+        logger.info(f'activated model {version}')
+
+    def load(self, path: Path) -> ModelVersion:
+        """Load the bundle at `path` as a version and publish it."""
+        before = resident_bytes()
+        start = perf_counter()
+        modified = path.stat().st_mtime
+        inference = self._load(path)
+        load_ms = (perf_counter() - start) * 1000
+        after = resident_bytes()
+        memory = after - before if before is not None and after is not None else None
+
+        model = ModelVersion(path.stem, path, modified, inference, load_ms, memory)
+        with self._lock:
+            versions = dict(self._versions)
+            versions[model.name] = model
+            self._versions = versions
+        memory_info = f', {memory / 2**20:.1f} MiB resident' if memory is not None else ''
+        logger.info(f'loaded model {model.name} in {load_ms:.0f} ms{memory_info}')
+        return model
+
+    def _try_load(self, path: Path) -> Optional[ModelVersion]:
+        """`load`, None if it fails until the file is modified."""
+        try:
+            modified = path.stat().st_mtime
+        except OSError:
+            logger.exception(f'could not load model {path}')
+            return None
+        if self._failed.get(path) == modified:
+            return None
+        try:
+            return self.load(path)
+        except Exception:
+            logger.exception(f'could not load model {path}')
+            self._failed[path] = modified
+            return None
+
+    def _index(self) -> dict[Path, float]:
+        """Index the bundles in `models_dir` by version name, returns their modification times."""
+        bundles: dict[str, Path] = {}
+        modified: dict[Path, float] = {}
+        for path in sorted(self.models_dir.iterdir()):
+            if path.suffix not in MODEL_SUFFIXES:
+                continue
+            try:
+                modified[path] = path.stat().st_mtime
+            except OSError:
+                continue # removed meanwhile
+            bundles.setdefault(path.stem, path)
+        # loaded versions keep their file even if it is gone
+        for model in self._versions.values():
+            bundles.setdefault(model.name, model.path)
+        self._bundles = bundles
+        return modified
+
+    def scan(self) -> None:
+        """Index the bundles and reload the loaded versions (and preloads) whose bundle is
+        new or modified since it was loaded. With `follow_latest` a bundle newer than the
+        active one is loaded and activated.
+
+        A bundle is loaded once it is unchanged since the previous scan, so files that
+        are still being written are skipped.
+        """
+        modified = self._index()
+        loaded = {model.path: model.modified for model in self._versions.values()}
+        for path, mtime in modified.items():
+            if loaded.get(path) == mtime or self._failed.get(path) == mtime:
+                continue
+            newer = self.follow_latest and mtime > self.active.modified
+            if path not in loaded and path.stem not in self.preload and not newer:
+                continue # loaded on first use
+            if self._seen.get(path) != mtime:
+                self._seen[path] = mtime
+                continue
+            model = self._try_load(path)
+            if model is not None and newer:
+                self.activate(model.name)
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _watch(self) -> None:
+        while True:
+            try:
+                self.scan()
+            except OSError:
+                logger.exception(f'could not scan {self.models_dir}')
+            if self._closed.wait(self.poll_interval):
+                return
@@ -0,0 +1,173 @@
+from pathlib import Path
+from queue import Full, Queue
+from threading import Lock, Thread
+from time import sleep, time
+from typing import NamedTuple, Optional, Union
+import logging
+
+import pandas as pd
+
+from .registry import ModelRegistry
+from src.types.signal import Suggestion
+
+logger = logging.getLogger(__name__)
+
+SHADOW_LOG_COLUMNS = (
+    'time', 'key', 'timestamp', 'primary', 'primary_confidence', 'shadow', 'shadow_confidence', 'agree'
+)
+
+
+class _ShadowTask(NamedTuple):
+    key: str
+    timestamp: int
+    candles: pd.DataFrame
+    model_input: dict[str, float]
+    primary: str
+    suggestion: Suggestion
+    confidence: float
+
+
+class ShadowScorer:
+    """Scores ML requests with shadow model versions off the request path.
+
+    The primary model's feature vector is reused when a shadow uses the same features,
+    otherwise the shadow computes its own from the candles. Every score is appended to
+    a CSV at `path` (`SHADOW_LOG_COLUMNS`); `agree` is whether both suggest the same.
+    `submit` never blocks: when `queue_size` tasks are waiting, new ones are dropped.
+    Workers wait `batch_wait_ms` after a task arrives and score up to `batch_size` queued
+    tasks per prediction call, which keeps them from competing with requests for the GIL
+    on every task.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        shadows: list[str],
+        path: Union[str, Path],
+        workers: int = 1,
+        queue_size: int = 1_000,
+        batch_size: int = 64,
+        batch_wait_ms: float = 50.,
+        log_every: int = 10_000
+    ):
+        self._registry = registry
+        self.shadows = shadows
+        self._batch_size = batch_size
+        self._batch_wait_ms = batch_wait_ms
+        self._log_every = log_every
+        self._queue: Queue[Optional[_ShadowTask]] = Queue(maxsize=queue_size)
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, 'a', buffering=1 << 16)
+        if new_file:
+            self._file.write(','.join(SHADOW_LOG_COLUMNS) + '\n')
+
+        self._lock = Lock()
+        self._dropped = 0
+        self._scored: dict[str, int] = {}
+        self._disagreed: dict[str, int] = {}
+
+        self._threads = [
+            Thread(target=self._run, name=f'shadow-{i}', daemon=True) for i in range(max(workers, 1))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def stats(self) -> dict[str, object]:
+        """Dropped tasks and, per shadow version, scores and disagreement rate."""
+        with self._lock:
+            return {
+                'dropped': self._dropped,
+                'queued': self._queue.qsize(),
+                'shadows': {
+                    shadow: {'scored': scored, 'disagreement': self._disagreed[shadow] / scored}
+                    for shadow, scored in self._scored.items()
+                },
+            }
+
+    def submit(
+        self,
+        key: str,
+        candles: pd.DataFrame,
+        model_input: dict[str, float],
+        primary: str,
+        suggestion: Suggestion,
+        confidence: float
+    ) -> bool:
+        """Queue a request the primary model answered, False if it was dropped."""
+        task = _ShadowTask(
+            key, int(candles['timestamp'].iloc[-1]), candles, model_input, primary, suggestion, confidence
+        )
+        try:
+            self._queue.put_nowait(task)
+        except Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        return True
+
+    def close(self) -> None:
+        """Score what is queued, then stop and flush the log."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._file.close()
+
+    def _score(self, tasks: list[_ShadowTask], shadow: str) -> list[str]:
+        """Score `tasks` with one batched prediction, returns their log lines."""
+        model = self._registry.versions.get(shadow)
+        if model is None:
+            return [] # not loaded (yet)
+        tasks = [task for task in tasks if task.primary != model.name]
+        inference = model.inference
+        model_inputs = [
+            task.model_input if all(feature in task.model_input for feature in inference.features)
+            else inference.model_input(task.candles)
+            for task in tasks
+        ]
+        results = inference.predict_batch(model_inputs)
+
+        now = int(time() * 1000)
+        lines, disagreed = [], 0
+        for task, (suggestion, prediction) in zip(tasks, results):
+            agree = suggestion == task.suggestion
+            disagreed += not agree
+            lines.append(
+                f'{now},{task.key},{task.timestamp},{task.primary},{task.confidence:.6g},'
+                f'{model.name},{prediction.confidence:.6g},{int(agree)}\n'
+            )
+        with self._lock:
+            before = self._scored.get(shadow, 0)
+            self._scored[shadow] = before + len(tasks)
+            self._disagreed[shadow] = self._disagreed.get(shadow, 0) + disagreed
+        if (before + len(tasks)) // self._log_every > before // self._log_every:
+            logger.info(f'shadow scoring: {self.stats}')
+        return lines
+
+    def _run(self) -> None:
+        while True:
+            tasks = [self._queue.get()]
+            if tasks[0] is not None:
+                sleep(self._batch_wait_ms / 1000)
+            # one stop sentinel per worker at most
+            while tasks[-1] is not None and len(tasks) < self._batch_size and not self._queue.empty():
+                tasks.append(self._queue.get_nowait())
+            stop = tasks[-1] is None
+            tasks = [task for task in tasks if task is not None]
+
+            lines = []
+            for shadow in self.shadows:
+                try:
+                    lines.extend(self._score(tasks, shadow)) # type: ignore
+                except Exception:
+                    logger.exception(f'shadow model {shadow} failed')
+            with self._lock:
+                self._file.write(''.join(lines))
+                if self._queue.empty():
+                    self._file.flush()
+            if stop:
+                return
@@ -0,0 +1,416 @@
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from time import time
+from typing import Callable, Optional, Protocol, Union
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.config import Settings
+from src.hyperliquid.buffer import CandleBuffer
+from src.hyperliquid.collection import HyperliquidCollector
+from src.hyperliquid.connection import CandleFeed
+from src.hyperliquid.replay import ReplayConnection
+from src.donchian.donchian import DonchianStrategy
+from src.donchian.incremental import IncrementalDonchianStrategy
+from src.ml.incremental import IncrementalFeatureStrategy
+from src.ml.preprocessor import PreProcessor
+from src.ml.loader import ModelLoader
+from src.ml.inference import ModelInference
+from src.ml.batching import InferenceBatcher
+from src.ml.registry import ModelRegistry, ModelVersion
+from src.ml.shadow import ShadowScorer
+from src.types.signal import (
+    SignalType, Suggestion, SignalResponse, SignalRequest
+)
+from src.types.prediction import Prediction
+from src.types.error import UnknownModelError, UnknownSymbolError, UnsupportedIntervalError
+from src.utils.cache import LRUCache
+from src.utils.lanes import KeyedExecutor
+from src.utils.singleflight import SingleFlight
+from src.utils.timing import log_duration
+
+logger = logging.getLogger(__name__)
+
+MAX_CANDLES = 500
+
+
+class CandleSource(Protocol):
+    """What the service reads candles from, see `HyperliquidCollector` and `shared.SharedCandles`."""
+
+    @property
+    def ready(self) -> bool: ...
+
+    def stop(self) -> None: ...
+
+    def is_stale(self, symbol: str) -> bool: ...
+
+    def wait_for_backfill(self, symbol: str, timeout: Optional[float] = None) -> bool: ...
+
+    def candle_state(self, symbol: str, interval: Optional[str] = None) -> tuple[int, int, Optional[int]]: ...
+
+    def get_candles(self, symbol: str, interval: Optional[str] = None) -> dict[str, np.ndarray]: ...
+
+
+def failed_response() -> SignalResponse:
+    return SignalResponse(
+        success=False,
+        suggestion=Suggestion.HOLD,
+        timestamp=int(time()*1000)
+    )
+
+
+class SignalService:
+    """Signals for requests from the collector's candles and the registry's models.
+
+    Independent of the broker: consumers call `respond` and publish what it returns,
+    a response or, when it is computed on worker lanes, ML predictions are batched or
+    the request is coalesced, a future of it (resolved on a background thread).
+    """
+
+    def __init__(
+        self,
+        collector: CandleSource,
+        registry: ModelRegistry,
+        donchian: DonchianStrategy,
+        preprocessor: PreProcessor,
+        incremental_donchian: Optional[IncrementalDonchianStrategy] = None,
+        batcher: Optional[InferenceBatcher] = None,
+        shadow: Optional[ShadowScorer] = None,
+        signal_cache: Optional[LRUCache[SignalResponse]] = None,
+        single_flight: Optional[SingleFlight] = None,
+        backfill_timeout: float = 5.
+    ):
+        self.collector = collector
+        self.registry = registry
+        self.donchian = donchian
+        self.preprocessor = preprocessor
+        self.incremental_donchian = incremental_donchian
+        self.batcher = batcher
+        self.shadow = shadow
+        self.signal_cache = signal_cache
+        self.single_flight = single_flight
+        self.backfill_timeout = backfill_timeout
+
+    def respond(
+        self,
+        request: SignalRequest,
+        workers: Optional[KeyedExecutor] = None
+    ) -> Union[SignalResponse, 'Future[SignalResponse]']:
+        """Response to `request`, failed instead of raising.
+
+        With `workers` it is generated on the lane of the request's symbol and a future
+        of it is returned. Identical requests are coalesced before that, on the calling
+        thread, so they share the computation in flight instead of queueing behind it.
+        """
+        try:
+            if workers is None:
+                compute = partial(self.generate, request)
+            else:
+                compute = partial(self._submit, workers, request)
+            if self.single_flight is None:
+                return compute()
+            key = (request.symbol, request.interval, request.signal_type, request.model_version, request.wait_for_backfill)
+            return self.single_flight.do(key, compute)
+        except Exception:
+            logger.exception(f'request failed: {request}')
+            return failed_response()
+
+    def generate(self, request: SignalRequest) -> Union[SignalResponse, 'Future[SignalResponse]']:
+        """Signal for `request`, a future of it if ML predictions are batched.
+
+        Responses are cached per symbol, interval, signal type, model version and candle state
+        (see `HyperliquidCollector.candle_state`), so any candle update invalidates them.
+        """
+        try:
+            if request.wait_for_backfill:
+                self.collector.wait_for_backfill(request.symbol, self.backfill_timeout)
+            # resolve the model version once, a swap during the request doesn't affect it
+            model = self.registry.get(request.model_version) if request.signal_type == SignalType.ML else None
+            cache_key = None
+            if self.signal_cache is not None:
+                cache_key = (
+                    request.symbol, request.interval, request.signal_type, model and model.name,
+                    *self.collector.candle_state(request.symbol, request.interval)
+                )
+                cached = self.signal_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            stale = self.collector.is_stale(request.symbol)
+            raw_candles = self.collector.get_candles(symbol=request.symbol, interval=request.interval)
+        except (UnknownSymbolError, UnsupportedIntervalError, UnknownModelError):
+            return failed_response()
+        response = self.compute_signal(request, model, stale, raw_candles)
+        if cache_key is not None:
+            self._cache_response(cache_key, response)
+        return response
+
+    def compute_signal(
+        self,
+        request: SignalRequest,
+        model: Optional[ModelVersion],
+        stale: bool,
+        raw_candles: dict[str, np.ndarray]
+    ) -> Union[SignalResponse, 'Future[SignalResponse]']:
+        candles = self.preprocessor.convert(raw_candles)
+        if request.signal_type == SignalType.TECHNICAL:
+            if self.incremental_donchian is not None:
+                last_candle_timestamp, last_candle_suggestion = self.incremental_donchian.get_signal(f'{request.symbol}:{request.interval}', candles)
+            else:
+                last_candle_timestamp, last_candle_suggestion = self.donchian.get_signal(candles)
+            return SignalResponse(
+                success=True,
+                suggestion=last_candle_suggestion,
+                timestamp=last_candle_timestamp,
+                stale=stale
+            )
+        elif request.signal_type == SignalType.ML and model is not None:
+            key = f'{request.symbol}:{request.interval}'
+            model_input = model.inference.model_input(candles, key=key)
+            respond = partial(self._ml_response, candles.iloc[-1]['timestamp'], stale)
+            if self.shadow is not None:
+                respond = partial(self._shadow_response, respond, key, candles, model_input)
+            if self.batcher is not None:
+                return self.batcher.submit(model.inference, model_input, respond)
+            return respond(*model.inference.predict_batch([model_input])[0])
+        else:
+            return failed_response()
+
+    def warm_up(self, symbols: list[str]) -> None:
+        """Run every signal type once so the first real request doesn't pay for lazy initialization."""
+        for symbol in symbols:
+            for signal_type in SignalType:
+                response = self.generate(SignalRequest(symbol=symbol, signal_type=signal_type))
+                if isinstance(response, Future):
+                    response.result()
+
+    def close(self) -> None:
+        """Finish batched predictions and shadow scores, then stop the registry and collector."""
+        if self.batcher is not None:
+            self.batcher.close()
+        if self.shadow is not None:
+            self.shadow.close()
+        self.registry.close()
+        self.collector.stop()
+
+    def _generate(self, request: SignalRequest) -> Union[SignalResponse, 'Future[SignalResponse]']:
+        try:
+            return self.generate(request)
+        except Exception:
+            logger.exception(f'request failed: {request}')
+            return failed_response()
+
+    def _submit(self, workers: KeyedExecutor, request: SignalRequest) -> 'Future[SignalResponse]':
+        """`generate` on the lane of the request's symbol, cancelling the future before
+        the lane picks the request up skips it."""
+        response: 'Future[SignalResponse]' = Future()
+
+        def resolve(done: Future) -> None:
+            if done.cancelled():
+                return
+            try:
+                result = done.result()
+                if isinstance(result, Future):
+                    # batched prediction, resolve once it is predicted
+                    result.add_done_callback(resolve)
+                    return
+                response.set_result(result)
+            except InvalidStateError:
+                pass # cancelled meanwhile
+            except Exception as e:
+                try:
+                    response.set_exception(e)
+                except InvalidStateError:
+                    pass
+
+        lane = workers.submit(request.symbol, self._generate, request)
+        response.add_done_callback(lambda done: done.cancelled() and lane.cancel())
+        lane.add_done_callback(resolve)
+        return response
+
+    def _cache_response(self, key: tuple, response: Union[SignalResponse, 'Future[SignalResponse]']) -> None:
+        """Cache successful responses, batched ones once they are predicted."""
+        if isinstance(response, Future):
+            response.add_done_callback(
+                lambda future: future.exception() is None and self._cache_response(key, future.result())
+            )
+        elif response.success:
+            self.signal_cache.put(key, response) # type: ignore
+
+    @staticmethod
+    def _ml_response(timestamp: int, stale: bool, suggestion: Suggestion, prediction: Prediction) -> SignalResponse:
+        return SignalResponse(
+            success=True,
+            suggestion=suggestion,
+            timestamp=timestamp,
+            prediction=prediction,
+            stale=stale
+        )
+
+    def _shadow_response(
+        self,
+        respond: Callable[[Suggestion, Prediction], SignalResponse],
+        key: str,
+        candles: pd.DataFrame,
+        model_input: dict[str, float],
+        suggestion: Suggestion,
+        prediction: Prediction
+    ) -> SignalResponse:
+        """`respond`, queueing the request for the shadow models (never waits for them)."""
+        self.shadow.submit(key, candles, model_input, prediction.model_version, suggestion, prediction.confidence) # type: ignore
+        return respond(suggestion, prediction)
+
+
+def create_feed(settings: Settings) -> Optional[CandleFeed]:
+    """Offline market data source if configured, None for the live Hyperliquid connection."""
+    replay = dict(
+        speed=settings.REPLAY_SPEED,
+        updates_per_candle=settings.REPLAY_UPDATES_PER_CANDLE
+    )
+    if settings.FEED == 'replay':
+        if settings.REPLAY_PATH is None:
+            raise ValueError('REPLAY_PATH is required with FEED=replay')
+        return ReplayConnection.recorded(settings.REPLAY_PATH, **replay)
+    if settings.FEED == 'synthetic':
+        return ReplayConnection.synthetic(settings.SYMBOLS, n=settings.REPLAY_CANDLES, **replay)
+    if settings.FEED != 'hyperliquid':
+        raise ValueError(f'Unknown feed: {settings.FEED}')
+    return None
+
+
+def start_collector(
+    settings: Settings,
+    buffer_factory: Optional[Callable[[str, int], CandleBuffer]] = None
+) -> HyperliquidCollector:
+    with log_duration('collector startup', logger):
+        collector = HyperliquidCollector(
+            test_net=settings.TEST_NET,
+            symbols=settings.SYMBOLS,
+            interval='1m',
+            max_candles=MAX_CANDLES,
+            max_symbols=settings.MAX_SYMBOLS,
+            storage_dir=settings.CANDLES_DIR,
+            backfill_page_size=settings.BACKFILL_PAGE_SIZE,
+            backfill_max_pages=settings.BACKFILL_MAX_PAGES,
+            backfill_workers=settings.BACKFILL_WORKERS,
+            connection=create_feed(settings),
+            buffer_factory=buffer_factory
+        )
+        collector.start(workers=settings.STARTUP_WORKERS)
+    return collector
+
+
+def create_donchian(settings: Settings) -> DonchianStrategy:
+    return DonchianStrategy(
+        LOOK_BACK_WINDOWS=settings.LOOK_BACK_WINDOWS,
+        TARGET_VOLATILITY=settings.TARGET_VOLATILITY,
+        MAX_ALLOCATION=settings.MAX_ALLOCATION,
+        VOLATILITY_WINDOW=settings.VOLATILITY_WINDOW,
+        TRADING_DAYS_PER_YEAR=settings.TRADING_DAYS_PER_YEAR,
+        RISK_FREE_RATE=settings.RISK_FREE_RATE,
+        TAIL_WARM_UP=settings.TAIL_WARM_UP,
+        TAIL_VALIDATION_RATE=settings.TAIL_VALIDATION_RATE
+    )
+
+
+def load_registry(settings: Settings, load_model: Callable[[Path], ModelInference]) -> ModelRegistry:
+    with log_duration('model load', logger):
+        return ModelRegistry(
+            settings.MODELS_DIR,
+            settings.MODEL_FILE,
+            load_model,
+            poll_interval=settings.MODEL_POLL_INTERVAL,
+            follow_latest=settings.MODEL_FOLLOW_LATEST,
+            preload=settings.SHADOW_MODELS
+        )
+
+
+def create_batcher(settings: Settings) -> Optional[InferenceBatcher]:
+    if settings.INFERENCE_BATCH_SIZE <= 1:
+        return None
+    return InferenceBatcher(settings.INFERENCE_BATCH_SIZE, settings.INFERENCE_BATCH_WINDOW_MS)
+
+
+def create_shadow(settings: Settings, registry: ModelRegistry) -> Optional[ShadowScorer]:
+    if not settings.SHADOW_MODELS:
+        return None
+    return ShadowScorer(
+        registry,
+        settings.SHADOW_MODELS,
+        settings.SHADOW_LOG,
+        workers=settings.SHADOW_WORKERS,
+        queue_size=settings.SHADOW_QUEUE_SIZE
+    )
+
+
+def create_signal_cache(settings: Settings) -> Optional[LRUCache[SignalResponse]]:
+    if settings.SIGNAL_CACHE_SIZE <= 0:
+        return None
+    return LRUCache('signal', settings.SIGNAL_CACHE_SIZE, logger)
+
+
+def start_service(
+    settings: Settings,
+    start_candles: Callable[[Settings], CandleSource] = start_collector
+) -> SignalService:
+    """Candle source start up (collector snapshots by default) and model load run
+    concurrently, then the service is warmed up."""
+    donchian = create_donchian(settings)
+    preprocessor = PreProcessor()
+    # feature state per symbol is shared by all model versions
+    incremental_features = IncrementalFeatureStrategy(history=MAX_CANDLES) if settings.INCREMENTAL_FEATURES else None
+
+    def load_model(path: Path) -> ModelInference:
+        return ModelInference(
+            str(path), ModelLoader(settings.MODELS_DIR), preprocessor, donchian, incremental_features,
+            validation_rate=settings.TAIL_VALIDATION_RATE,
+            compile=settings.COMPILE_MODEL,
+            mmap_mode=settings.MODEL_MMAP_MODE
+        )
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='startup') as startup:
+        collector_future = startup.submit(start_candles, settings)
+        registry_future = startup.submit(load_registry, settings, load_model)
+        collector = collector_future.result()
+        registry = registry_future.result()
+
+    service = SignalService(
+        collector,
+        registry,
+        donchian,
+        preprocessor,
+        incremental_donchian=IncrementalDonchianStrategy(donchian) if settings.INCREMENTAL_TECHNICAL else None,
+        batcher=create_batcher(settings),
+        shadow=create_shadow(settings, registry),
+        signal_cache=create_signal_cache(settings),
+        single_flight=SingleFlight('signal', logger) if settings.COALESCE_REQUESTS else None,
+        backfill_timeout=settings.BACKFILL_TIMEOUT
+    )
+    if isinstance(collector, HyperliquidCollector):
+        # streaming state of an evicted symbol would miss the candles received while it was gone
+        for strategy in (service.incremental_donchian, incremental_features):
+            if strategy is not None:
+                collector.add_eviction_listener(strategy.drop_symbol)
+    with log_duration('warm-up', logger):
+        service.warm_up(settings.SYMBOLS[:1])
+    return service
+
+
+def create_workers(settings: Settings) -> Optional[KeyedExecutor]:
+    """Consumer worker lanes, None to compute requests on the connection thread.
+
+    Requests are coalesced (see `SignalService.respond`) before they are submitted, so
+    a lane only ever computes distinct requests of its symbols.
+    """
+    count = settings.CONSUMER_WORKERS or os.cpu_count() or 1
+    if count <= 1:
+        return None
+    return KeyedExecutor(count, name='consumer')
+
+
+def consumer_prefetch(settings: Settings, workers: Optional[KeyedExecutor]) -> int:
+    # enough unacknowledged requests in flight to keep workers and batches busy
+    return settings.PREFETCH_COUNT or max(2 * (workers.workers if workers else 1), settings.INFERENCE_BATCH_SIZE, 1)
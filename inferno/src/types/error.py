@@ -1,4 +1,20 @@
 
 
 class ValidateLoadingError(Exception):
+    pass
+
+
+class UnsupportedModelError(ValueError):
+    pass
+
+
+class UnknownModelError(KeyError):
+    pass
+
+
+class UnknownSymbolError(KeyError):
+    pass
+
+
+class UnsupportedIntervalError(ValueError):
     pass
\ No newline at end of file
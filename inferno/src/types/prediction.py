@@ -1,5 +1,7 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, Field
 
 class Prediction(BaseModel):
     confidence: float
-    timestamp: int
\ No newline at end of file
+    timestamp: int
+    model_version: Optional[str] = Field(default=None, description="Model version that made the prediction.")
\ No newline at end of file
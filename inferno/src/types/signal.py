@@ -15,9 +15,13 @@ class SignalType(str, Enum):
 class SignalRequest(BaseModel):
     symbol: str
     signal_type: SignalType
+    interval: str = Field(default='1m', description="Candle interval of the signal.")
+    wait_for_backfill: bool = Field(default=False, description="Wait for missing candles instead of answering with stale data.")
+    model_version: Optional[str] = Field(default=None, description="Model version for ML signals, the active one if not set.")
 
 class SignalResponse(BaseModel):
     success: bool
     suggestion: Suggestion
     timestamp: int
-    prediction: Optional[Prediction] = Field(default=None, description="ML prediction if enabled.")
\ No newline at end of file
+    prediction: Optional[Prediction] = Field(default=None, description="ML prediction if enabled.")
+    stale: bool = Field(default=False, description="Candles had a gap that was not backfilled yet.")
\ No newline at end of file
@@ -0,0 +1,97 @@
+from typing import Any, Callable, Optional
+import asyncio
+import logging
+
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+from pika.channel import Channel
+
+logger = logging.getLogger(__name__)
+
+Delivery = tuple[Channel, Any, pika.BasicProperties, bytes]
+
+
+class AsyncBroker:
+    """Awaitable RabbitMQ connection on the running event loop (pika's `AsyncioConnection`).
+
+    Everything runs on the loop thread, so publishing and acking need no hand-off.
+    `closed` resolves when the connection is closed, by `close` or by the broker.
+    """
+
+    def __init__(self, parameters: pika.ConnectionParameters):
+        self._parameters = parameters
+        self._connection: Optional[AsyncioConnection] = None
+        self._channel: Optional[Channel] = None
+        self._consumer_tag: Optional[str] = None
+        self.closed: Optional[asyncio.Future] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._channel is not None and self._channel.is_open
+
+    async def connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        opened = loop.create_future()
+        self.closed = loop.create_future()
+
+        def on_open_error(connection: AsyncioConnection, error: BaseException) -> None:
+            if not opened.done():
+                opened.set_exception(ConnectionError(f'Broker connection failed: {error!r}'))
+
+        def on_close(connection: AsyncioConnection, reason: BaseException) -> None:
+            if not self.closed.done(): # type: ignore
+                self.closed.set_result(reason) # type: ignore
+
+        self._connection = AsyncioConnection(
+            self._parameters,
+            on_open_callback=opened.set_result,
+            on_open_error_callback=on_open_error,
+            on_close_callback=on_close,
+            custom_ioloop=loop
+        )
+        await opened
+
+        channel_opened = loop.create_future()
+        self._connection.channel(on_open_callback=channel_opened.set_result)
+        self._channel = await channel_opened
+
+    async def declare_queue(self, queue: str) -> None:
+        await self._call(self._channel.queue_declare, queue=queue) # type: ignore
+
+    async def set_qos(self, prefetch_count: int) -> None:
+        await self._call(self._channel.basic_qos, prefetch_count=prefetch_count) # type: ignore
+
+    def consume(self, queue: str, on_message: Callable[[Delivery], None]) -> None:
+        """Call `on_message` on the loop for every delivery of `queue` until `cancel`."""
+        self._consumer_tag = self._channel.basic_consume( # type: ignore
+            queue,
+            lambda channel, method, props, body: on_message((channel, method, props, body))
+        )
+
+    async def cancel(self) -> None:
+        """Stop deliveries, the ones received can still be acked."""
+        if self._consumer_tag is not None and self.is_open:
+            await self._call(self._channel.basic_cancel, self._consumer_tag) # type: ignore
+            self._consumer_tag = None
+
+    def publish(self, routing_key: str, body: str, properties: pika.BasicProperties) -> None:
+        self._channel.basic_publish(exchange='', routing_key=routing_key, properties=properties, body=body) # type: ignore
+
+    def ack(self, delivery_tag: int) -> None:
+        self._channel.basic_ack(delivery_tag=delivery_tag) # type: ignore
+
+    def nack(self, delivery_tag: int, requeue: bool = True) -> None:
+        if self.is_open:
+            self._channel.basic_nack(delivery_tag=delivery_tag, requeue=requeue) # type: ignore
+
+    async def close(self) -> None:
+        if self._connection is not None and not self._connection.is_closed and not self._connection.is_closing:
+            self._connection.close()
+        if self.closed is not None:
+            await self.closed
+
+    async def _call(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Await a channel method that reports completion through its `callback`."""
+        done = asyncio.get_running_loop().create_future()
+        method(*args, callback=done.set_result, **kwargs)
+        return await done
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from logging import Logger
+from threading import Lock
+from typing import Generic, Hashable, Optional, TypeVar
+
+V = TypeVar('V')
+
+
+class LRUCache(Generic[V]):
+    """Thread-safe cache of at most `max_entries` values, least recently used evicted first."""
+
+    def __init__(self, name: str, max_entries: int, logger: Logger, log_every: int = 10_000):
+        self.name = name
+        self.max_entries = max_entries
+        self._logger = logger
+        self._log_every = log_every
+        self._entries: OrderedDict[Hashable, V] = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': self._hits / lookups if lookups else 0.,
+            }
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+            lookups = self._hits + self._misses
+        if lookups % self._log_every == 0:
+            self._logger.info(f'{self.name} cache: {self.stats}')
+        return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
@@ -0,0 +1,27 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+import zlib
+
+
+class KeyedExecutor:
+    """Thread pool where tasks of the same key run one at a time, in submission order.
+
+    Each key maps to one of `workers` single-thread lanes, so per-key state needs no
+    locking and results for a key come out in order, while other keys run in parallel.
+    """
+
+    def __init__(self, workers: int, name: str = 'lane'):
+        self.workers = max(workers, 1)
+        self._lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'{name}-{i}') for i in range(self.workers)
+        ]
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        # crc32 of the text is stable across processes, unlike hash() of strings
+        lane = zlib.crc32(str(key).encode()) % self.workers
+        return self._lanes[lane].submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Run what is queued (if `wait`) and stop the lanes."""
+        for lane in self._lanes:
+            lane.shutdown(wait=wait)
@@ -0,0 +1,73 @@
+from concurrent.futures import Future
+from logging import Logger
+from threading import Lock
+from typing import Callable, Hashable, TypeVar, Union
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Runs one computation per key at a time, later callers for the key share its result.
+
+    The first caller runs `compute` and gets its result (a future of it if `compute`
+    returned one); callers arriving while it is pending get a future of the same result.
+    """
+
+    def __init__(self, name: str, logger: Logger, log_every: int = 1_000):
+        self.name = name
+        self._logger = logger
+        self._log_every = log_every
+        self._in_flight: dict[Hashable, Future] = {}
+        self._lock = Lock()
+        self._calls = 0
+        self._coalesced = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {'calls': self._calls, 'coalesced': self._coalesced, 'in_flight': len(self._in_flight)}
+
+    def do(self, key: Hashable, compute: Callable[[], Union[T, 'Future[T]']]) -> Union[T, 'Future[T]']:
+        with self._lock:
+            self._calls += 1
+            shared = self._in_flight.get(key)
+            if shared is None:
+                shared = self._in_flight[key] = Future()
+                leader = True
+            else:
+                self._coalesced += 1
+                leader = False
+                coalesced = self._coalesced
+        if not leader:
+            if coalesced % self._log_every == 0:
+                self._logger.info(f'{self.name} single-flight: {self.stats}')
+            return shared
+
+        try:
+            result = compute()
+        except BaseException as e:
+            self._finish(key, shared)
+            shared.set_exception(e)
+            raise
+        if isinstance(result, Future):
+            result.add_done_callback(lambda done: self._resolve(key, shared, done))
+            # callbacks of the shared future run in attach order, the first caller's first
+            return shared
+        else:
+            self._finish(key, shared)
+            shared.set_result(result)
+        return result
+
+    def _resolve(self, key: Hashable, shared: Future, done: Future) -> None:
+        self._finish(key, shared)
+        error = done.exception()
+        if error is not None:
+            shared.set_exception(error)
+        else:
+            shared.set_result(done.result())
+
+    def _finish(self, key: Hashable, shared: Future) -> None:
+        # later callers start a new computation, the ones attached get this result
+        with self._lock:
+            if self._in_flight.get(key) is shared:
+                del self._in_flight[key]
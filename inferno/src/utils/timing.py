@@ -0,0 +1,13 @@
+from contextlib import contextmanager
+from logging import Logger
+from time import perf_counter
+from typing import Iterator
+
+
+@contextmanager
+def log_duration(phase: str, logger: Logger) -> Iterator[None]:
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        logger.info(f'{phase} took {(perf_counter() - start) * 1000:.0f} ms')
@@ -0,0 +1,43 @@
+from logging import Logger
+from random import random
+from threading import Lock
+from typing import Mapping
+import math
+
+
+class TailValidator:
+    """Compares a sample of latest-only evaluations with a full recomputation."""
+
+    def __init__(self, name: str, rate: float, logger: Logger, rel_tol: float = 1e-9, abs_tol: float = 1e-12):
+        self.name = name
+        self.rate = rate
+        self._logger = logger
+        self._rel_tol = rel_tol
+        self._abs_tol = abs_tol
+        self._lock = Lock()
+        self._checks = 0
+        self._mismatches = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {'checks': self._checks, 'mismatches': self._mismatches}
+
+    def sample(self) -> bool:
+        return self.rate > 0 and random() < self.rate
+
+    def check(self, latest: Mapping[str, float], full: Mapping[str, float]) -> bool:
+        """Whether every value of `latest` matches `full`, logs the ones that don't."""
+        mismatched = {
+            key: (value, full[key]) for key, value in latest.items()
+            if not (
+                (math.isnan(value) and math.isnan(full[key]))
+                or math.isclose(value, full[key], rel_tol=self._rel_tol, abs_tol=self._abs_tol)
+            )
+        }
+        with self._lock:
+            self._checks += 1
+            self._mismatches += bool(mismatched)
+        if mismatched:
+            self._logger.warning(f'{self.name}: latest-only evaluation differs from full recomputation: {mismatched}')
+        return not mismatched
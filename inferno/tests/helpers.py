@@ -0,0 +1,108 @@
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from lightgbm import LGBMClassifier
+from sklearn.preprocessing import StandardScaler
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.donchian.donchian import DonchianStrategy
+from src.hyperliquid.connection import INTERVAL_MS
+from src.ml.preprocessor import PreProcessor
+
+MINUTE = 60_000
+
+
+def random_walk(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 2e-3, n)))
+
+
+def random_candles(n: int, seed: int = 0) -> pd.DataFrame:
+    """Candle frame in the `PreProcessor.convert` layout around a random walk."""
+    rng = np.random.default_rng(seed)
+    close = random_walk(n, seed)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    timestamp = 1_700_000_000_000 + 60_000 * np.arange(n, dtype=np.int64)
+    return pd.DataFrame({
+        'timestamp': timestamp,
+        'end': timestamp + 59_999,
+        'open': open_,
+        'close': close,
+        'high': np.maximum(open_, close) * (1 + rng.uniform(0, 1e-3, n)),
+        'low': np.minimum(open_, close) * (1 - rng.uniform(0, 1e-3, n)),
+        'volume': rng.uniform(1, 100, n),
+    })
+
+
+def synthetic_model(
+    path: Path,
+    features: list[str] = PreProcessor.FEATURE_COLS,
+    n: int = 1_000,
+    n_estimators: int = 20,
+    seed: int = 1
+) -> Path:
+    """Model file in the production layout trained on random candles (next close up or not)."""
+    data = PreProcessor._features(DonchianStrategy().get_weights(random_candles(n, seed)))
+    target = (data['close'].shift(-5) > data['close']).astype(int)
+    scaler = StandardScaler().fit(data[features])
+    clf = LGBMClassifier(n_estimators=n_estimators, num_leaves=15, verbose=-1)
+    clf.fit(pd.DataFrame(scaler.transform(data[features]), columns=features), target)
+    joblib.dump({'scaler': scaler, 'clf': clf, 'features': features, 'threshold': .5}, path)
+    return path
+
+
+def candle_dicts(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """`random_candles` in the exchange's (`CandleBuffer`) layout."""
+    candles = random_candles(n, seed)
+    return [
+        {'t': int(row.timestamp), 'T': int(row.end), 'o': row.open, 'h': row.high, 'l': row.low, 'c': row.close, 'v': row.volume}
+        for row in candles.itertuples()
+    ]
+
+
+def aggregate(candles: list[dict[str, Any]], interval_ms: int) -> list[dict[str, Any]]:
+    """Epoch-aligned `interval_ms` candles of `candles`, like the exchange builds them."""
+    buckets: dict[int, dict[str, Any]] = {}
+    for candle in candles:
+        t = candle['t'] - candle['t'] % interval_ms
+        bucket = buckets.get(t)
+        if bucket is None:
+            buckets[t] = {**candle, 't': t, 'T': t + interval_ms - 1}
+        else:
+            bucket.update(h=max(bucket['h'], candle['h']), l=min(bucket['l'], candle['l']), c=candle['c'], v=bucket['v'] + candle['v'])
+    return list(buckets.values())
+
+
+class HistoryFeed:
+    """`CandleFeed` serving 1m `candles` (aggregated for other intervals) as they were
+    at the newest one, to any of `perps`."""
+
+    def __init__(self, candles: list[dict[str, Any]], perps: list[str] = ['BTC']):
+        self.candles = candles
+        self.perps = perps
+        self.snapshots: list[tuple[Optional[int], Optional[int]]] = []
+        self.callbacks: dict[str, Callable] = {}
+
+    def subscribe(self, interval: str, coin: str, callback: Callable) -> None:
+        self.callbacks[coin] = callback
+
+    def unsubscribe(self, interval: str, coin: str) -> None:
+        self.callbacks.pop(coin, None)
+
+    def candles_snapshot(
+        self,
+        name: str,
+        interval: str,
+        limit: int,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> list[dict[str, Any]]:
+        self.snapshots.append((start_time, end_time))
+        if not self.candles:
+            return []
+        candles = self.candles if interval == '1m' else aggregate(self.candles, INTERVAL_MS[interval])
+        end_time = end_time or candles[-1]['t']
+        start_time = max(start_time or 0, end_time - INTERVAL_MS[interval] * limit)
+        return [candle for candle in candles if start_time <= candle['t'] <= end_time]
@@ -0,0 +1,89 @@
+"""Records the pandas_ta outputs `test_indicators.py` checks `src.ml.indicators` against.
+
+The service ran pandas_ta 0.3.14b0, which is no longer on PyPI. pandas-ta-classic
+0.3.14b1 re-releases the same 0.3.14b tree under another import name and is used
+when pandas_ta itself is not installed. Run from inferno/:
+
+    pip install --no-deps pandas-ta-classic==0.3.14b1
+    python -m tests.record_pandas_ta
+"""
+from pathlib import Path
+from types import ModuleType
+
+import numpy as np
+import pandas as pd
+
+from tests.helpers import random_candles
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'pandas_ta.csv'
+CANDLE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def reference_candles(n: int = 300) -> pd.DataFrame:
+    candles = random_candles(n)
+    # flat candles give zero ranges, which pandas_ta pads with epsilon
+    candles.loc[200:220, ['open', 'high', 'low', 'close']] = 100.
+    return candles[CANDLE_COLUMNS]
+
+
+def load_pandas_ta() -> ModuleType:
+    """pandas_ta 0.3.14b0, or its pandas-ta-classic re-release.
+
+    Raises:
+        ImportError: If neither is installed
+    """
+    # 0.3.14b imports `numpy.NaN`, which NumPy 2 removed (the service patched the import)
+    if not hasattr(np, 'NaN'):
+        np.NaN = np.nan # type: ignore
+    try:
+        import pandas_ta as ta
+    except ImportError:
+        import pandas_ta_classic as ta
+    return ta
+
+
+def record(candles: pd.DataFrame) -> pd.DataFrame:
+    """pandas_ta indicators of `candles` with the parameters `PreProcessor` uses."""
+    ta = load_pandas_ta()
+
+    high, low, close, volume = candles['high'], candles['low'], candles['close'], candles['volume']
+    stoch = ta.stoch(high, low, close, k=14, d=3, smooth_k=3)
+    macd = ta.macd(close, fast=12, slow=26, signal=9)
+    adx = ta.adx(high, low, close, length=14)
+    bbands = ta.bbands(close, length=20, std=2)
+    donchian = ta.donchian(high=high, low=low, lower_length=60, upper_length=60)
+    return pd.DataFrame({
+        'rsi_14': ta.rsi(close, length=14),
+        'ema_50': ta.ema(close, length=50),
+        'macd_12_26_9': macd['MACD_12_26_9'],
+        'macdh_12_26_9': macd['MACDh_12_26_9'],
+        'macds_12_26_9': macd['MACDs_12_26_9'],
+        'stochk_14_3_3': stoch['STOCHk_14_3_3'],
+        'stochd_14_3_3': stoch['STOCHd_14_3_3'],
+        'adx_14': adx['ADX_14'],
+        'dmp_14': adx['DMP_14'],
+        'dmn_14': adx['DMN_14'],
+        'atr_14': ta.atr(high, low, close, length=14),
+        'bbl_20_2': bbands['BBL_20_2.0'],
+        'bbm_20_2': bbands['BBM_20_2.0'],
+        'bbu_20_2': bbands['BBU_20_2.0'],
+        'obv': ta.obv(close, volume),
+        'dcl_60': donchian['DCL_60_60'],
+        'dcm_60': donchian['DCM_60_60'],
+        'dcu_60': donchian['DCU_60_60'],
+    }, index=candles.index)
+
+
+def main() -> None:
+    ta = load_pandas_ta()
+    candles = reference_candles()
+    fixture = pd.concat([candles, record(candles)], axis=1)
+    FIXTURE.parent.mkdir(exist_ok=True)
+    with FIXTURE.open('w') as file:
+        file.write(f'# recorded by tests/record_pandas_ta.py with {ta.__name__} {ta.version}\n')
+        fixture.to_csv(file, index=False, float_format='%.17g')
+    print(f'recorded {len(fixture.columns) - len(CANDLE_COLUMNS)} indicators of {len(fixture)} candles to {FIXTURE}')
+
+
+if __name__ == '__main__':
+    main()
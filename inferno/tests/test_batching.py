@@ -0,0 +1,84 @@
+import pytest
+
+from src.donchian.donchian import DonchianStrategy
+from src.ml.batching import InferenceBatcher
+from src.ml.inference import ModelInference
+from src.ml.loader import ModelLoader
+from src.ml.preprocessor import PreProcessor
+from tests.helpers import random_candles, synthetic_model
+
+
+def load(path) -> ModelInference:
+    return ModelInference(str(path), ModelLoader(path.parent), PreProcessor(), DonchianStrategy())
+
+
+@pytest.fixture(scope='module')
+def models(tmp_path_factory) -> list[ModelInference]:
+    directory = tmp_path_factory.mktemp('models')
+    return [load(synthetic_model(directory / f'v{seed}.joblib', seed=seed)) for seed in (1, 2)]
+
+
+@pytest.fixture(scope='module')
+def inputs(models) -> list[dict[str, float]]:
+    candles = random_candles(700, seed=2)
+    return [models[0].model_input(candles.iloc[:end]) for end in range(100, 700, 3)]
+
+
+def keep(suggestion, prediction):
+    return suggestion, prediction
+
+
+@pytest.mark.parametrize('size', [1, 8, 32, 128])
+def test_batched_predictions_match_single(models, inputs, size):
+    inference = models[0]
+    single = [inference.predict_batch([model_input])[0] for model_input in inputs]
+    batcher = InferenceBatcher(max_batch_size=size, window_ms=50.)
+    futures = [batcher.submit(inference, model_input, keep) for model_input in inputs]
+    batched = [future.result(timeout=10) for future in futures]
+    batcher.close()
+
+    for (suggestion, prediction), (expected_suggestion, expected) in zip(batched, single):
+        assert suggestion == expected_suggestion
+        assert prediction.confidence == expected.confidence
+        assert prediction.model_version == 'v1'
+    stats = batcher.stats
+    assert stats['requests'] == len(inputs)
+    assert stats['max_batch_size'] <= size
+    if size > 1:
+        assert stats['mean_batch_size'] > 1
+
+
+def test_batches_are_split_by_model(models, inputs):
+    batcher = InferenceBatcher(max_batch_size=64, window_ms=50.)
+    # both models interleaved in every batch
+    futures = [
+        (inference, model_input, batcher.submit(inference, model_input, keep))
+        for model_input in inputs for inference in models
+    ]
+    for inference, model_input, future in futures:
+        _, prediction = future.result(timeout=10)
+        assert prediction.model_version == inference.version
+        assert prediction.confidence == inference.predict_batch([model_input])[0][1].confidence
+    batcher.close()
+    assert batcher.stats['batches'] > batcher.stats['requests'] / 64
+
+
+def test_respond_errors_stay_with_their_request(models, inputs):
+    def fail(suggestion, prediction):
+        raise ValueError('respond failed')
+
+    batcher = InferenceBatcher(max_batch_size=8, window_ms=50.)
+    futures = [batcher.submit(models[0], model_input, fail if i == 3 else keep) for i, model_input in enumerate(inputs[:8])]
+    with pytest.raises(ValueError, match='respond failed'):
+        futures[3].result(timeout=10)
+    assert all(future.result(timeout=10) for i, future in enumerate(futures) if i != 3)
+    batcher.close()
+
+
+def test_close_predicts_what_is_pending(models, inputs):
+    batcher = InferenceBatcher(max_batch_size=1_000, window_ms=60_000.)
+    futures = [batcher.submit(models[0], model_input, keep) for model_input in inputs[:10]]
+    batcher.close()
+    assert all(future.done() for future in futures)
+    with pytest.raises(RuntimeError):
+        batcher.submit(models[0], inputs[0], keep)
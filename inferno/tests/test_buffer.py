@@ -0,0 +1,160 @@
+from itertools import count
+from threading import Event, Thread
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from src.hyperliquid.buffer import CandleBuffer
+from src.hyperliquid import shared
+from src.hyperliquid.shared import SharedCandleBuffer
+
+CAPACITY = 200
+WRITES = 20_000
+
+
+def candle(t: int, close: float = 1.) -> dict:
+    return {'t': t, 'T': t + 59_999, 'o': close, 'h': close, 'l': close, 'c': close, 'v': 1.}
+
+
+def test_ring_keeps_the_newest_candles_in_order():
+    buffer = CandleBuffer(5)
+    assert len(buffer) == 0 and buffer.last_timestamp is None and buffer.last_candle() is None
+
+    buffer.extend(candle(60_000 * i, float(i)) for i in range(12))
+    view = buffer.view()
+    assert len(buffer) == 5
+    np.testing.assert_array_equal(view['t'], 60_000 * np.arange(7, 12))
+    np.testing.assert_array_equal(view['c'], np.arange(7., 12.))
+    assert not view['c'].flags.writeable
+    assert buffer.last_timestamp == 60_000 * 11
+    assert buffer.last_candle() == candle(60_000 * 11, 11.)
+
+
+def test_merge_updates_the_open_candle_in_place():
+    buffer = CandleBuffer(3)
+    assert buffer.merge(candle(0, 1.))
+    assert not buffer.merge(candle(0, 2.))
+    assert buffer.merge(candle(60_000, 3.))
+    np.testing.assert_array_equal(buffer.view()['c'], [2., 3.])
+    assert buffer.version == 3
+
+
+def test_load_keeps_the_newest_rows():
+    source = CandleBuffer(10)
+    source.extend(candle(60_000 * i, float(i)) for i in range(10))
+    buffer = CandleBuffer(4)
+    buffer.append(candle(-60_000))
+    buffer.load(source.view())
+    np.testing.assert_array_equal(buffer.view()['c'], [6., 7., 8., 9.])
+
+    # appends after a load continue the ring
+    buffer.append(candle(600_000, 10.))
+    np.testing.assert_array_equal(buffer.snapshot()['c'], [7., 8., 9., 10.])
+
+
+def write(buffer: CandleBuffer, seed: int, writes: int = WRITES) -> None:
+    """Merge self-consistent candles (o == t, h - t == c - t == t - l == v), half of them new."""
+    rng = np.random.default_rng(seed)
+    timestamps = count(0, 60_000)
+    t = next(timestamps)
+    for _ in range(writes):
+        if rng.random() < .5:
+            t = next(timestamps)
+        k = float(rng.integers(1, 1_000))
+        buffer.merge({'t': t, 'T': t + 59_999, 'o': t, 'h': t + k, 'l': t - k, 'c': t + k, 'v': k})
+
+
+def is_torn(columns: dict[str, np.ndarray], capacity: int) -> bool:
+    """Whether a snapshot mixes two writes, which shows up as a broken row."""
+    t, v = columns['t'], columns['v']
+    return not (
+        len(t) <= capacity
+        and all(len(column) == len(t) for column in columns.values())
+        and np.array_equal(columns['o'], t)
+        and np.array_equal(columns['T'], t + 59_999)
+        and np.array_equal(columns['h'] - t, v)
+        and np.array_equal(columns['c'] - t, v)
+        and np.array_equal(t - columns['l'], v)
+    )
+
+
+def read_until(buffer: CandleBuffer, stop, results: list[tuple[int, int]]) -> None:
+    snapshots = torn = 0
+    while not stop.is_set() or snapshots == 0:
+        torn += is_torn(buffer.snapshot(), buffer.capacity)
+        snapshots += 1
+    results.append((snapshots, torn))
+
+
+def read_attached(name: str, stop, results) -> None:
+    """Reader process of a `SharedCandleBuffer`."""
+    buffer = SharedCandleBuffer.attach(name)
+    local: list[tuple[int, int]] = []
+    read_until(buffer, stop, local)
+    buffer.close()
+    results.put(local[0])
+
+
+@pytest.fixture(params=['local', 'shared'])
+def buffer(request):
+    if request.param == 'local':
+        yield CandleBuffer(CAPACITY)
+    else:
+        shared = SharedCandleBuffer(CAPACITY, name=f'inferno_test_{os.getpid()}')
+        yield shared
+        shared.unlink()
+
+
+def test_snapshots_are_never_torn(buffer):
+    stop = Event()
+    results: list[tuple[int, int]] = []
+    readers = [Thread(target=read_until, args=(buffer, stop, results)) for _ in range(3)]
+    writers = [Thread(target=write, args=(buffer, seed)) for seed in range(2)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert buffer.version == 2 * WRITES
+    assert sum(torn for _, torn in results) == 0
+    assert all(snapshots > 0 for snapshots, _ in results)
+
+
+def test_shared_snapshots_across_processes():
+    buffer = SharedCandleBuffer(CAPACITY, name=f'inferno_test_{os.getpid()}')
+    context = multiprocessing.get_context('spawn')
+    stop, results = context.Event(), context.Queue()
+    readers = [context.Process(target=read_attached, args=(buffer.name, stop, results)) for _ in range(2)]
+    try:
+        for reader in readers:
+            reader.start()
+        write(buffer, seed=0)
+        stop.set()
+        counts = [results.get(timeout=60) for _ in readers]
+        for reader in readers:
+            reader.join()
+    finally:
+        buffer.unlink()
+
+    assert all(reader.exitcode == 0 for reader in readers)
+    assert sum(torn for _, torn in counts) == 0
+
+
+@pytest.mark.parametrize('machine, warns', [('x86_64', False), ('AMD64', False), ('aarch64', True)])
+def test_shared_buffers_warn_without_x86_memory_order(monkeypatch, caplog, machine, warns):
+    monkeypatch.setattr(shared.platform, 'machine', lambda: machine)
+    shared._check_memory_order.cache_clear()
+    buffer = SharedCandleBuffer(CAPACITY, name=f'inferno_test_{os.getpid()}')
+    try:
+        reader = SharedCandleBuffer.attach(buffer.name)
+        reader.close()
+    finally:
+        buffer.unlink()
+        shared._check_memory_order.cache_clear()
+    # once per process
+    assert caplog.text.count('assume x86 memory ordering') == warns
@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+
+from src.donchian.donchian import DonchianStrategy
+from src.hyperliquid.collection import HyperliquidCollector
+from src.ml.preprocessor import PreProcessor
+from src.service import SignalService
+from src.types.signal import SignalRequest, SignalType
+from src.utils.cache import LRUCache
+from tests.helpers import HistoryFeed, candle_dicts
+
+logger = logging.getLogger(__name__)
+
+
+def test_least_recently_used_are_evicted():
+    cache: LRUCache[int] = LRUCache('test', 3, logger)
+    for key in 'abc':
+        cache.put(key, ord(key))
+    assert cache.get('a') == ord('a')
+    cache.put('d', ord('d'))
+
+    assert len(cache) == 3
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == [ord(key) for key in 'acd']
+    # replacing a value doesn't evict
+    cache.put('a', 0)
+    assert cache.get('a') == 0 and len(cache) == 3
+    assert cache.stats == {'entries': 3, 'hits': 5, 'misses': 1, 'evictions': 1, 'hit_rate': 5 / 6}
+
+
+def test_stats_are_logged(caplog):
+    cache: LRUCache[int] = LRUCache('test', 3, logger, log_every=4)
+    with caplog.at_level(logging.INFO):
+        for _ in range(8):
+            cache.get('a')
+    assert caplog.text.count('test cache: ') == 2
+
+
+@pytest.mark.parametrize('interval', ['1m', '5m'])
+def test_rebuilt_buffers_dont_hit_cached_responses(interval):
+    feed = HistoryFeed(candle_dicts(300, seed=1), perps=['BTC', 'ETH'])
+    collector = HyperliquidCollector(
+        test_net=False, symbols=['BTC'], interval='1m', max_candles=200, max_symbols=1, connection=feed
+    )
+    collector.start()
+    strategy = DonchianStrategy()
+    service = SignalService(
+        collector, None, strategy, PreProcessor(), signal_cache=LRUCache('signal', 100, logger) # type: ignore
+    )
+    request = SignalRequest(symbol='BTC', signal_type=SignalType.TECHNICAL, interval=interval)
+    first = service.generate(request)
+    assert service.generate(request) is first
+    state = collector.candle_state('BTC', interval)
+
+    # BTC is evicted for ETH and rebuilt from other candles, with as many writes up to the same candle
+    feed.candles = candle_dicts(300, seed=2)
+    collector.ensure_symbol('ETH')
+    assert 'BTC' not in collector.candles
+    rebuilt = collector.candle_state('BTC', interval)
+    assert rebuilt[1:] == state[1:] and rebuilt != state
+    assert service.generate(request) is not first
+    collector.stop()
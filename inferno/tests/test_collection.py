@@ -0,0 +1,170 @@
+from threading import Thread
+from time import perf_counter, sleep
+
+import numpy as np
+import pytest
+
+from src.hyperliquid.collection import HyperliquidCollector
+from src.hyperliquid.connection import INTERVAL_MS
+from src.hyperliquid.storage import CandleStore
+from tests.helpers import MINUTE, HistoryFeed, aggregate, candle_dicts
+
+
+def collector(feed: HistoryFeed, max_candles: int = 100, **kwargs) -> HyperliquidCollector:
+    collector = HyperliquidCollector(
+        test_net=False, symbols=['BTC'], interval='1m', max_candles=max_candles, connection=feed, **kwargs
+    )
+    collector.start()
+    return collector
+
+
+def test_updates_merge_into_the_buffer():
+    candles = candle_dicts(300)
+    feed = HistoryFeed(candles[:200])
+    btc = collector(feed)
+    for candle in candles[200:]:
+        # partial update first, then the final one
+        feed.callbacks['BTC']({'data': {**candle, 'c': candle['o'], 's': 'BTC', 'i': '1m'}})
+        feed.callbacks['BTC']({'data': {**candle, 's': 'BTC', 'i': '1m'}})
+    # out of order, dropped
+    feed.callbacks['BTC']({'data': {**candles[250], 's': 'BTC', 'i': '1m'}})
+
+    columns = btc.get_candles('BTC')
+    np.testing.assert_array_equal(columns['t'], [candle['t'] for candle in candles[-100:]])
+    np.testing.assert_array_equal(columns['c'], [candle['c'] for candle in candles[-100:]])
+    assert btc.candle_state('BTC') == (btc.candles['BTC'].generation, btc.candles['BTC'].version, candles[-1]['t'])
+    assert columns['t'][-1] - columns['t'][0] == 99 * MINUTE
+    btc.stop()
+
+
+def stream(feed: HistoryFeed, candles: list[dict]) -> None:
+    """Each candle as a partial update (lower close and volume), then the final one."""
+    for candle in candles:
+        partial = {**candle, 'c': candle['o'], 'h': max(candle['o'], candle['l']), 'v': candle['v'] / 2}
+        feed.callbacks['BTC']({'data': {**partial, 's': 'BTC', 'i': '1m'}})
+        feed.callbacks['BTC']({'data': {**candle, 's': 'BTC', 'i': '1m'}})
+
+
+@pytest.mark.parametrize('interval', ['5m', '15m', '1h'])
+@pytest.mark.parametrize('seeded', [7, 600])
+def test_resampled_candles_match_aggregates(interval, seeded):
+    candles = candle_dicts(3_000, seed=5)
+    feed = HistoryFeed(candles[:seeded])
+    btc = collector(feed, max_candles=5_000)
+    btc.get_candles('BTC', interval)
+    # feed keeps serving snapshots as of the seed, updates only come through the stream
+    stream(feed, candles[seeded:])
+
+    actual = btc.get_candles('BTC', interval)
+    expected = aggregate(candles, INTERVAL_MS[interval])
+    assert len(actual['t']) == len(expected)
+    for key in ('t', 'T', 'o', 'h', 'l', 'c'):
+        np.testing.assert_array_equal(actual[key], [candle[key] for candle in expected])
+    np.testing.assert_allclose(actual['v'], [candle['v'] for candle in expected], rtol=1e-12)
+    btc.stop()
+
+
+def test_gaps_are_backfilled_contiguously(tmp_path):
+    candles = candle_dicts(1_000, seed=6)
+    feed = HistoryFeed(candles[:300])
+    btc = collector(feed, max_candles=500, storage_dir=str(tmp_path), backfill_page_size=50)
+    btc.get_candles('BTC', '5m')
+    feed.candles = candles
+    # the stream misses candles 400-449 and 700-899
+    stream(feed, candles[300:400] + candles[450:700] + candles[900:])
+
+    assert btc.wait_for_backfill('BTC', timeout=10)
+    assert not btc.is_stale('BTC')
+    columns = btc.get_candles('BTC')
+    np.testing.assert_array_equal(columns['t'], [candle['t'] for candle in candles[-500:]])
+    np.testing.assert_array_equal(columns['c'], [candle['c'] for candle in candles[-500:]])
+    assert btc.gap_stats['gaps'] == 2
+    assert btc.gap_stats['missing_candles'] == 250
+    assert btc.gap_stats['failures'] == 0
+    # aggregates over the gap are rebuilt on the next request
+    np.testing.assert_array_equal(btc.get_candles('BTC', '5m')['t'][-10:], [c['t'] for c in aggregate(candles, 5 * MINUTE)][-10:])
+    btc.stop()
+
+    # closed candles only, the newest one is still open
+    stored = CandleStore.open(tmp_path, 'BTC', '1m').read()
+    np.testing.assert_array_equal(stored['t'], [candle['t'] for candle in candles[:-1]])
+
+
+class SlowFeed(HistoryFeed):
+    """`HistoryFeed` whose snapshots take `delay` seconds, recording when they ran and
+    whether the collector was ready meanwhile."""
+
+    def __init__(self, candles, perps, delay: float = .2, failing: tuple[str, ...] = ()):
+        super().__init__(candles, perps)
+        self.delay = delay
+        self.failing = failing
+        self.collector = None
+        self.spans: list[tuple[float, float]] = []
+        self.ready_during_snapshots: list[bool] = []
+        self.subscribed_at: list[float] = []
+
+    def candles_snapshot(self, name, interval, limit, start_time=None, end_time=None):
+        start = perf_counter()
+        sleep(self.delay)
+        self.ready_during_snapshots.append(self.collector.ready) # type: ignore
+        if name in self.failing:
+            raise ConnectionError(f'snapshot of {name} failed')
+        candles = super().candles_snapshot(name, interval, limit, start_time, end_time)
+        self.spans.append((start, perf_counter()))
+        return candles
+
+    def subscribe(self, interval, coin, callback):
+        self.subscribed_at.append(perf_counter())
+        super().subscribe(interval, coin, callback)
+
+
+SYMBOLS = ['BTC', 'ETH', 'SOL', 'XRP']
+
+
+def slow_collector(feed: SlowFeed) -> HyperliquidCollector:
+    collector = HyperliquidCollector(
+        test_net=False, symbols=SYMBOLS, interval='1m', max_candles=100, connection=feed
+    )
+    feed.collector = collector # type: ignore
+    return collector
+
+
+def test_start_snapshots_run_concurrently():
+    feed = SlowFeed(candle_dicts(300), SYMBOLS)
+    collector = slow_collector(feed)
+    start = perf_counter()
+    collector.start()
+    assert perf_counter() - start < 2 * feed.delay
+
+    # all snapshots in flight at once, subscriptions only once every buffer is loaded
+    assert len(feed.spans) == len(SYMBOLS)
+    assert max(begin for begin, _ in feed.spans) < min(end for _, end in feed.spans)
+    assert min(feed.subscribed_at) >= max(end for _, end in feed.spans)
+    assert sorted(feed.callbacks) == sorted(SYMBOLS)
+    collector.stop()
+
+
+def test_ready_once_every_buffer_is_loaded():
+    candles = candle_dicts(300)
+    feed = SlowFeed(candles, SYMBOLS)
+    collector = slow_collector(feed)
+    starting = Thread(target=collector.start)
+    starting.start()
+    assert not collector.ready
+    assert collector.wait_ready(5)
+    assert not any(feed.ready_during_snapshots)
+    for symbol in SYMBOLS:
+        np.testing.assert_array_equal(collector.get_candles(symbol)['t'], [candle['t'] for candle in candles[-100:]])
+    starting.join()
+    collector.stop()
+
+
+def test_not_ready_if_a_snapshot_fails():
+    feed = SlowFeed(candle_dicts(300), SYMBOLS, delay=.05, failing=('SOL',))
+    collector = slow_collector(feed)
+    with pytest.raises(ConnectionError):
+        collector.start()
+    # main.py refuses to consume from a collector that isn't ready
+    assert not collector.ready
+    assert not collector.wait_ready(.1)
+    assert feed.callbacks == {}
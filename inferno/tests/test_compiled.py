@@ -0,0 +1,105 @@
+import math
+
+from lightgbm import LGBMClassifier
+from sklearn.preprocessing import StandardScaler
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.donchian.donchian import DonchianStrategy
+from src.ml.compiled import CompiledTrees, _fold_threshold
+from src.ml.inference import ModelInference
+from src.ml.loader import ModelLoader
+from src.ml.preprocessor import PreProcessor
+from src.types.error import UnsupportedModelError
+from tests.helpers import random_candles, synthetic_model
+
+
+@pytest.fixture(scope='module')
+def loader(tmp_path_factory) -> ModelLoader:
+    directory = tmp_path_factory.mktemp('models')
+    loader = ModelLoader(directory)
+    loader.load_model(synthetic_model(directory / 'v1.joblib', n_estimators=100))
+    return loader
+
+
+def feature_rows(features: list[str], n: int = 400) -> pd.DataFrame:
+    """Model features of random candles, with some missing values."""
+    data = PreProcessor._features(random_candles(n, seed=3))[features].copy()
+    rng = np.random.default_rng(3)
+    return data.mask(rng.random(data.shape) < .05)
+
+
+def test_probabilities_match_lightgbm(loader):
+    model = loader.get_model()
+    compiled = loader.compile_model()
+    data = feature_rows(model['features'])
+    expected = model['clf'].predict_proba(model['scaler'].transform(data))[:, 1]
+
+    assert compiled.folded
+    np.testing.assert_array_equal(compiled.predict_proba(data.to_numpy()), expected)
+    # one row at a time as the service predicts
+    np.testing.assert_array_equal([compiled.predict_proba(row)[0] for row in data.to_numpy()[-20:]], expected[-20:])
+
+
+def test_unfolded_scaler_matches_lightgbm():
+    rng = np.random.default_rng(4)
+    xs = rng.normal(size=(2_000, 4))
+    # zeros are missing values, thresholds can not be folded
+    xs[rng.random(xs.shape) < .2] = 0.
+    target = (xs[:, 0] + xs[:, 1] * xs[:, 2] > 0).astype(int)
+    scaler = StandardScaler().fit(xs)
+    clf = LGBMClassifier(n_estimators=50, zero_as_missing=True, verbose=-1).fit(scaler.transform(xs), target)
+
+    compiled = CompiledTrees(clf, scaler)
+    assert compiled.zero_missing.any() and not compiled.folded
+    np.testing.assert_array_equal(compiled.predict_proba(xs), clf.predict_proba(scaler.transform(xs))[:, 1])
+
+
+def test_without_scaler_matches_lightgbm():
+    rng = np.random.default_rng(5)
+    xs = rng.normal(size=(2_000, 3))
+    xs[rng.random(xs.shape) < .1] = np.nan
+    target = (np.nan_to_num(xs[:, 0]) > 0).astype(int)
+    clf = LGBMClassifier(n_estimators=30, verbose=-1).fit(xs, target)
+
+    compiled = CompiledTrees(clf)
+    assert not compiled.folded
+    np.testing.assert_array_equal(compiled.predict_proba(xs), clf.predict_proba(xs)[:, 1])
+    np.testing.assert_allclose(compiled.raw_scores(xs), clf.predict_proba(xs, raw_score=True), rtol=1e-12)
+
+
+@pytest.mark.parametrize('params', [
+    {'objective': 'multiclass'},
+    {'boosting_type': 'rf', 'bagging_freq': 1, 'bagging_fraction': .5},
+])
+def test_unsupported_models(params):
+    rng = np.random.default_rng(6)
+    xs = rng.normal(size=(500, 2))
+    target = (xs[:, 0] > 0).astype(int) + (params.get('objective') == 'multiclass') * (xs[:, 1] > 1)
+    clf = LGBMClassifier(n_estimators=5, verbose=-1, **params).fit(xs, target)
+    with pytest.raises(UnsupportedModelError):
+        CompiledTrees(clf)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_folded_thresholds_take_the_same_branch(seed):
+    rng = np.random.default_rng(seed)
+    for threshold, mean, scale in zip(rng.normal(size=200), rng.normal(0, 100, 200), rng.lognormal(0, 3, 200)):
+        folded = _fold_threshold(threshold, mean, scale)
+        assert (folded - mean) / scale <= threshold
+        assert not (math.nextafter(folded, math.inf) - mean) / scale <= threshold
+
+
+def test_compiled_inference_predicts_like_lightgbm(loader):
+    path = loader.model_metadata['model_path']
+    candles = random_candles(600, seed=7)
+    plain = ModelInference(path, ModelLoader(loader.model_dir), PreProcessor(), DonchianStrategy())
+    compiled = ModelInference(path, ModelLoader(loader.model_dir), PreProcessor(), DonchianStrategy(), compile=True)
+    inputs = [plain.model_input(candles.iloc[:end]) for end in range(100, 600, 5)]
+
+    assert compiled.compiled is not None and len(inputs) > compiled.COMPILED_MAX_ROWS
+    # up to `COMPILED_MAX_ROWS` rows use the compiled trees, larger batches LightGBM
+    for batch in (inputs[:1], inputs[:compiled.COMPILED_MAX_ROWS], inputs):
+        expected = [prediction.confidence for _, prediction in plain.predict_batch(batch)]
+        assert [prediction.confidence for _, prediction in compiled.predict_batch(batch)] == expected
@@ -0,0 +1,152 @@
+from threading import Event
+from types import SimpleNamespace
+import asyncio
+import json
+import logging
+
+import pika
+
+from main_async import Consumer
+from src.utils.lanes import KeyedExecutor
+from src.utils.singleflight import SingleFlight
+from tests.test_service import CountingService
+
+logger = logging.getLogger(__name__)
+
+
+class FakeBroker:
+    """`AsyncBroker` recording replies, acks and nacks."""
+
+    is_open = True
+
+    def __init__(self):
+        self.replies: list[tuple[str, str, dict]] = []
+        self.acks: list[int] = []
+        self.nacks: list[tuple[int, bool]] = []
+
+    def publish(self, routing_key: str, body: str, properties: pika.BasicProperties) -> None:
+        self.replies.append((routing_key, properties.correlation_id, json.loads(body)))
+
+    def ack(self, delivery_tag: int) -> None:
+        self.acks.append(delivery_tag)
+
+    def nack(self, delivery_tag: int, requeue: bool = True) -> None:
+        self.nacks.append((delivery_tag, requeue))
+
+
+class RespondingService(CountingService):
+    """`CountingService` keeping what `respond` returned."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.responses: list = []
+
+    def respond(self, request, workers=None):
+        response = super().respond(request, workers)
+        self.responses.append(response)
+        return response
+
+
+def delivery(tag: int, symbol: str = 'BTC'):
+    body = json.dumps({'symbol': symbol, 'signal_type': 'TECHNICAL'}).encode()
+    return None, SimpleNamespace(delivery_tag=tag), pika.BasicProperties(reply_to='replies', correlation_id=str(tag)), body
+
+
+def block_lane(workers: KeyedExecutor) -> Event:
+    """Occupies the (only) lane of `workers` until the returned event is set."""
+    release = Event()
+    workers.submit('blocker', release.wait, 5)
+    return release
+
+
+async def settle(consumer: Consumer) -> None:
+    while consumer.in_flight:
+        await asyncio.gather(*consumer.in_flight)
+
+
+def test_timed_out_request_is_answered_once_and_skipped():
+    service = CountingService()
+    service.release.set()
+    workers = KeyedExecutor(1)
+    broker = FakeBroker()
+    consumer = Consumer(broker, service, workers, timeout=.1) # type: ignore
+
+    async def scenario():
+        release = block_lane(workers)
+        consumer.on_message(delivery(1))
+        await settle(consumer)
+        release.set()
+        await asyncio.to_thread(workers.shutdown)
+
+    asyncio.run(scenario())
+    assert [(key, correlation_id, reply['success']) for key, correlation_id, reply in broker.replies] == [('replies', '1', False)]
+    assert broker.acks == [1] and broker.nacks == []
+    # the deadline cancelled it before the lane picked it up
+    assert service.calls == 0
+
+
+def test_coalesced_request_outlives_a_deadline():
+    service = RespondingService(single_flight=SingleFlight('signal', logger))
+    service.release.set()
+    workers = KeyedExecutor(1)
+    broker = FakeBroker()
+    consumer = Consumer(broker, service, workers, timeout=.1) # type: ignore
+
+    async def scenario():
+        release = block_lane(workers)
+        consumer.on_message(delivery(1))
+        await settle(consumer)
+        # shares the computation the first request gave up on, which is still queued
+        consumer.on_message(delivery(2))
+        await asyncio.sleep(0)
+        release.set()
+        await settle(consumer)
+        await asyncio.to_thread(workers.shutdown)
+
+    asyncio.run(scenario())
+    assert [(correlation_id, reply['success']) for _, correlation_id, reply in broker.replies] == [('1', False), ('2', True)]
+    assert broker.acks == [1, 2]
+    # one computation, not cancelled by the first request's deadline
+    first, second = service.responses
+    assert first is second and not first.cancelled()
+    assert service.calls == 1
+
+
+def test_cancelled_request_is_requeued():
+    service = CountingService()
+    workers = KeyedExecutor(1)
+    broker = FakeBroker()
+    consumer = Consumer(broker, service, workers) # type: ignore
+
+    async def scenario():
+        consumer.on_message(delivery(1))
+        assert await asyncio.to_thread(service.started.wait, 5)
+        await consumer.drain(.1)
+        assert not consumer.in_flight
+        service.release.set()
+        await asyncio.to_thread(workers.shutdown)
+
+    asyncio.run(scenario())
+    assert broker.nacks == [(1, True)]
+    assert broker.replies == [] and broker.acks == []
+
+
+def test_drain_waits_for_requests_in_flight():
+    service = CountingService()
+    workers = KeyedExecutor(2)
+    broker = FakeBroker()
+    consumer = Consumer(broker, service, workers) # type: ignore
+
+    async def scenario():
+        consumer.on_message(delivery(1, 'BTC'))
+        consumer.on_message(delivery(2, 'ETH'))
+        assert await asyncio.to_thread(service.started.wait, 5)
+        asyncio.get_running_loop().call_later(.2, service.release.set)
+        await consumer.drain(5)
+        # every reply is sent before drain returns, so the broker can be closed after it
+        assert sorted(broker.acks) == [1, 2]
+        await asyncio.to_thread(workers.shutdown)
+
+    asyncio.run(scenario())
+    assert sorted((correlation_id, reply['success']) for _, correlation_id, reply in broker.replies) == [('1', True), ('2', True)]
+    assert broker.nacks == []
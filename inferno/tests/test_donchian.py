@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.donchian.donchian import DonchianStrategy
+from src.donchian.kernels import donchian_channels
+from tests.helpers import random_candles
+
+
+def reference_weights(strategy: DonchianStrategy, data: pd.DataFrame) -> pd.DataFrame:
+    """`DonchianStrategy.get_weights` as it was before the NumPy kernels: rolling channels
+    per window and the per-row position/trailing-stop loop."""
+    data = strategy._calc_volatility(data)
+    for window in strategy.LOOK_BACK_WINDOWS:
+        rolling = data['close'].rolling(window, min_periods=window)
+        lower, upper = rolling.min(), rolling.max()
+        data = pd.concat([data, pd.DataFrame({
+            f'DCL_{window}': lower,
+            f'DCM_{window}': 0.5 * (lower + upper),
+            f'DCU_{window}': upper
+        })], axis=1)
+
+        POS_COL = f'POS_{window}'
+        TRAILING_STOP_COL = f'TRL_STOP_{window}'
+        data[POS_COL] = 0
+        data[TRAILING_STOP_COL] = np.nan
+        idx = data.index
+        for i in range(1, len(data)):
+            curr_data_idx = idx[i]
+            pred_data_idx = idx[i-1]
+            current_close = data.loc[curr_data_idx, 'close']
+            prev_pos = data.loc[pred_data_idx, POS_COL]
+            prev_stop = data.loc[pred_data_idx, TRAILING_STOP_COL]
+            current_dcm = data.loc[curr_data_idx, f'DCM_{window}']
+            current_dcu = data.loc[curr_data_idx, f'DCU_{window}']
+            prev_dcm = data.loc[pred_data_idx, f'DCM_{window}']
+            if prev_pos == 0 and current_close >= current_dcu:
+                data.loc[curr_data_idx, POS_COL] = 1.
+                data.loc[curr_data_idx, TRAILING_STOP_COL] = current_dcm
+            elif prev_pos == 1 and not np.isnan(prev_stop) and current_close <= prev_stop:
+                data.loc[curr_data_idx, POS_COL] = 0.
+                data.loc[curr_data_idx, TRAILING_STOP_COL] = np.nan
+            elif prev_pos == 1:
+                data.loc[curr_data_idx, POS_COL] = 1.
+                if not np.isnan(prev_stop) and not np.isnan(prev_dcm):
+                    data.loc[curr_data_idx, TRAILING_STOP_COL] = np.maximum(prev_stop, prev_dcm)
+                else:
+                    data.loc[curr_data_idx, TRAILING_STOP_COL] = prev_stop
+            else:
+                data.loc[curr_data_idx, POS_COL] = 0.
+                data.loc[curr_data_idx, TRAILING_STOP_COL] = np.nan
+
+        weight = np.minimum(strategy.TARGET_VOLATILITY / data['sigma_t'], strategy.MAX_ALLOCATION)
+        data[f'w_{window}'] = (weight * data[POS_COL]).fillna(0)
+    data['w_combo'] = data[[f'w_{window}' for window in strategy.LOOK_BACK_WINDOWS]].mean(axis=1)
+    return data
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('windows', [[5, 10], [5, 10, 20, 30, 60], [3, 17, 90]])
+def test_weights_match_row_loop(seed, windows):
+    candles = random_candles(300, seed=seed)
+    strategy = DonchianStrategy(LOOK_BACK_WINDOWS=windows)
+
+    actual = strategy.get_weights(candles.copy())
+    expected = reference_weights(strategy, candles.copy())
+
+    columns = [
+        f'{prefix}_{window}' for window in windows for prefix in ('DCL', 'DCM', 'DCU', 'POS', 'TRL_STOP', 'w')
+    ] + ['sigma_t', 'w_combo']
+    pd.testing.assert_frame_equal(actual[columns], expected[columns])
+
+
+def test_signal_matches_row_loop():
+    candles = random_candles(400, seed=7)
+    strategy = DonchianStrategy(LOOK_BACK_WINDOWS=[5, 10, 20])
+    expected = reference_weights(strategy, candles.copy())['w_combo']
+    for end in range(50, 400, 37):
+        timestamp, suggestion = strategy.get_signal(candles.iloc[:end])
+        assert timestamp == candles['timestamp'].iloc[end - 1]
+        assert (suggestion == 'BUY') == (expected.iloc[end - 1] > 1e-6)
+
+
+@pytest.mark.parametrize('n', [1, 59, 60, 61, 500])
+def test_channels_match_rolling(n):
+    windows = [1, 5, 60, 360]
+    close = random_candles(n, seed=n)['close'].to_numpy()
+    channels = donchian_channels(close, windows)
+
+    assert channels.shape == (3 * len(windows), n)
+    for i, window in enumerate(windows):
+        rolling = pd.Series(close).rolling(window, min_periods=window)
+        lower, upper = rolling.min().to_numpy(), rolling.max().to_numpy()
+        np.testing.assert_array_equal(channels[3 * i], lower)
+        np.testing.assert_array_equal(channels[3 * i + 1], 0.5 * (lower + upper))
+        np.testing.assert_array_equal(channels[3 * i + 2], upper)
+
+
+def test_channels_reuse_out():
+    close = random_candles(100)['close'].to_numpy()
+    out = np.empty((6, 100))
+    assert donchian_channels(close, [5, 20], out=out) is out
+    np.testing.assert_array_equal(out, donchian_channels(close, [5, 20]))
+    with pytest.raises(ValueError):
+        donchian_channels(close, [5, 20, 60], out=out)
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.ml.features import WARM_UP_TOLERANCE, plan_features
+from src.ml.preprocessor import PreProcessor
+from tests.helpers import random_candles
+
+FEATURE_SETS = {
+    'all': PreProcessor.FEATURE_COLS,
+    'no obv': [feature for feature in PreProcessor.FEATURE_COLS if feature != 'obv_pct_change_10d'],
+    'rolling only': ['mom_10d', 'mom_30d', 'volatility_30d', 'donchian_width_rel_60', 'stochk_14_3_3'],
+    'recursive': ['rsi_14', 'macd_hist', 'adx_14', 'ema_20_ratio', 'atr_14_norm'],
+}
+
+
+@pytest.mark.parametrize('features', FEATURE_SETS.values(), ids=FEATURE_SETS.keys())
+@pytest.mark.parametrize('n', [20, 150, 500, 2_000])
+def test_plan_matches_last_row_of_all_features(features, n):
+    candles = random_candles(n, seed=n)
+    expected = PreProcessor._features(candles.copy()).iloc[-1]
+    actual = plan_features(tuple(features)).latest(candles)
+
+    assert list(actual) == list(features)
+    for feature, value in actual.items():
+        if math.isnan(expected[feature]):
+            assert math.isnan(value), feature
+        else:
+            # the plan skips the start of recursive indicators, whose effect is below the tolerance
+            assert value == pytest.approx(expected[feature], rel=100 * WARM_UP_TOLERANCE, abs=1e-12), feature
+
+
+def test_plan_only_computes_what_the_features_need():
+    plan = plan_features(('mom_10d', 'volatility_30d', 'donchian_width_rel_60', 'w_5'))
+    assert plan.features == ['mom_10d', 'volatility_30d', 'donchian_width_rel_60']
+    assert plan.missing == ['w_5']
+    assert set(plan.order) == {'mom_10d', 'log_returns', 'volatility_30d', 'donchian', 'donchian_width_rel_60'}
+    assert plan.inputs == ['high', 'low', 'close']
+    # the 60 candle Donchian channel is the longest window
+    assert plan.window == 60
+
+
+def test_obv_needs_every_row():
+    assert plan_features(('obv_pct_change_10d',)).window is None
+    assert plan_features(('rsi_14',)).window is not None
+
+
+def test_plans_are_cached():
+    assert plan_features(('rsi_14', 'mom_10d')) is plan_features(('rsi_14', 'mom_10d'))
+
+
+def test_plan_of_a_single_candle_is_undefined():
+    latest = plan_features(tuple(PreProcessor.FEATURE_COLS)).latest(random_candles(1))
+    assert all(np.isnan(value) for value in latest.values())
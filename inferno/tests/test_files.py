@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.data import load_candles
+from src.hyperliquid.files import load_candle_files
+from src.hyperliquid.replay import load_recorded
+from src.hyperliquid.storage import CANDLE_DTYPE, CandleStore
+from src.ml.preprocessor import PreProcessor
+from tests.helpers import candle_dicts
+
+
+@pytest.fixture
+def candles() -> list[dict]:
+    return candle_dicts(300, seed=12)
+
+
+def write_files(directory, candles: list[dict]) -> None:
+    """Overlapping candle files of every format, later files (by name) have other closes."""
+    raw = [{**candle, 'o': str(candle['o']), 'c': str(candle['c'] + 1), 's': 'BTC', 'i': '1m'} for candle in candles[:120]]
+    (directory / 'BTC_1a.json').write_text(json.dumps(raw))
+    pd.DataFrame(candles[100:200]).assign(c=lambda data: data['c'] + 2).to_csv(directory / 'BTC_1b.csv', index=False)
+    PreProcessor.convert(candles[180:260]).to_csv(directory / 'BTC_1c.csv', index=False)
+    CandleStore(directory / 'BTC_1d.candles').append(candles[250:])
+    (directory / 'notes.txt').write_text('not candles')
+
+
+def test_files_are_merged_in_order(tmp_path, candles):
+    write_files(tmp_path, candles)
+    columns = load_candle_files([tmp_path / 'BTC_1d.candles', tmp_path])
+
+    np.testing.assert_array_equal(columns['t'], [candle['t'] for candle in candles])
+    # later files win
+    expected = [candle['c'] + (1 if i < 100 else 2 if i < 180 else 0) for i, candle in enumerate(candles)]
+    np.testing.assert_array_equal(columns['c'], expected)
+    np.testing.assert_array_equal(columns['o'], [candle['o'] for candle in candles])
+    assert columns['t'].dtype == np.int64 and columns['o'].dtype == np.float64
+
+
+def test_frames_of_candle_files(tmp_path, candles):
+    write_files(tmp_path, candles)
+    frame = load_candles(tmp_path)
+    pd.testing.assert_frame_equal(frame, PreProcessor.convert(load_candle_files(tmp_path)))
+    assert sorted(frame.columns) == sorted(PreProcessor.convert(candles).columns)
+
+
+def test_missing_files(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_candle_files(tmp_path / 'missing.json')
+    with pytest.raises(FileNotFoundError):
+        load_candle_files(tmp_path)
+
+
+def test_recorded_candles_per_symbol(tmp_path, candles):
+    CandleStore.open(tmp_path, 'BTC', '1m').append(candles)
+    CandleStore.open(tmp_path, 'ETH', '1m').append(candles[:100])
+    CandleStore.open(tmp_path, 'ETH', '5m').append(candles[:10])
+
+    recorded = load_recorded(tmp_path)
+    assert sorted(recorded) == ['BTC', 'ETH']
+    assert len(recorded['BTC']['t']) == 300 and len(recorded['ETH']['t']) == 100
+    assert len(load_recorded(tmp_path, interval='5m')['ETH']['t']) == 10
+
+
+def test_candle_stores_are_read_only(tmp_path, candles):
+    path = tmp_path / 'BTC_1m.candles'
+    CandleStore(path).append(candles)
+    # torn write, half a record
+    with path.open('ab') as file:
+        file.write(bytes(CANDLE_DTYPE.itemsize // 2))
+    data = path.read_bytes()
+    path.chmod(0o444)
+
+    columns = load_candle_files(tmp_path)
+    np.testing.assert_array_equal(columns['t'], [candle['t'] for candle in candles])
+    np.testing.assert_array_equal(columns['c'], [candle['c'] for candle in candles])
+    assert path.read_bytes() == data
+    assert [p.name for p in tmp_path.iterdir()] == ['BTC_1m.candles']
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from src.donchian.donchian import DonchianStrategy
+from src.donchian.incremental import IncrementalDonchianStrategy
+from src.hyperliquid.collection import HyperliquidCollector
+from src.ml.incremental import IncrementalFeatureStrategy
+from src.ml.preprocessor import PreProcessor
+from tests.helpers import HistoryFeed, random_candles
+
+KEY = 'BTC:1m'
+
+
+def strategy() -> DonchianStrategy:
+    return DonchianStrategy(LOOK_BACK_WINDOWS=[5, 10, 20, 30, 60], VOLATILITY_WINDOW=30)
+
+
+def test_donchian_matches_full_recomputation():
+    candles = random_candles(400, seed=1)
+    donchian = strategy()
+    incremental = IncrementalDonchianStrategy(donchian)
+    for end in range(100, 401, 7):
+        assert incremental.get_signal(KEY, candles.iloc[:end]) == donchian.get_signal(candles.iloc[:end])
+
+
+def test_donchian_backfill_then_signal():
+    candles = random_candles(400, seed=2)
+    gapped = candles.drop(index=range(300, 320)).reset_index(drop=True)
+    incremental = IncrementalDonchianStrategy(strategy())
+
+    # a signal on the candle after the gap (candles 300-319 are still missing), then the
+    # gap is backfilled in front of it and the next candle arrives
+    incremental.sync(KEY, gapped.iloc[:301])
+    weights = incremental.sync(KEY, candles.iloc[:322]).weights()
+
+    expected = IncrementalDonchianStrategy(strategy()).sync(KEY, candles.iloc[:322]).weights()
+    assert weights == pytest.approx(expected, nan_ok=True)
+    assert incremental.get_signal(KEY, candles.iloc[:322]) == strategy().get_signal(candles.iloc[:322])
+
+
+def test_features_match_full_recomputation():
+    candles = random_candles(1_500, seed=4)
+    # flat candles give zero ranges
+    candles.loc[700:720, ['open', 'high', 'low', 'close']] = 100.
+    incremental = IncrementalFeatureStrategy(history=500)
+    # the EMA of a sliding window is seeded from a different first row than the stream
+    rtol = np.array([1e-6 if column == 'ema_20_ratio' else 1e-9 for column in PreProcessor.FEATURE_COLS])
+    for end in range(100, 1_500, 7):
+        window = candles.iloc[max(0, end - 500):end].reset_index(drop=True)
+        # the open candle keeps changing
+        window.loc[len(window) - 1, 'close'] *= 1.001
+        expected = PreProcessor._features(window.copy())[PreProcessor.FEATURE_COLS].iloc[-1].to_numpy()
+        actual = incremental.features(KEY, window)
+        assert np.array_equal(np.isnan(actual), np.isnan(expected)), end
+        assert np.all(np.abs(actual - expected) <= 1e-12 + rtol * np.abs(expected)), end
+
+
+def test_features_backfill_then_signal():
+    candles = random_candles(400, seed=3)
+    gapped = candles.drop(index=range(300, 320)).reset_index(drop=True)
+    incremental = IncrementalFeatureStrategy(history=400)
+
+    incremental.features(KEY, gapped.iloc[:301])
+    features = incremental.features(KEY, candles.iloc[:322])
+
+    expected = IncrementalFeatureStrategy(history=400).features(KEY, candles.iloc[:322])
+    np.testing.assert_allclose(features, expected, rtol=1e-9, equal_nan=True)
+
+
+def test_eviction_drops_engines():
+    collector = HyperliquidCollector(
+        test_net=False, symbols=[], interval='1m', max_candles=100, max_symbols=2, connection=HistoryFeed([], perps=['BTC', 'ETH', 'SOL'])
+    )
+    donchian = IncrementalDonchianStrategy(strategy())
+    features = IncrementalFeatureStrategy(history=100)
+    for incremental in (donchian, features):
+        collector.add_eviction_listener(incremental.drop_symbol)
+
+    candles = random_candles(100)
+    for symbol in ('BTC', 'ETH'):
+        collector.ensure_symbol(symbol)
+        for incremental in (donchian, features):
+            incremental.sync(f'{symbol}:1m', candles)
+            incremental.sync(f'{symbol}:5m', candles)
+
+    # the least recently requested symbol goes, with every interval of it
+    collector.ensure_symbol('SOL')
+    assert collector.symbols == ['ETH', 'SOL']
+    for incremental in (donchian, features):
+        assert sorted(incremental._engines) == ['ETH:1m', 'ETH:5m']
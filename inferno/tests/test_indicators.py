@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ml import indicators
+from tests.record_pandas_ta import CANDLE_COLUMNS, FIXTURE, load_pandas_ta, record
+
+INDICATORS = [column for column in pd.read_csv(FIXTURE, comment='#', nrows=0).columns if column not in CANDLE_COLUMNS]
+
+
+@pytest.fixture(scope='module')
+def reference() -> pd.DataFrame:
+    return pd.read_csv(FIXTURE, comment='#')
+
+
+def kernels(candles: pd.DataFrame) -> dict[str, np.ndarray]:
+    """`src.ml.indicators` outputs under the fixture's column names."""
+    high, low, close, volume = (candles[column].to_numpy(dtype=np.float64) for column in ('high', 'low', 'close', 'volume'))
+    outputs = {
+        'rsi_14': indicators.rsi(close, 14),
+        'ema_50': indicators.ema(close, 50),
+        'atr_14': indicators.atr(high, low, close, 14),
+        'obv': indicators.obv(close, volume),
+    }
+    outputs['macd_12_26_9'], outputs['macdh_12_26_9'], outputs['macds_12_26_9'] = indicators.macd(close, 12, 26, 9)
+    outputs['stochk_14_3_3'], outputs['stochd_14_3_3'] = indicators.stoch(high, low, close, 14, 3, 3)
+    outputs['adx_14'], outputs['dmp_14'], outputs['dmn_14'] = indicators.adx(high, low, close, 14)
+    outputs['bbl_20_2'], outputs['bbm_20_2'], outputs['bbu_20_2'] = indicators.bbands(close, 20, 2.)
+    outputs['dcl_60'], outputs['dcm_60'], outputs['dcu_60'] = indicators.donchian(high, low, 60, 60)
+    return outputs
+
+
+def test_fixture_covers_every_kernel(reference):
+    assert sorted(kernels(reference)) == sorted(INDICATORS)
+
+
+@pytest.mark.parametrize('column', INDICATORS)
+def test_kernel_matches_pandas_ta(reference, column):
+    actual = kernels(reference)[column]
+    np.testing.assert_allclose(actual, reference[column].to_numpy(), rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_fixture_matches_installed_pandas_ta(reference):
+    try:
+        load_pandas_ta()
+    except ImportError:
+        pytest.skip('pandas_ta is not installed')
+    expected = record(reference[CANDLE_COLUMNS])
+    pd.testing.assert_frame_equal(expected, reference[expected.columns], rtol=1e-12, check_dtype=False)
@@ -0,0 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from time import sleep
+import os
+
+import pytest
+
+from src.ml.registry import ModelRegistry
+from src.types.error import UnknownModelError
+
+
+class Loads:
+    """`load` of a registry that returns the bundle's text and records the loads."""
+
+    def __init__(self, delay: float = 0.):
+        self.delay = delay
+        self.paths: list[str] = []
+        self._lock = Lock()
+
+    def __call__(self, path: Path) -> str:
+        with self._lock:
+            self.paths.append(path.stem)
+        sleep(self.delay)
+        text = path.read_text()
+        if text == 'broken':
+            raise ValueError(f'{path} is broken')
+        return text
+
+
+def bundle(directory: Path, name: str, text: str, modified: float = 1_000.) -> Path:
+    path = directory / f'{name}.joblib'
+    path.write_text(text)
+    os.utime(path, (modified, modified))
+    return path
+
+
+@pytest.fixture
+def models_dir(tmp_path) -> Path:
+    bundle(tmp_path, 'v1', 'model 1')
+    bundle(tmp_path, 'v2', 'model 2')
+    bundle(tmp_path, 'shadow', 'shadow model')
+    bundle(tmp_path, 'old', 'broken')
+    (tmp_path / 'notes.txt').write_text('not a bundle')
+    return tmp_path
+
+
+def registry(models_dir: Path, loads: Loads, **kwargs) -> ModelRegistry:
+    return ModelRegistry(models_dir, 'v1.joblib', loads, poll_interval=0, **kwargs)
+
+
+def test_loads_active_and_preloads_only(models_dir):
+    loads = Loads()
+    models = registry(models_dir, loads, preload=['shadow', 'missing'])
+
+    assert models.active.name == 'v1' and models.get().inference == 'model 1'
+    assert sorted(models.versions) == ['shadow', 'v1']
+    assert sorted(models.bundles) == ['old', 'shadow', 'v1', 'v2']
+    assert loads.paths == ['v1', 'shadow']
+
+
+def test_other_versions_load_on_first_use(models_dir):
+    loads = Loads(delay=.05)
+    models = registry(models_dir, loads)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        versions = list(executor.map(lambda _: models.get('v2'), range(8)))
+    assert all(version is versions[0] for version in versions)
+    assert versions[0].inference == 'model 2'
+    assert loads.paths == ['v1', 'v2']
+    # the active version is unchanged
+    assert models.get().name == 'v1'
+
+
+def test_broken_bundles_fail_their_requests_only(models_dir):
+    loads = Loads()
+    bundle(models_dir, 'shadow', 'broken')
+    models = registry(models_dir, loads, preload=['shadow'])
+
+    assert sorted(models.versions) == ['v1']
+    for _ in range(3):
+        with pytest.raises(UnknownModelError):
+            models.get('old')
+    with pytest.raises(UnknownModelError):
+        models.get('v3')
+    # failed bundles are not retried until they are modified
+    assert loads.paths == ['v1', 'shadow', 'old']
+
+    bundle(models_dir, 'old', 'model 0', modified=2_000.)
+    assert models.get('old').inference == 'model 0'
+
+
+def test_scan_reloads_loaded_versions(models_dir):
+    loads = Loads()
+    models = registry(models_dir, loads, preload=['shadow'])
+    active = models.get()
+
+    bundle(models_dir, 'v1', 'model 1b', modified=2_000.)
+    bundle(models_dir, 'v2', 'model 2b', modified=2_000.)
+    bundle(models_dir, 'v3', 'model 3', modified=2_000.)
+    models.scan()
+    # bundles are loaded once they are unchanged between two scans
+    assert models.get() is active
+    models.scan()
+    assert models.get().inference == 'model 1b'
+    assert active.inference == 'model 1'
+    assert sorted(models.versions) == ['shadow', 'v1']
+    assert 'v3' in models.bundles
+    assert loads.paths == ['v1', 'shadow', 'v1']
+
+    assert models.get('v3').inference == 'model 3'
+
+
+def test_scan_loads_new_preloads(tmp_path):
+    bundle(tmp_path, 'v1', 'model 1')
+    loads = Loads()
+    models = registry(tmp_path, loads, preload=['shadow'])
+    assert sorted(models.versions) == ['v1']
+
+    bundle(tmp_path, 'shadow', 'shadow model')
+    models.scan()
+    models.scan()
+    assert models.versions['shadow'].inference == 'shadow model'
+
+
+def test_follow_latest_activates_newer_bundles(models_dir):
+    loads = Loads()
+    models = registry(models_dir, loads, follow_latest=True)
+    models.scan()
+    models.scan()
+    # not newer than the active one
+    assert models.active.name == 'v1' and sorted(models.versions) == ['v1']
+
+    bundle(models_dir, 'v3', 'model 3', modified=3_000.)
+    models.scan()
+    models.scan()
+    assert models.active.name == 'v3' and models.get().inference == 'model 3'
+    assert loads.paths == ['v1', 'v3']
+
+
+def test_watcher_swaps_the_active_version(models_dir):
+    models = ModelRegistry(models_dir, 'v1.joblib', Loads(), poll_interval=.01)
+    bundle(models_dir, 'v1', 'model 1b', modified=2_000.)
+    for _ in range(500):
+        if models.get().inference == 'model 1b':
+            break
+        sleep(.01)
+    models.close()
+    assert models.get().inference == 'model 1b'
@@ -0,0 +1,162 @@
+from threading import Event
+from time import sleep
+from typing import Callable
+
+import numpy as np
+import pytest
+
+from src.hyperliquid.collection import HyperliquidCollector
+from src.hyperliquid.connection import INTERVAL_MS
+from src.hyperliquid.replay import ReplayClock, ReplayConnection, synthetic_candles
+from tests.helpers import MINUTE
+
+START = 1_700_000_000_000
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5.) -> None:
+    for _ in range(int(timeout * 100)):
+        if condition():
+            return
+        sleep(.01)
+    raise TimeoutError('condition not met')
+
+
+@pytest.fixture
+def candles():
+    return synthetic_candles(200, START + 1234, seed=3)
+
+
+def replay(candles, **kwargs) -> ReplayConnection:
+    return ReplayConnection({'BTC': candles}, speed=0, **kwargs)
+
+
+def test_synthetic_candles(candles):
+    assert candles['t'][0] == START - START % MINUTE
+    np.testing.assert_array_equal(np.diff(candles['t']), MINUTE)
+    np.testing.assert_array_equal(candles['T'], candles['t'] + MINUTE - 1)
+    np.testing.assert_array_equal(candles['o'][1:], candles['c'][:-1])
+    assert (candles['h'] >= np.maximum(candles['o'], candles['c'])).all()
+    assert (candles['l'] <= np.minimum(candles['o'], candles['c'])).all()
+    assert (candles['v'] > 0).all()
+    np.testing.assert_array_equal(synthetic_candles(200, START + 1234, seed=3)['c'], candles['c'])
+    assert len(synthetic_candles(10, START, '1h')['t']) == 10
+
+
+def test_clock():
+    clock = ReplayClock(START, speed=0)
+    clock.advance(START + MINUTE)
+    clock.advance(START)
+    assert clock.now() == START + MINUTE
+
+    clock = ReplayClock(START, speed=60_000)
+    clock.advance(START + MINUTE)
+    assert START + MINUTE <= clock.now() < START + 60 * MINUTE
+
+
+def test_every_candle_is_delivered_once_in_order(candles):
+    connection = replay(candles, history=50)
+    assert connection.clock.now() == candles['t'][50]
+    received = []
+    release = Event()
+
+    def callback(message):
+        received.append(message['data'])
+        assert release.wait(5)
+
+    connection.subscribe('1m', 'BTC', callback)
+    wait_for(lambda: len(received) == 1)
+    assert not connection.done
+    release.set()
+    wait_for(lambda: connection.messages == 150)
+    connection.close()
+
+    assert connection.done and connection.messages == 150
+    assert [candle['t'] for candle in received] == candles['t'][50:].tolist()
+    assert [float(candle['c']) for candle in received] == candles['c'][50:].tolist()
+    assert all(candle['s'] == 'BTC' and candle['i'] == '1m' and candle['n'] == 1 for candle in received)
+    assert connection.clock.now() == candles['T'][-1]
+
+
+def test_updates_converge_on_the_candle(candles):
+    connection = replay(candles, history=150, updates_per_candle=4)
+    received = []
+    connection.subscribe('1m', 'BTC', lambda message: received.append(message['data']))
+    wait_for(lambda: len(received) == 200)
+    connection.close()
+
+    for i, updates in enumerate(np.split(np.array(received), 50)):
+        index = 150 + i
+        assert [update['t'] for update in updates] == [candles['t'][index]] * 4
+        assert [update['n'] for update in updates] == [1, 2, 3, 4]
+        volumes = [float(update['v']) for update in updates]
+        assert volumes == sorted(volumes)
+        final = updates[-1]
+        for key in ('o', 'h', 'l', 'c', 'v'):
+            assert float(final[key]) == candles[key][index]
+
+
+def test_snapshots(candles):
+    connection = replay(candles, history=100, updates_per_candle=4)
+    t = candles['t'].tolist()
+
+    def snapshot(**kwargs):
+        return connection.candles_snapshot('BTC', '1m', **kwargs)
+
+    assert [candle['t'] for candle in snapshot(limit=10)] == t[90:101]
+    assert [candle['t'] for candle in snapshot(limit=100, start_time=t[95])] == t[95:101]
+    assert [candle['t'] for candle in snapshot(limit=10, end_time=t[50])] == t[40:51]
+    # never past the clock
+    assert [candle['t'] for candle in snapshot(limit=10, end_time=t[150])] == t[90:101]
+
+    # closed candles are final, the open one is as of the clock
+    closed, open_ = snapshot(limit=1)
+    assert closed['n'] == 4 and float(closed['c']) == candles['c'][99]
+    assert open_['n'] == 1 and float(open_['c']) == candles['o'][100] + (candles['c'][100] - candles['o'][100]) / 4
+    connection.clock.advance(t[100] + MINUTE // 2)
+    assert snapshot(limit=1)[-1]['n'] == 2
+    connection.clock.advance(t[101])
+    assert [candle['n'] for candle in snapshot(limit=1)] == [4, 1]
+
+    # higher intervals are aggregated from the base candles
+    now, five = connection.clock.now(), INTERVAL_MS['5m']
+    buckets = candles['t'] - candles['t'] % five
+    aggregated = connection.candles_snapshot('BTC', '5m', limit=2)
+    assert [candle['t'] for candle in aggregated] == [b for b in np.unique(buckets) if now - 2 * five <= b <= now]
+    closed = aggregated[0]
+    in_bucket = buckets == closed['t']
+    assert float(closed['o']) == candles['o'][in_bucket][0] and float(closed['c']) == candles['c'][in_bucket][-1]
+    assert float(closed['h']) == candles['h'][in_bucket].max() and float(closed['l']) == candles['l'][in_bucket].min()
+    connection.close()
+
+
+def test_unsubscribe_stops_delivery(candles):
+    connection = replay(candles, history=50)
+    received = []
+
+    def callback(message):
+        received.append(message['data'])
+        if len(received) == 5:
+            connection.unsubscribe('1m', 'BTC')
+
+    connection.subscribe('1m', 'BTC', callback)
+    wait_for(lambda: connection.messages == 5)
+    sleep(.05)
+    connection.close()
+    assert len(received) == 5 and connection.done
+
+
+def test_collector_replays_into_its_buffer(candles):
+    connection = replay(candles, history=100, updates_per_candle=3)
+    collector = HyperliquidCollector(
+        test_net=False, symbols=['BTC'], interval='1m', max_candles=500, connection=connection
+    )
+    collector.start()
+    assert collector.ready
+    # the last update of the last candle
+    wait_for(lambda: collector.get_candles('BTC')['v'][-1] == candles['v'][-1])
+    collector.stop()
+    connection.close()
+
+    columns = collector.get_candles('BTC')
+    for key in ('t', 'T', 'o', 'h', 'l', 'c', 'v'):
+        np.testing.assert_array_equal(columns[key], candles[key])
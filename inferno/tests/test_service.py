@@ -0,0 +1,242 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Event
+from typing import Optional
+import logging
+
+import numpy as np
+import pytest
+
+from src.donchian.donchian import DonchianStrategy
+from src.ml.batching import InferenceBatcher
+from src.ml.inference import ModelInference
+from src.ml.loader import ModelLoader
+from src.ml.preprocessor import PreProcessor
+from src.ml.registry import ModelRegistry
+from src.service import SignalService, failed_response
+from src.types.signal import SignalRequest, SignalType, Suggestion
+from src.utils.cache import LRUCache
+from src.utils.lanes import KeyedExecutor
+from src.utils.singleflight import SingleFlight
+from tests.helpers import random_candles, synthetic_model
+
+logger = logging.getLogger(__name__)
+
+
+class FakeCandles:
+    """`CandleSource` serving the same random candles for every symbol."""
+
+    ready = True
+
+    def __init__(self, n: int = 500):
+        candles = random_candles(n)
+        self._columns = {
+            't': candles['timestamp'].to_numpy(),
+            'T': candles['end'].to_numpy(),
+            'o': candles['open'].to_numpy(),
+            'h': candles['high'].to_numpy(),
+            'l': candles['low'].to_numpy(),
+            'c': candles['close'].to_numpy(),
+            'v': candles['volume'].to_numpy(),
+        }
+
+    def stop(self) -> None:
+        pass
+
+    def is_stale(self, symbol: str) -> bool:
+        return False
+
+    def wait_for_backfill(self, symbol: str, timeout: Optional[float] = None) -> bool:
+        return True
+
+    def candle_state(self, symbol: str, interval: Optional[str] = None) -> tuple[int, int, Optional[int]]:
+        return 0, 0, int(self._columns['t'][-1])
+
+    def get_candles(self, symbol: str, interval: Optional[str] = None) -> dict[str, np.ndarray]:
+        return {name: column.copy() for name, column in self._columns.items()}
+
+
+class CountingService(SignalService):
+    """Blocks `generate` until `release` is set and counts its calls."""
+
+    def __init__(self, **kwargs):
+        super().__init__(FakeCandles(), None, DonchianStrategy(), PreProcessor(), **kwargs) # type: ignore
+        self.calls = 0
+        self.started = Event()
+        self.release = Event()
+
+    def generate(self, request):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return super().generate(request)
+
+
+def result(response):
+    return response.result(5) if isinstance(response, Future) else response
+
+
+@pytest.mark.parametrize('lanes', [1, 4])
+def test_identical_requests_are_coalesced_before_the_lanes(lanes):
+    service = CountingService(single_flight=SingleFlight('signal', logger))
+    workers = KeyedExecutor(lanes)
+    request = SignalRequest(symbol='BTC', signal_type=SignalType.TECHNICAL)
+    try:
+        responses = [service.respond(request, workers) for _ in range(8)]
+        assert service.started.wait(5)
+        service.release.set()
+        results = [result(response) for response in responses]
+    finally:
+        workers.shutdown()
+
+    assert service.calls == 1
+    assert all(r.success for r in results)
+    assert len({(r.timestamp, r.suggestion) for r in results}) == 1
+
+
+def test_identical_requests_are_coalesced_across_threads():
+    service = CountingService(single_flight=SingleFlight('signal', logger))
+    request = SignalRequest(symbol='BTC', signal_type=SignalType.TECHNICAL)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(service.respond, request) for _ in range(8)]
+        assert service.started.wait(5)
+        service.release.set()
+        results = [result(future.result(5)) for future in futures]
+
+    assert service.calls == 1
+    assert all(r == results[0] for r in results)
+
+
+def test_requests_run_once_each_without_coalescing():
+    service = CountingService()
+    service.release.set()
+    workers = KeyedExecutor(2)
+    request = SignalRequest(symbol='BTC', signal_type=SignalType.TECHNICAL)
+    try:
+        results = [result(service.respond(request, workers)) for _ in range(4)]
+    finally:
+        workers.shutdown()
+
+    assert service.calls == 4
+    assert all(r.success and r.suggestion in (Suggestion.BUY, Suggestion.HOLD) for r in results)
+
+
+def test_cancelled_request_is_skipped_by_its_lane():
+    service = CountingService()
+    workers = KeyedExecutor(1)
+    try:
+        first = service.respond(SignalRequest(symbol='BTC', signal_type=SignalType.TECHNICAL), workers)
+        assert service.started.wait(5)
+        second = service.respond(SignalRequest(symbol='BTC', signal_type=SignalType.TECHNICAL), workers)
+        assert second.cancel() # type: ignore
+        service.release.set()
+        assert result(first).success
+    finally:
+        workers.shutdown()
+
+    assert service.calls == 1
+
+
+class UpdatingCandles(FakeCandles):
+    """`FakeCandles` whose candle state changes with `update` and that counts reads."""
+
+    def __init__(self, n: int = 500):
+        super().__init__(n)
+        self.version = 0
+        self.reads = 0
+
+    def update(self) -> None:
+        self.version += 1
+
+    def candle_state(self, symbol: str, interval: Optional[str] = None) -> tuple[int, int, Optional[int]]:
+        return 0, self.version, int(self._columns['t'][-1])
+
+    def get_candles(self, symbol: str, interval: Optional[str] = None) -> dict[str, np.ndarray]:
+        self.reads += 1
+        return super().get_candles(symbol, interval)
+
+
+@pytest.fixture(scope='module')
+def models_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('models')
+    for seed in (1, 2):
+        synthetic_model(directory / f'v{seed}.joblib', seed=seed)
+    return directory
+
+
+def cached_service(models_dir, **kwargs) -> SignalService:
+    strategy = DonchianStrategy()
+    registry = ModelRegistry(
+        models_dir, 'v1.joblib',
+        lambda path: ModelInference(str(path), ModelLoader(path.parent), PreProcessor(), strategy),
+        poll_interval=0
+    )
+    return SignalService(
+        UpdatingCandles(), registry, strategy, PreProcessor(), signal_cache=LRUCache('signal', 100, logger), **kwargs
+    )
+
+
+def test_responses_are_cached_per_candle_state(models_dir):
+    service = cached_service(models_dir)
+    candles = service.collector
+    technical = SignalRequest(symbol='BTC', signal_type=SignalType.TECHNICAL)
+
+    first = service.generate(technical)
+    assert service.generate(technical) is first
+    assert candles.reads == 1 # type: ignore
+
+    # any candle update invalidates the responses
+    candles.update() # type: ignore
+    assert service.generate(technical) is not first
+    assert candles.reads == 2 # type: ignore
+
+    # interval and signal type are part of the key
+    service.generate(SignalRequest(symbol='BTC', signal_type=SignalType.TECHNICAL, interval='5m'))
+    ml = service.generate(SignalRequest(symbol='BTC', signal_type=SignalType.ML))
+    assert candles.reads == 4 # type: ignore
+    assert service.generate(SignalRequest(symbol='ETH', signal_type=SignalType.ML)) is not ml
+    assert candles.reads == 5 # type: ignore
+
+
+def test_responses_are_cached_per_model_version(models_dir):
+    service = cached_service(models_dir)
+    active = service.generate(SignalRequest(symbol='BTC', signal_type=SignalType.ML))
+    assert active.prediction.model_version == 'v1' # type: ignore
+
+    # the active version is resolved before the lookup
+    assert service.generate(SignalRequest(symbol='BTC', signal_type=SignalType.ML, model_version='v1')) is active
+    other = service.generate(SignalRequest(symbol='BTC', signal_type=SignalType.ML, model_version='v2'))
+    assert other.prediction.model_version == 'v2' # type: ignore
+    assert service.generate(SignalRequest(symbol='BTC', signal_type=SignalType.ML, model_version='v2')) is other
+
+    service.registry.activate('v2')
+    assert service.generate(SignalRequest(symbol='BTC', signal_type=SignalType.ML)) is other
+    assert service.signal_cache.stats['hits'] == 3 # type: ignore
+
+
+def test_only_successful_responses_are_cached(models_dir):
+    service = cached_service(models_dir)
+    unknown = SignalRequest(symbol='BTC', signal_type=SignalType.ML, model_version='v3')
+    assert not service.generate(unknown).success # type: ignore
+    assert len(service.signal_cache) == 0 # type: ignore
+
+    service._cache_response(('BTC',), failed_response())
+    assert len(service.signal_cache) == 0 # type: ignore
+
+
+def test_batched_responses_are_cached_once_predicted(models_dir):
+    batcher = InferenceBatcher(max_batch_size=8, window_ms=1.)
+    service = cached_service(models_dir, batcher=batcher)
+    request = SignalRequest(symbol='BTC', signal_type=SignalType.ML)
+    try:
+        future = service.generate(request)
+        assert isinstance(future, Future)
+        response = future.result(5)
+        # the done callback caches it
+        assert service.generate(request) == response
+
+        failed: Future = Future()
+        service._cache_response(('failed',), failed)
+        failed.set_exception(ValueError('prediction failed'))
+        assert len(service.signal_cache) == 1 # type: ignore
+    finally:
+        batcher.close()
@@ -0,0 +1,128 @@
+from pathlib import Path
+from threading import Event
+from time import perf_counter
+
+import pandas as pd
+import pytest
+
+from src.ml.registry import ModelRegistry
+from src.ml.shadow import SHADOW_LOG_COLUMNS, ShadowScorer
+from src.types.prediction import Prediction
+from src.types.signal import Suggestion
+from tests.helpers import random_candles
+
+
+class FakeInference:
+    """`ModelInference` predicting a fixed confidence, optionally blocking until released."""
+
+    def __init__(self, name: str, features: list[str], confidence: float, release: Event = None):
+        self.name = name
+        self.features = features
+        self.confidence = confidence
+        self.release = release
+        self.own_inputs = 0
+        self.batches: list[int] = []
+
+    def model_input(self, candles: pd.DataFrame) -> dict[str, float]:
+        self.own_inputs += 1
+        return {feature: 0. for feature in self.features}
+
+    def predict_batch(self, model_inputs: list[dict[str, float]]) -> list[tuple[Suggestion, Prediction]]:
+        if self.release is not None:
+            self.release.wait()
+        if self.confidence < 0:
+            raise ValueError(f'{self.name} failed')
+        self.batches.append(len(model_inputs))
+        suggestion = Suggestion.BUY if self.confidence > .5 else Suggestion.HOLD
+        return [(suggestion, Prediction(confidence=self.confidence, timestamp=0, model_version=self.name))] * len(model_inputs)
+
+
+@pytest.fixture
+def models(tmp_path) -> dict[str, FakeInference]:
+    return {
+        'primary': FakeInference('primary', ['a', 'b'], .7),
+        'same': FakeInference('same', ['b'], .9),
+        'other': FakeInference('other', ['c'], .2),
+        'failing': FakeInference('failing', ['a'], -1.),
+    }
+
+
+def registry(directory: Path, models: dict[str, FakeInference]) -> ModelRegistry:
+    for name in models:
+        (directory / f'{name}.joblib').touch()
+    return ModelRegistry(
+        directory, 'primary.joblib', lambda path: models[path.stem], poll_interval=0, preload=list(models)
+    )
+
+
+def submit(scorer: ShadowScorer, n: int, primary: str = 'primary') -> list[bool]:
+    candles = random_candles(50)
+    return [scorer.submit('BTC:1m', candles, {'a': 1., 'b': 2.}, primary, Suggestion.BUY, .7) for _ in range(n)]
+
+
+def test_scores_are_logged(tmp_path, models):
+    path = tmp_path / 'logs' / 'shadow.csv'
+    # a failing or unloaded shadow doesn't keep the others from scoring
+    scorer = ShadowScorer(registry(tmp_path, models), ['same', 'other', 'failing', 'unloaded'], path, workers=2)
+    assert all(submit(scorer, 20))
+    # shadows never score requests they answered as the primary
+    submit(scorer, 5, primary='same')
+    scorer.close()
+
+    log = pd.read_csv(path)
+    assert list(log.columns) == list(SHADOW_LOG_COLUMNS)
+    assert log.groupby('shadow').size().to_dict() == {'other': 25, 'same': 20}
+    assert (log['primary_confidence'] == .7).all()
+    assert log.groupby('shadow')['agree'].mean().to_dict() == {'other': 0, 'same': 1}
+    assert log['timestamp'].eq(random_candles(50)['timestamp'].iloc[-1]).all()
+
+    # the primary's inputs are reused when they include the shadow's features
+    assert models['same'].own_inputs == 0
+    assert models['other'].own_inputs == 25
+    assert scorer.stats == {
+        'dropped': 0,
+        'queued': 0,
+        'shadows': {'same': {'scored': 20, 'disagreement': 0.}, 'other': {'scored': 25, 'disagreement': 1.}},
+    }
+
+
+def test_log_is_appended_to(tmp_path, models):
+    path = tmp_path / 'shadow.csv'
+    for _ in range(2):
+        scorer = ShadowScorer(registry(tmp_path, models), ['other'], path)
+        submit(scorer, 3)
+        scorer.close()
+    log = pd.read_csv(path)
+    assert len(log) == 6 and (log['shadow'] == 'other').all()
+
+
+def test_submit_never_waits_for_scoring(tmp_path, models):
+    release = Event()
+    models['other'].release = release
+    scorer = ShadowScorer(
+        registry(tmp_path, models), ['other'], tmp_path / 'shadow.csv', queue_size=10, batch_size=1, batch_wait_ms=0.
+    )
+
+    start = perf_counter()
+    queued = submit(scorer, 100)
+    assert perf_counter() - start < 1.
+    # the worker holds at most one task and the queue fills up, the rest is dropped
+    assert 10 <= sum(queued) <= 11
+    stats = scorer.stats
+    assert stats['dropped'] == 100 - sum(queued)
+    assert stats['queued'] == 10
+
+    release.set()
+    scorer.close()
+    assert scorer.stats['shadows']['other']['scored'] == sum(queued)
+
+
+def test_tasks_are_scored_in_batches(tmp_path, models):
+    scorer = ShadowScorer(
+        registry(tmp_path, models), ['same'], tmp_path / 'shadow.csv', batch_size=16, batch_wait_ms=200.
+    )
+    submit(scorer, 40)
+    scorer.close()
+    assert sum(models['same'].batches) == 40
+    assert max(models['same'].batches) <= 16
+    assert len(models['same'].batches) < 40
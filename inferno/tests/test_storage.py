@@ -0,0 +1,43 @@
+import numpy as np
+
+from src.hyperliquid.collection import HyperliquidCollector
+from src.hyperliquid.storage import CandleStore
+from tests.helpers import HistoryFeed, candle_dicts
+
+
+def test_merge_inserts_older_candles(tmp_path):
+    candles = candle_dicts(50)
+    store = CandleStore(tmp_path / 'BTC_1m.candles')
+    store.append(candles[:10] + candles[30:40])
+    assert store.append(candles[20:30]) == 0
+
+    assert store.merge(candles[5:30]) == 20
+    assert store.merge(candles[40:50]) == 10
+    assert store.merge(candles[:50]) == 0
+    assert len(store) == 50
+    assert store.last_timestamp == candles[-1]['t']
+    np.testing.assert_array_equal(store.read()['t'], [candle['t'] for candle in candles])
+    np.testing.assert_array_equal(store.read()['c'], [candle['c'] for candle in candles])
+
+    # reopened from disk
+    assert CandleStore(store.path).last_timestamp == candles[-1]['t']
+
+
+def test_load_after_downtime_fetches_the_missing_range(tmp_path):
+    candles = candle_dicts(1_000)
+    CandleStore.open(tmp_path, 'BTC', '1m').append(candles[:200])
+
+    # down for 800 candles, the snapshot only reaches back 100 minutes (candles 899-999)
+    feed = HistoryFeed(candles)
+    collector = HyperliquidCollector(
+        test_net=False, symbols=['BTC'], interval='1m', max_candles=100,
+        storage_dir=str(tmp_path), connection=feed
+    )
+    collector.start()
+    collector.stop()
+
+    stored = CandleStore.open(tmp_path, 'BTC', '1m').read()
+    # the newest candle is still open and not stored
+    np.testing.assert_array_equal(stored['t'], [candle['t'] for candle in candles[:-1]])
+    assert collector.gap_stats['missing_candles'] == 699
+    assert len(feed.snapshots) > 1
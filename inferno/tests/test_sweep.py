@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.sweep import ParameterSet, _evaluate_chunk, expand_grid, run_sweep
+from src.donchian.donchian import DonchianStrategy
+from tests.helpers import random_candles
+
+GRID = {
+    'LOOK_BACK_WINDOWS': [[5, 10], [20, 60, 90]],
+    'TARGET_VOLATILITY': [.2, .3],
+    'VOLATILITY_WINDOW': [30, 90],
+    'RISK_FREE_RATE': [0., .02],
+}
+
+
+@pytest.fixture(scope='module')
+def candles() -> pd.DataFrame:
+    return random_candles(1_500, seed=13)
+
+
+@pytest.fixture(scope='module')
+def sweep(candles):
+    return run_sweep(candles, expand_grid(GRID), workers=1)
+
+
+def strategy_returns(candles: pd.DataFrame, params: ParameterSet) -> pd.Series:
+    """Returns of holding `get_weights`' combined weight of a close over the next candle."""
+    weights = DonchianStrategy(**params.model_dump()).get_weights(candles.copy())
+    return (weights['w_combo'].shift(1) * candles['close'].pct_change()).fillna(0.)
+
+
+def test_grid_is_the_cartesian_product():
+    grid = expand_grid(GRID)
+    assert len(grid) == 16
+    assert len({params.model_dump_json() for params in grid}) == 16
+    assert grid[0] == ParameterSet(LOOK_BACK_WINDOWS=[5, 10], TARGET_VOLATILITY=.2, VOLATILITY_WINDOW=30)
+    assert all(params.MAX_ALLOCATION == 2. for params in grid)
+
+
+def test_equity_follows_strategy_weights(candles, sweep):
+    for i, params in enumerate(expand_grid(GRID)):
+        expected = np.cumprod(1 + strategy_returns(candles, params))
+        np.testing.assert_allclose(sweep.equity[i], expected, rtol=1e-12)
+    np.testing.assert_array_equal(sweep.equity.index, candles['timestamp'])
+
+
+def test_metrics_are_those_of_the_equity_curve(candles, sweep):
+    for i, params in enumerate(expand_grid(GRID)):
+        returns = strategy_returns(candles, params)
+        equity = sweep.equity[i]
+        excess = returns.iloc[1:] - params.RISK_FREE_RATE / params.TRADING_DAYS_PER_YEAR
+        sharpe = excess.mean() / excess.std() * np.sqrt(params.TRADING_DAYS_PER_YEAR)
+        drawdown = (equity / equity.cummax() - 1).min()
+
+        row = sweep.summary.iloc[i]
+        assert row['LOOK_BACK_WINDOWS'] == params.LOOK_BACK_WINDOWS
+        assert row['total_return'] == pytest.approx(equity.iloc[-1] - 1, rel=1e-12)
+        assert row['sharpe'] == pytest.approx(sharpe, rel=1e-9)
+        assert row['max_drawdown'] == pytest.approx(drawdown, rel=1e-12)
+        assert row['max_drawdown'] < 0
+
+
+def test_workers_give_identical_results(candles, sweep):
+    parallel = run_sweep(candles, expand_grid(GRID), workers=2)
+    pd.testing.assert_frame_equal(parallel.summary, sweep.summary)
+    pd.testing.assert_frame_equal(parallel.equity, sweep.equity)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_equity_is_only_kept_on_request(candles, sweep, workers):
+    result = run_sweep(candles, expand_grid(GRID), workers=workers, keep_equity=False)
+    assert result.equity is None
+    pd.testing.assert_frame_equal(result.summary, sweep.summary)
+
+
+def test_workers_only_return_metrics_without_equity(candles):
+    run_sweep(candles, expand_grid(GRID)[:1], workers=1)
+    assert all(equity is None for _, equity in _evaluate_chunk(expand_grid(GRID)[:1], keep_equity=False))
+    assert all(equity is not None for _, equity in _evaluate_chunk(expand_grid(GRID)[:1]))
+
+
+def test_empty_grid():
+    with pytest.raises(ValueError):
+        run_sweep(random_candles(10), [])
@@ -0,0 +1,98 @@
+import logging
+import math
+
+import pytest
+
+from src.donchian.donchian import DonchianStrategy
+from src.ml.inference import ModelInference
+from src.ml.loader import ModelLoader
+from src.ml.preprocessor import PreProcessor
+from src.utils.validation import TailValidator
+from tests.helpers import random_candles, synthetic_model
+
+WINDOWS = [5, 10, 20]
+ENDS = range(40, 600, 23)
+
+
+def assert_matches(latest: dict[str, float], expected: dict[str, float], columns) -> None:
+    for column in columns:
+        if math.isnan(expected[column]):
+            assert math.isnan(latest[column]), column
+        else:
+            assert latest[column] == pytest.approx(expected[column], rel=1e-12, abs=1e-15), column
+
+
+def full_latest(strategy: DonchianStrategy, candles) -> dict[str, float]:
+    """Last row of `get_weights`, forward filled like `get_latest` documents."""
+    return strategy.get_weights(candles.copy()).ffill().iloc[-1].to_dict()
+
+
+@pytest.mark.parametrize('warm_up', [None, 600])
+def test_latest_matches_last_row_of_weights(warm_up):
+    candles = random_candles(600, seed=8)
+    strategy = DonchianStrategy(LOOK_BACK_WINDOWS=WINDOWS, TAIL_WARM_UP=warm_up)
+    for end in ENDS:
+        expected = full_latest(strategy, candles.iloc[:end])
+        latest = strategy.get_latest(candles.iloc[:end])
+        assert_matches(latest, expected, expected.keys())
+
+
+def test_short_tail_keeps_channels_and_volatility():
+    candles = random_candles(600, seed=9)
+    strategy = DonchianStrategy(LOOK_BACK_WINDOWS=WINDOWS, TAIL_WARM_UP=0)
+    assert strategy.tail_length == max(max(WINDOWS), strategy.VOLATILITY_WINDOW + 1)
+    # channels and volatility only look back a window, positions depend on the whole path
+    columns = ['sigma_t'] + [f'{prefix}_{window}' for window in WINDOWS for prefix in ('DCL', 'DCM', 'DCU')]
+    for end in ENDS:
+        assert_matches(strategy.get_latest(candles.iloc[:end]), full_latest(strategy, candles.iloc[:end]), columns)
+
+
+def test_tail_length():
+    assert DonchianStrategy().tail_length is None
+    strategy = DonchianStrategy(LOOK_BACK_WINDOWS=[5, 360], TAIL_WARM_UP=100)
+    assert strategy.tail_length == 460
+
+
+def test_validated_signals_fall_back_to_full_recomputation():
+    candles = random_candles(600, seed=11)
+    full = DonchianStrategy(LOOK_BACK_WINDOWS=[60, 90])
+    tail = DonchianStrategy(LOOK_BACK_WINDOWS=[60, 90], TAIL_WARM_UP=0, TAIL_VALIDATION_RATE=1.)
+
+    mismatches = 0
+    for end in range(100, 600, 5):
+        data = candles.iloc[:end]
+        weights = full.get_weights(data.copy())['w_combo']
+        mismatches += not math.isclose(tail.get_latest(data)['w_combo'], weights.iloc[-1], rel_tol=1e-9, abs_tol=1e-12)
+        assert tail.get_signal(data) == full.get_signal(data)
+
+    # a tail without warm-up loses positions opened before it
+    assert mismatches > 0
+    assert tail.validator.stats == {'checks': 100, 'mismatches': mismatches}
+
+
+def test_validator_compares_within_tolerance(caplog):
+    validator = TailValidator('test', 1., logging.getLogger('test'), rel_tol=1e-9)
+    assert validator.sample()
+    assert validator.check({'a': 1., 'b': math.nan}, {'a': 1. + 1e-12, 'b': math.nan, 'c': 2.})
+    with caplog.at_level(logging.WARNING):
+        assert not validator.check({'a': 1., 'b': math.nan}, {'a': 1.1, 'b': math.nan})
+        assert not validator.check({'a': 1.}, {'a': math.nan})
+    assert validator.stats == {'checks': 3, 'mismatches': 2}
+    assert 'test: latest-only evaluation differs' in caplog.text
+    assert not TailValidator('test', 0., logging.getLogger('test')).sample()
+
+
+def test_model_input_matches_full_recomputation(tmp_path):
+    features = PreProcessor.FEATURE_COLS + ['w_5', 'POS_10', 'sigma_t']
+    path = synthetic_model(tmp_path / 'v1.joblib', features=features)
+    strategy = DonchianStrategy(LOOK_BACK_WINDOWS=[5, 10], TAIL_WARM_UP=300)
+    inference = ModelInference(str(path), ModelLoader(tmp_path), PreProcessor(), strategy, validation_rate=1.)
+    candles = random_candles(800, seed=11)
+
+    for end in range(100, 800, 97):
+        model_input = inference.model_input(candles.iloc[:end])
+        assert list(model_input) == features
+        expected = inference._full_model_input(candles.iloc[:end])
+        for feature in features:
+            assert model_input[feature] == pytest.approx(expected[feature], rel=1e-6, abs=1e-12, nan_ok=True), feature
+    assert inference.validator.stats == {'checks': 8, 'mismatches': 0}